@@ -0,0 +1,95 @@
+import json
+import threading
+import time
+import urllib.parse
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+from database_interface.db_process import (load_cached_response, save_cached_response,
+                                           touch_cached_response)
+
+
+# 随缓存一起保存的响应头
+CACHED_HEADERS = ("ETag", "Expires", "Last-Modified", "X-Pages", "Content-Language")
+
+
+def parse_expires(headers) -> float:
+    """把Expires头转换为epoch秒，缺失或无法解析时返回0（立即过期）"""
+    value = headers.get("Expires")
+    if not value:
+        return 0.0
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class CachedResponse:
+    """缓存中的一条响应"""
+
+    __slots__ = ("etag", "expires", "headers", "body")
+
+    def __init__(self, etag: Optional[str], expires: float, headers: Dict, body: Optional[str]):
+        self.etag = etag
+        self.expires = expires
+        self.headers = headers
+        self.body = body
+
+    @property
+    def fresh(self) -> bool:
+        return self.expires > time.time()
+
+    @property
+    def data(self):
+        return json.loads(self.body) if self.body else None
+
+
+class ResponseCache:
+    """
+    ESI响应缓存，保存在SQLite的 esi_response_cache 表
+
+    按路径、查询参数和角色区分。未过期的条目直接使用；
+    过期但有ETag的条目用 If-None-Match 重新验证，304时只更新过期时间。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+    @staticmethod
+    def make_key(path: str, params: Optional[Dict] = None, character_id: Optional[int] = None) -> str:
+        query = urllib.parse.urlencode(sorted((params or {}).items()))
+        return f"{character_id or 0}:{path}?{query}"
+
+    def lookup(self, key: str) -> Optional[CachedResponse]:
+        row = load_cached_response(key)
+        if row is None:
+            return None
+        etag, expires, headers, body = row
+        return CachedResponse(etag, expires, json.loads(headers), body)
+
+    def store(self, key: str, headers, body: str) -> CachedResponse:
+        """保存一次完整响应，headers为响应头"""
+        kept = {name: headers[name] for name in CACHED_HEADERS if name in headers}
+        entry = CachedResponse(headers.get("ETag"), parse_expires(headers), kept, body)
+        save_cached_response(key, entry.etag, entry.expires, json.dumps(kept), body)
+        return entry
+
+    def revalidated(self, key: str, entry: CachedResponse, headers) -> CachedResponse:
+        """304之后按新的Expires续期"""
+        entry.expires = parse_expires(headers)
+        for name in ("Expires", "Last-Modified"):
+            if name in headers:
+                entry.headers[name] = headers[name]
+        touch_cached_response(key, entry.expires, json.dumps(entry.headers))
+        return entry
+
+    def count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "revalidations": self.revalidations}
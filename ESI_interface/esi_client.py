@@ -0,0 +1,171 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from ESI_interface.esi_cache import ResponseCache
+from ESI_interface.http_session import build_session
+from ESI_interface.rate_governor import RateGovernor, default_governor
+
+
+ESI_BASE_URL = "https://esi.evetech.net/latest"
+
+
+class ESIResponse:
+    """ESI响应：状态码、响应头、解析后的JSON，以及是否来自缓存"""
+
+    __slots__ = ("status", "headers", "data", "from_cache")
+
+    def __init__(self, status: int, headers: Dict, data: Any, from_cache: bool = False):
+        self.status = status
+        self.headers = headers
+        self.data = data
+        self.from_cache = from_cache
+
+    def __repr__(self):
+        return f"ESIResponse(status={self.status}, from_cache={self.from_cache})"
+
+
+class ESIClient:
+    """
+    asyncio ESI客户端
+
+    底层复用带连接池的requests会话，阻塞请求在线程池中执行；
+    全局和每个路由模板各有一个信号量限制同时进行的请求数。
+    需要授权的请求通过 tokens.get_valid_token(character_id) 取令牌，
+    与SSO层（TokenRefreshScheduler / TokenVault）共享同一份令牌。
+    传入 ResponseCache 时GET请求按 Expires/ETag 缓存。
+    每个实际发出的请求都经过 RateGovernor 调度（默认与EVESSO共用全局调度器）。
+    """
+
+    def __init__(self, tokens=None, base_url: str = ESI_BASE_URL,
+                 session: Optional[requests.Session] = None,
+                 max_concurrency: int = 32, per_route_limit: int = 8,
+                 timeout: float = 30, datasource: str = "tranquility",
+                 user_agent: str = "EVE_MRP", cache: Optional[ResponseCache] = None,
+                 governor: Optional[RateGovernor] = None):
+        """
+        :param tokens: 提供 get_valid_token(character_id) 的对象，一般为TokenRefreshScheduler
+        :param base_url: ESI根地址
+        :param session: 共享的HTTP会话，为空时按并发数创建
+        :param max_concurrency: 全局同时进行的请求上限
+        :param per_route_limit: 每个路由模板同时进行的请求上限
+        :param timeout: 单次请求超时（秒）
+        :param datasource: ESI数据源
+        :param user_agent: User-Agent
+        :param cache: 响应缓存，为空时不缓存
+        :param governor: 请求调度器，为空时使用全局默认调度器
+        """
+        self.tokens = tokens
+        self.base_url = base_url.rstrip("/")
+        self.session = session if session is not None else build_session(
+            pool_maxsize=max_concurrency, user_agent=user_agent)
+        self.max_concurrency = max_concurrency
+        self.per_route_limit = per_route_limit
+        self.timeout = timeout
+        self.datasource = datasource
+        self.cache = cache
+        self.governor = governor if governor is not None else default_governor
+
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="esi")
+        self._loop = None
+        self._global_limit: Optional[asyncio.Semaphore] = None
+        self._route_limits: Dict[str, asyncio.Semaphore] = {}
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
+    def _limits(self, route: str):
+        # 信号量绑定事件循环，换了循环（例如多次asyncio.run）就重新创建
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._global_limit = asyncio.Semaphore(self.max_concurrency)
+            self._route_limits = {}
+        route_limit = self._route_limits.get(route)
+        if route_limit is None:
+            route_limit = self._route_limits[route] = asyncio.Semaphore(self.per_route_limit)
+        return self._global_limit, route_limit
+
+    def _send(self, method: str, route: str, path: str, params: Dict, headers: Dict, json_body: Any,
+              character_id: Optional[int], use_cache: bool) -> ESIResponse:
+        cache_key = entry = None
+        if self.cache is not None and use_cache and method == "GET":
+            cache_key = self.cache.make_key(path, params, character_id)
+            entry = self.cache.lookup(cache_key)
+            if entry is not None and entry.fresh:
+                self.cache.count("hits")
+                return ESIResponse(200, CaseInsensitiveDict(entry.headers), entry.data, from_cache=True)
+            if entry is not None and entry.etag:
+                headers["If-None-Match"] = entry.etag
+
+        if character_id is not None:
+            headers["Authorization"] = f"Bearer {self.tokens.get_valid_token(character_id)}"
+        self.governor.acquire(route)
+        response = self.session.request(method, self.base_url + path, params=params, headers=headers,
+                                        json=json_body, timeout=self.timeout)
+        self.governor.observe(response.headers, response.status_code, route)
+
+        if response.status_code == 304 and entry is not None:
+            self.cache.count("revalidations")
+            entry = self.cache.revalidated(cache_key, entry, response.headers)
+            return ESIResponse(200, CaseInsensitiveDict(entry.headers), entry.data, from_cache=True)
+
+        response.raise_for_status()
+        data = response.json() if response.content else None
+        if cache_key is not None:
+            self.cache.count("misses")
+            if "Expires" in response.headers or "ETag" in response.headers:
+                self.cache.store(cache_key, response.headers, response.text)
+        return ESIResponse(response.status_code, response.headers, data)
+
+    async def request(self, method: str, route: str, path_params: Optional[Dict] = None,
+                      params: Optional[Dict] = None, character_id: Optional[int] = None,
+                      json: Any = None, headers: Optional[Dict] = None,
+                      use_cache: bool = True) -> ESIResponse:
+        """
+        发送一个ESI请求
+
+        :param method: HTTP方法
+        :param route: 路由模板，例如 "/characters/{character_id}/assets/"
+        :param path_params: 路由模板参数
+        :param params: 查询参数
+        :param character_id: 需要授权时使用哪个角色的令牌
+        :param json: 请求体
+        :param headers: 额外请求头
+        :param use_cache: 为False时跳过缓存，直接请求ESI
+        """
+        path = route.format(**(path_params or {}))
+        query = {"datasource": self.datasource}
+        if params:
+            query.update(params)
+        global_limit, route_limit = self._limits(route)
+
+        # 先取路由名额再取全局名额：否则排在同一路由后面的请求会占住全局名额空等，其它路由得不到并发
+        async with route_limit, global_limit:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._send, method, route, path, query,
+                                              dict(headers or {}), json, character_id, use_cache)
+
+    async def get(self, route: str, **kwargs) -> ESIResponse:
+        return await self.request("GET", route, **kwargs)
+
+    async def post(self, route: str, **kwargs) -> ESIResponse:
+        return await self.request("POST", route, **kwargs)
+
+    async def gather(self, requests_: Iterable[Dict], return_exceptions: bool = True) -> List:
+        """
+        并发执行一批请求，结果顺序与输入一致
+
+        :param requests_: 每项为 request() 的关键字参数，method缺省为GET
+        :param return_exceptions: 单个请求失败时返回异常对象而不是中断整批
+        """
+        tasks = [self.request(item.pop("method", "GET"), **item) for item in map(dict, requests_)]
+        return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+
+    def run_many(self, requests_: Iterable[Dict], return_exceptions: bool = True) -> List:
+        """在同步代码中执行一批请求"""
+        return asyncio.run(self.gather(requests_, return_exceptions=return_exceptions))
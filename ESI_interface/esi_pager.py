@@ -0,0 +1,104 @@
+import asyncio
+import inspect
+import itertools
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ESI_interface.esi_client import ESIClient, ESIResponse
+
+
+class PagesChangedError(Exception):
+    """分页数据在抓取过程中多次发生变化"""
+
+
+class _Restart(Exception):
+    pass
+
+
+async def _deliver(consumer: Callable, page: int, rows):
+    result = consumer(page, rows)
+    if inspect.isawaitable(result):
+        await result
+
+
+async def fetch_pages(client: ESIClient, route: str, consumer: Callable,
+                      path_params: Optional[Dict] = None, params: Optional[Dict] = None,
+                      character_id: Optional[int] = None, max_restarts: int = 3,
+                      on_restart: Optional[Callable] = None, use_cache: bool = True,
+                      window: int = 32) -> int:
+    """
+    并发抓取带 X-Pages 的分页接口，并把每页数据流式交给consumer
+
+    先取第1页得到总页数，其余页以滑动窗口并发请求。任一页的 Last-Modified 与第1页不同
+    说明数据在抓取中途更新了，此时取消剩余请求、调用 on_restart 让消费方丢弃已收到的数据，
+    然后跳过缓存从第1页重新开始。
+
+    :param client: ESIClient
+    :param route: 路由模板
+    :param consumer: consumer(page, rows)，可以是协程函数；页按完成顺序到达
+    :param path_params: 路由模板参数
+    :param params: 查询参数
+    :param character_id: 需要授权时使用的角色
+    :param max_restarts: 最多重新开始几次
+    :param on_restart: 重新开始前的回调，可以是协程函数；本函数不输出日志，调用方可在这里记录
+    :param use_cache: 是否使用ESIClient的响应缓存（重新开始后总是跳过）
+    :param window: 同时在途的最大页数
+    :return: 总页数
+    """
+    base_params = dict(params or {})
+
+    async def get_page(page: int, use_cache: bool) -> Tuple[int, ESIResponse]:
+        response = await client.get(route, path_params=path_params, params={**base_params, "page": page},
+                                    character_id=character_id, use_cache=use_cache)
+        return page, response
+
+    for attempt in range(max_restarts + 1):
+        _, first = await get_page(1, use_cache)
+        total = int(first.headers.get("X-Pages", 1))
+        last_modified = first.headers.get("Last-Modified")
+        await _deliver(consumer, 1, first.data)
+
+        pages = iter(range(2, total + 1))
+        tasks = set()
+        try:
+            # 滑动窗口：同时最多window页在途，已完成未消费的页不会无限堆积
+            for page in itertools.islice(pages, window):
+                tasks.add(asyncio.ensure_future(get_page(page, use_cache)))
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    page, response = task.result()
+                    if response.headers.get("Last-Modified") != last_modified:
+                        raise _Restart()
+                    await _deliver(consumer, page, response.data)
+                    for page in itertools.islice(pages, 1):
+                        tasks.add(asyncio.ensure_future(get_page(page, use_cache)))
+        except _Restart:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if attempt == max_restarts:
+                break
+            if on_restart is not None:
+                result = on_restart()
+                if inspect.isawaitable(result):
+                    await result
+            use_cache = False
+            continue
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        return total
+
+    raise PagesChangedError(f"{route} 的数据在抓取过程中变化了{max_restarts + 1}次")
+
+
+async def collect_pages(client: ESIClient, route: str, **kwargs) -> List:
+    """抓取全部分页并合并为一个列表（顺序不保证与页码一致）"""
+    rows = []
+
+    def consumer(page, page_rows):
+        rows.extend(page_rows or [])
+
+    await fetch_pages(client, route, consumer, on_restart=rows.clear, **kwargs)
+    return rows
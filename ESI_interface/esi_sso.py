@@ -5,6 +5,13 @@ import webbrowser
 from datetime import datetime, timedelta
 from typing import Dict, Optional, Tuple
 import secrets
+import threading
+
+from ESI_interface.http_session import build_session
+from ESI_interface.jwt_validator import JWTValidator
+from ESI_interface.rate_governor import RateGovernor, default_governor
+from ESI_interface.token_scheduler import TokenRefreshScheduler
+from ESI_interface.token_vault import TokenVault
 
 ##from data_interface.db_processing import load_sso_config as loadsso
 
@@ -44,11 +51,38 @@ class EVESSO:
     TOKEN_URL = "https://login.eveonline.com/v2/oauth/token"
     VERIFY_URL = "https://login.eveonline.com/oauth/verify"
     REVOKE_URL = "https://login.eveonline.com/v2/oauth/revoke"
+    JWKS_URL = "https://login.eveonline.com/oauth/jwks"
     
-    def __init__(self, client_id: str, client_secret: str, redirect_uri: str):
+    def __init__(self, client_id: str, client_secret: str, redirect_uri: str,
+                 session: Optional[requests.Session] = None, timeout: float = 30,
+                 governor: Optional[RateGovernor] = None):
+        """
+        :param session: 共享的HTTP会话，为空时创建自带连接池的会话
+        :param timeout: 单次请求超时（秒）
+        :param governor: 请求调度器，为空时使用全局默认调度器
+        """
         self.client_id = client_id
         self.client_secret = client_secret
         self.redirect_uri = redirect_uri
+        self.session = session if session is not None else build_session(
+            user_agent=f"EVE-SSO-Python-Client/{client_id}")
+        self.timeout = timeout
+        self.governor = governor if governor is not None else default_governor
+        # 访问令牌是JWT，角色信息在本地校验，JWKS按TTL缓存
+        self.token_validator = JWTValidator(client_id, session=self.session,
+                                            jwks_url=self.JWKS_URL, timeout=timeout,
+                                            governor=self.governor)
+
+    def close(self):
+        """关闭连接池"""
+        self.session.close()
+
+    def _send(self, method: str, url: str, route: str, **kwargs) -> requests.Response:
+        """经过调度器发送请求"""
+        self.governor.acquire(route)
+        response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+        self.governor.observe(response.headers, response.status_code, route)
+        return response
     
     def generate_state(self, length: int = 8) -> str:
         """生成安全的state参数防止CSRF攻击"""
@@ -110,11 +144,12 @@ class EVESSO:
             data["redirect_uri"] = self.redirect_uri
         
         try:
-            response = requests.post(
+            response = self._send(
+                "POST",
                 self.TOKEN_URL,
+                "sso:token",
                 headers=headers,
-                data=data,
-                timeout=30
+                data=data
             )
             
             # 如果遇到404错误，尝试备用端点
@@ -122,11 +157,12 @@ class EVESSO:
                 print("尝试备用令牌端点...")
                 # 尝试不同的端点格式
                 alt_token_url = "https://login.eveonline.com/oauth/token"
-                response = requests.post(
+                response = self._send(
+                    "POST",
                     alt_token_url,
+                    "sso:token",
                     headers=headers,
-                    data=data,
-                    timeout=30
+                    data=data
                 )
             
             response.raise_for_status()
@@ -154,26 +190,32 @@ class EVESSO:
             "refresh_token": refresh_token,
         }
         
-        response = requests.post(
+        response = self._send(
+            "POST",
             self.TOKEN_URL,
+            "sso:token",
             headers=headers,
-            data=data,
-            timeout=30
+            data=data
         )
         response.raise_for_status()
         return response.json()
     
     def get_character_info(self, access_token: str) -> Dict:
-        """验证访问令牌并获取角色信息"""
+        """本地校验访问令牌(JWT)并获取角色信息，结构与 VERIFY_URL 的响应一致"""
+        return self.token_validator.validate(access_token)
+
+    def verify_token_remote(self, access_token: str) -> Dict:
+        """通过 VERIFY_URL 在线验证访问令牌"""
         headers = {
             "Authorization": f"Bearer {access_token}",
             "User-Agent": f"EVE-SSO-Python-Client/{client_id}"
         }
         
-        response = requests.get(
+        response = self._send(
+            "GET",
             self.VERIFY_URL,
-            headers=headers,
-            timeout=30
+            "sso:verify",
+            headers=headers
         )
         response.raise_for_status()
         return response.json()
@@ -182,6 +224,35 @@ class EVESSO:
 # 初始化EVE SSO客户端
 eve_sso = EVESSO(client_id, client_secret, redirect_uri)
 
+# 所有角色的令牌统一保存在令牌库中（内存索引 + SQLite）
+token_vault = TokenVault()
+refresh_scheduler = TokenRefreshScheduler(eve_sso, token_vault)
+_setup_lock = threading.Lock()
+_setup_done = False
+
+
+def setup_app():
+    """
+    加载已保存的角色并启动后台令牌刷新（只执行一次）
+
+    直接运行本文件时在启动前调用；flask run、WSGI等其它方式启动时在第一个请求前调用。
+    """
+    global _setup_done
+    if _setup_done:
+        return
+    with _setup_lock:
+        if _setup_done:
+            return
+        token_vault.load()
+        refresh_scheduler.load()
+        refresh_scheduler.start()
+        _setup_done = True
+
+
+@app.before_request
+def _setup_before_request():
+    setup_app()
+
 
 # HTML模板
 HTML_TEMPLATE = """
@@ -377,6 +448,16 @@ def callback():
             'CharacterOwnerHash': verify_response['CharacterOwnerHash']
         }
         
+        # 写入令牌库并安排后台刷新
+        refresh_scheduler.add({
+            'character_id': verify_response['CharacterID'],
+            'character_name': verify_response['CharacterName'],
+            'owner_hash': verify_response['CharacterOwnerHash'],
+            'access_token': token_response['access_token'],
+            'refresh_token': token_response.get('refresh_token'),
+            'expires_at': session['token_info']['expires_at'].timestamp(),
+        })
+
         # 清理临时数据
         session.pop('oauth_state', None)
         
@@ -419,6 +500,9 @@ if __name__ == '__main__':
     auth_url1, state1 = eve_sso.get_authorization_url()
     webbrowser.open(auth_url1)
     print("=" * 80)
+
+    # 加载已保存的角色，后台在过期前主动刷新令牌
+    setup_app()
     
     # 在开发环境中运行Flask应用
     app.run(debug=False, port=5000, host='0.0.0.0')
\ No newline at end of file
@@ -9,6 +9,8 @@ from typing import Dict, Optional, Tuple
 import hashlib
 import secrets
 
+from ESI_interface.rate_governor import governed_request
+
 # Flask用于Web服务器（安装: pip install flask）
 from flask import Flask, request, redirect, session, jsonify, render_template_string
 
@@ -98,8 +100,10 @@ class EVESSO:
             data["redirect_uri"] = self.redirect_uri
         
         try:
-            response = requests.post(
+            response = governed_request(
+                "POST",
                 self.TOKEN_URL,
+                "sso:token",
                 headers=headers,
                 data=data,
                 timeout=30
@@ -110,8 +114,10 @@ class EVESSO:
                 print("尝试备用令牌端点...")
                 # 尝试不同的端点格式
                 alt_token_url = "https://login.eveonline.com/oauth/token"
-                response = requests.post(
+                response = governed_request(
+                    "POST",
                     alt_token_url,
+                    "sso:token",
                     headers=headers,
                     data=data,
                     timeout=30
@@ -142,8 +148,10 @@ class EVESSO:
             "refresh_token": refresh_token,
         }
         
-        response = requests.post(
+        response = governed_request(
+            "POST",
             self.TOKEN_URL,
+            "sso:token",
             headers=headers,
             data=data,
             timeout=30
@@ -158,8 +166,10 @@ class EVESSO:
             "User-Agent": f"EVE-SSO-Python-Client/{client_id}"
         }
         
-        response = requests.get(
+        response = governed_request(
+            "GET",
             self.VERIFY_URL,
+            "sso:verify",
             headers=headers,
             timeout=30
         )
@@ -181,8 +191,10 @@ class EVESSO:
             "token_type_hint": token_type_hint,
         }
         
-        response = requests.post(
+        response = governed_request(
+            "POST",
             self.REVOKE_URL,
+            "sso:revoke",
             headers=headers,
             data=data,
             timeout=30
@@ -510,8 +522,10 @@ def test_esi():
         
         if character_id:
             # 获取角色公开信息
-            response = requests.get(
+            response = governed_request(
+                "GET",
                 f"https://esi.evetech.net/latest/characters/{character_id}/",
+                "/characters/{character_id}/",
                 headers=headers,
                 timeout=30
             )
@@ -531,8 +545,10 @@ def test_esi():
                 }
         else:
             # 获取服务器状态
-            response = requests.get(
+            response = governed_request(
+                "GET",
                 "https://esi.evetech.net/latest/status/",
+                "/status/",
                 headers=headers,
                 timeout=30
             )
@@ -0,0 +1,61 @@
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Iterable, Optional
+from urllib3.util.retry import Retry
+
+
+# 默认的连接池与重试策略
+DEFAULT_POOL_CONNECTIONS = 4      # 缓存的主机连接池数量
+DEFAULT_POOL_MAXSIZE = 8          # 每个主机保持的最大连接数
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+DEFAULT_STATUS_FORCELIST = (502, 503, 504)
+
+
+def build_session(pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+                  pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+                  max_retries: int = DEFAULT_MAX_RETRIES,
+                  backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+                  status_forcelist: Iterable[int] = DEFAULT_STATUS_FORCELIST,
+                  pool_block: bool = True,
+                  user_agent: Optional[str] = None) -> requests.Session:
+    """
+    创建带连接池与keep-alive的requests会话
+
+    同一主机的请求复用TCP+TLS连接。pool_maxsize即每个主机的并发连接上限，
+    pool_block为True时超出上限的请求会等待空闲连接，而不是另开新连接。
+    POST请求只在建立连接失败时重试，避免重复提交刷新令牌。
+
+    :param pool_connections: 缓存的主机连接池数量
+    :param pool_maxsize: 每个主机的最大连接数
+    :param max_retries: 最大重试次数
+    :param backoff_factor: 指数退避系数（秒）
+    :param status_forcelist: 需要重试的HTTP状态码
+    :param pool_block: 连接数达到上限时是否阻塞等待
+    :param user_agent: 默认User-Agent
+    :return: 配置好的requests.Session
+    """
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=tuple(status_forcelist),
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=retry,
+        pool_block=pool_block,
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if user_agent:
+        session.headers["User-Agent"] = user_agent
+    return session
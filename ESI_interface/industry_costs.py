@@ -0,0 +1,83 @@
+import asyncio
+import hashlib
+import json
+import time
+from typing import Dict, Optional
+
+from ESI_interface.esi_cache import parse_expires
+from ESI_interface.esi_client import ESIClient
+from mrp_engine.install_cost import IndustryCostTables
+
+
+SYSTEMS_ROUTE = "/industry/systems/"
+PRICES_ROUTE = "/markets/prices/"
+
+
+class IndustryCostRefresher:
+    """
+    按ESI缓存时间刷新星系成本指数和调整价格
+
+    两个端点并发请求（经ESIClient的响应缓存）；只有响应内容变化（ETag不同）时才重建
+    IndustryCostTables 中的数组，计算安装费时不再访问网络。
+    """
+
+    def __init__(self, client: ESIClient, costs: IndustryCostTables, min_interval: float = 60):
+        """
+        :param client: ESIClient，建议带 ResponseCache
+        :param costs: 要更新的成本表
+        :param min_interval: 两次刷新的最短间隔（秒），避免Expires缺失时空转
+        """
+        self.client = client
+        self.costs = costs
+        self.min_interval = min_interval
+        self.expires = 0.0
+        self._seen: Dict[str, str] = {}
+
+    def _changed(self, route: str, response) -> bool:
+        """
+        内容是否与上次不同
+
+        只比较ETag：304重新验证后Expires会变，但内容没有变。没有ETag时比较内容的哈希。
+        """
+        marker = response.headers.get("ETag")
+        if marker is None:
+            body = json.dumps(response.data, separators=(",", ":")).encode()
+            marker = "sha1:" + hashlib.sha1(body).hexdigest()
+        if self._seen.get(route) == marker:
+            return False
+        self._seen[route] = marker
+        return True
+
+    async def refresh(self) -> float:
+        """
+        刷新一次
+
+        :return: 两个端点中较早的过期时间（epoch秒）
+        """
+        systems, prices = await self.client.gather([{"route": SYSTEMS_ROUTE}, {"route": PRICES_ROUTE}])
+        expires = []
+        for route, response, update in ((SYSTEMS_ROUTE, systems, self.costs.update_systems),
+                                        (PRICES_ROUTE, prices, self.costs.update_prices)):
+            if isinstance(response, Exception):
+                print(f"{route} 刷新失败: {response}")
+                continue
+            if self._changed(route, response):
+                update(response.data or [])
+            expires.append(parse_expires(response.headers))
+        self.expires = min(expires) if expires else 0.0
+        return self.expires
+
+    async def run(self, stop: Optional[asyncio.Event] = None):
+        """持续刷新直到stop被设置，每次等到最早的缓存过期"""
+        stop = stop or asyncio.Event()
+        while not stop.is_set():
+            expires = await self.refresh()
+            delay = max(expires - time.time(), self.min_interval)
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def refresh_sync(self) -> float:
+        """在同步代码中刷新一次"""
+        return asyncio.run(self.refresh())
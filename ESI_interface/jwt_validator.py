@@ -0,0 +1,181 @@
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import requests
+
+
+# SHA-256 的 DigestInfo 前缀（PKCS#1 v1.5）
+_SHA256_DIGEST_INFO = bytes.fromhex("3031300d060960864801650304020105000420")
+
+
+class TokenValidationError(ValueError):
+    """访问令牌签名或声明校验失败"""
+
+
+def _b64url_decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def _b64url_to_int(segment: str) -> int:
+    return int.from_bytes(_b64url_decode(segment), "big")
+
+
+def decode_unverified(token: str) -> Dict:
+    """
+    不校验签名，直接读取JWT的声明部分
+
+    只用于读取过期时间等调度信息，不能用于认证。
+    """
+    try:
+        payload = token.split(".")[1]
+        return json.loads(_b64url_decode(payload))
+    except (IndexError, ValueError) as e:
+        raise TokenValidationError(f"无法解析JWT: {e}") from e
+
+
+def _verify_rs256(signing_input: bytes, signature: bytes, key: Dict) -> bool:
+    """按RSASSA-PKCS1-v1_5 + SHA-256 校验签名"""
+    n = _b64url_to_int(key["n"])
+    e = _b64url_to_int(key["e"])
+    k = (n.bit_length() + 7) // 8
+    if len(signature) != k:
+        return False
+
+    em = pow(int.from_bytes(signature, "big"), e, n).to_bytes(k, "big")
+    digest_info = _SHA256_DIGEST_INFO + hashlib.sha256(signing_input).digest()
+    expected = b"\x00\x01" + b"\xff" * (k - 3 - len(digest_info)) + b"\x00" + digest_info
+    return hmac.compare_digest(em, expected)
+
+
+class JWTValidator:
+    """
+    本地校验EVE SSO v2访问令牌（JWT）
+
+    JWKS只拉取一次并按TTL缓存；遇到未知kid时（密钥轮换）提前刷新，
+    但两次拉取至少间隔 refetch_interval，伪造kid的令牌不会让每次校验都访问SSO。
+    validate() 返回与 /oauth/verify 相同结构的字典。
+    """
+
+    JWKS_URL = "https://login.eveonline.com/oauth/jwks"
+    ISSUERS = ("login.eveonline.com", "https://login.eveonline.com")
+    AUDIENCE = "EVE Online"
+
+    def __init__(self, client_id: str, session: Optional[requests.Session] = None,
+                 jwks_url: str = JWKS_URL, jwks_ttl: float = 3600, leeway: float = 5,
+                 timeout: float = 30, governor=None, refetch_interval: float = 60):
+        """
+        :param client_id: 应用的client_id，必须出现在aud中
+        :param session: 拉取JWKS使用的HTTP会话
+        :param jwks_url: JWKS地址
+        :param jwks_ttl: JWKS缓存时间（秒）
+        :param leeway: 过期时间的容差（秒）
+        :param timeout: 拉取JWKS的超时（秒）
+        :param governor: 可选的RateGovernor，拉取JWKS前经过它调度
+        :param refetch_interval: 因未知kid重新拉取JWKS的最短间隔（秒）
+        """
+        self.client_id = client_id
+        self.session = session if session is not None else requests.Session()
+        self.jwks_url = jwks_url
+        self.jwks_ttl = jwks_ttl
+        self.leeway = leeway
+        self.timeout = timeout
+        self.governor = governor
+        self.refetch_interval = refetch_interval
+
+        self._keys: Dict[str, Dict] = {}
+        self._fetched_at = 0.0
+        self._attempted_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _fetch_jwks(self):
+        """拉取JWKS，只保留RSA密钥（EVE的JWKS中还有其它类型的密钥）"""
+        self._attempted_at = time.monotonic()
+        if self.governor is not None:
+            self.governor.acquire("sso:jwks")
+        response = self.session.get(self.jwks_url, timeout=self.timeout)
+        if self.governor is not None:
+            self.governor.observe(response.headers, response.status_code, "sso:jwks")
+        response.raise_for_status()
+        self._keys = {key["kid"]: key for key in response.json().get("keys", [])
+                      if key.get("kty") == "RSA" and "kid" in key and "n" in key and "e" in key}
+        self._fetched_at = time.monotonic()
+
+    def get_key(self, kid: str) -> Dict:
+        """按kid取公钥，缓存过期或kid未知时重新拉取JWKS（未知kid受 refetch_interval 限制）"""
+        if not isinstance(kid, str) or not kid:
+            raise TokenValidationError("JWT头部缺少kid")
+        with self._lock:
+            now = time.monotonic()
+            expired = now - self._fetched_at > self.jwks_ttl
+            may_refetch = self._attempted_at is None or now - self._attempted_at >= self.refetch_interval
+            if (expired or kid not in self._keys) and may_refetch:
+                self._fetch_jwks()
+            try:
+                return self._keys[kid]
+            except KeyError:
+                raise TokenValidationError(f"JWKS中没有kid为 {kid} 的密钥") from None
+
+    def validate_claims(self, token: str) -> Dict:
+        """校验签名、签发者、受众和过期时间，返回原始声明"""
+        try:
+            header_b64, payload_b64, signature_b64 = token.split(".")
+            header = json.loads(_b64url_decode(header_b64))
+            claims = json.loads(_b64url_decode(payload_b64))
+            signature = _b64url_decode(signature_b64)
+        except ValueError as e:
+            raise TokenValidationError(f"无法解析JWT: {e}") from e
+        if not isinstance(header, dict) or not isinstance(claims, dict):
+            raise TokenValidationError("JWT的头部和声明必须是JSON对象")
+
+        if header.get("alg") != "RS256":
+            raise TokenValidationError(f"不支持的签名算法: {header.get('alg')}")
+        key = self.get_key(header.get("kid"))
+        signing_input = f"{header_b64}.{payload_b64}".encode()
+        if not _verify_rs256(signing_input, signature, key):
+            raise TokenValidationError("JWT签名无效")
+
+        if claims.get("iss") not in self.ISSUERS:
+            raise TokenValidationError(f"签发者无效: {claims.get('iss')}")
+
+        audience = claims.get("aud")
+        if isinstance(audience, str):
+            audience = [audience]
+        if not audience or self.AUDIENCE not in audience or self.client_id not in audience:
+            raise TokenValidationError(f"受众无效: {claims.get('aud')}")
+
+        expires = claims.get("exp")
+        if isinstance(expires, bool) or not isinstance(expires, (int, float)):
+            raise TokenValidationError(f"过期时间无效: {expires!r}")
+        if time.time() > expires + self.leeway:
+            raise TokenValidationError("JWT已过期")
+
+        return claims
+
+    def validate(self, token: str) -> Dict:
+        """校验令牌并返回与 /oauth/verify 相同结构的角色信息"""
+        claims = self.validate_claims(token)
+
+        scopes = claims.get("scp", [])
+        if isinstance(scopes, str):
+            scopes = [scopes]
+        expires_on = datetime.fromtimestamp(claims["exp"], tz=timezone.utc)
+        try:
+            character_id = int(claims["sub"].split(":")[-1])
+        except (KeyError, AttributeError, ValueError) as e:
+            raise TokenValidationError(f"sub无效: {claims.get('sub')!r}") from e
+
+        return {
+            "CharacterID": character_id,
+            "CharacterName": claims.get("name"),
+            "ExpiresOn": expires_on.strftime("%Y-%m-%dT%H:%M:%S"),
+            "Scopes": " ".join(scopes),
+            "TokenType": "Character",
+            "CharacterOwnerHash": claims.get("owner"),
+            "IntellectualProperty": "EVE",
+        }
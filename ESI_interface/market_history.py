@@ -0,0 +1,34 @@
+from typing import Iterable
+
+from ESI_interface.esi_client import ESIClient
+from mrp_engine.market_history import DEFAULT_HISTORY_ROOT, MarketHistoryStore
+
+
+async def fetch_region_history(client: ESIClient, region_id: int, type_ids: Iterable[int],
+                               root: str = DEFAULT_HISTORY_ROOT) -> MarketHistoryStore:
+    """
+    并发抓取一个星域多个物品的日历史，合并写入列式存储
+
+    :param client: ESIClient
+    :param region_id: 星域ID
+    :param type_ids: 物品ID
+    :param root: 列式存储根目录
+    :return: 写入后的 MarketHistoryStore
+    """
+    type_ids = list(type_ids)
+    responses = await client.gather([
+        {"route": "/markets/{region_id}/history/", "path_params": {"region_id": region_id},
+         "params": {"type_id": type_id}}
+        for type_id in type_ids
+    ])
+
+    history = []
+    failed = 0
+    for type_id, response in zip(type_ids, responses):
+        if isinstance(response, Exception):
+            failed += 1
+            continue
+        history.append((type_id, response.data or []))
+    if failed:
+        print(f"星域 {region_id} 有 {failed} 个物品的历史抓取失败")
+    return MarketHistoryStore.write(region_id, history, root)
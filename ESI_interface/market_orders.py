@@ -0,0 +1,28 @@
+from typing import Dict
+
+from ESI_interface.esi_client import ESIClient
+from ESI_interface.esi_pager import fetch_pages
+from database_interface.market_store import MarketOrderSnapshot
+
+
+async def ingest_region_orders(client: ESIClient, region_id: int, order_type: str = "all") -> Dict[str, int]:
+    """
+    抓取一个星域的全部市场订单并增量写入 market_orders
+
+    每页到达后立即写入临时表，不在内存中累积整个星域；
+    分页数据中途变化时清空临时表重新抓取。
+
+    :param client: ESIClient
+    :param region_id: 星域ID
+    :param order_type: all / buy / sell
+    :return: {'inserted', 'updated', 'deleted', 'total'}
+    """
+    with MarketOrderSnapshot(region_id) as snapshot:
+        await fetch_pages(client, "/markets/{region_id}/orders/",
+                          lambda page, orders: snapshot.add_page(orders or []),
+                          path_params={"region_id": region_id}, params={"order_type": order_type},
+                          on_restart=snapshot.reset, use_cache=False)
+        counts = snapshot.finish()
+    print(f"星域 {region_id} 订单: 共{counts['total']}，新增{counts['inserted']}，"
+          f"更新{counts['updated']}，删除{counts['deleted']}")
+    return counts
@@ -0,0 +1,138 @@
+import asyncio
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import requests
+
+from ESI_interface.esi_client import ESIClient
+from database_interface.db_process import load_universe_names, save_universe_names
+
+
+class NameResolver:
+    """
+    批量把id解析为名称（/universe/names/）
+
+    查找顺序：内存LRU -> SQLite universe_names 表 -> ESI。
+    多个调用方同时请求的id会合并到同一批（每批最多1000个）；
+    ESI因某个无效id返回404时把该批对半拆分重试，最终只丢弃无效的id。
+    """
+
+    ROUTE = "/universe/names/"
+    BATCH_SIZE = 1000
+
+    def __init__(self, client: ESIClient, lru_size: int = 100000, linger: float = 0.005):
+        """
+        :param client: ESIClient
+        :param lru_size: 内存LRU容量
+        :param linger: 未凑满一批时最多等待多久再发出（秒），用于合并多个调用方
+        """
+        self.client = client
+        self.lru_size = lru_size
+        self.linger = linger
+
+        self._lru: "OrderedDict[int, Tuple[str, str]]" = OrderedDict()
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._queue: List[int] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+    def _remember(self, id_: int, entry: Tuple[str, str]):
+        self._lru[id_] = entry
+        self._lru.move_to_end(id_)
+        if len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    async def resolve(self, ids: Iterable[int]) -> Dict[int, Tuple[str, str]]:
+        """
+        解析一组id
+
+        :return: {id: (name, category)}，无效的id不在结果中
+        """
+        result = {}
+        missing = []
+        for id_ in set(ids):
+            entry = self._lru.get(id_)
+            if entry is not None:
+                self._lru.move_to_end(id_)
+                result[id_] = entry
+            else:
+                missing.append(id_)
+        if not missing:
+            return result
+
+        loop = asyncio.get_running_loop()
+        stored = await loop.run_in_executor(None, load_universe_names, missing)
+        for id_, entry in stored.items():
+            self._remember(id_, entry)
+            result[id_] = entry
+
+        unresolved = [id_ for id_ in missing if id_ not in stored]
+        entries = await asyncio.gather(*(self._enqueue(id_) for id_ in unresolved))
+        for id_, entry in zip(unresolved, entries):
+            if entry is not None:
+                result[id_] = entry
+        return result
+
+    def resolve_sync(self, ids: Iterable[int]) -> Dict[int, Tuple[str, str]]:
+        return asyncio.run(self.resolve(ids))
+
+    def _enqueue(self, id_: int) -> asyncio.Future:
+        future = self._pending.get(id_)
+        if future is not None:
+            return future
+
+        loop = asyncio.get_running_loop()
+        future = self._pending[id_] = loop.create_future()
+        self._queue.append(id_)
+        if len(self._queue) >= self.BATCH_SIZE:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.linger, self._flush)
+        return future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        while self._queue:
+            batch = self._queue[:self.BATCH_SIZE]
+            del self._queue[:self.BATCH_SIZE]
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[int]):
+        try:
+            resolved = await self._fetch(batch)
+            rows = [(item["id"], item["name"], item["category"]) for item in resolved]
+            if rows:
+                await asyncio.get_running_loop().run_in_executor(None, save_universe_names, rows)
+        except Exception as e:
+            for id_ in batch:
+                future = self._pending.pop(id_)
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        found = {}
+        for id_, name, category in rows:
+            self._remember(id_, (name, category))
+            found[id_] = (name, category)
+        for id_ in batch:
+            future = self._pending.pop(id_)
+            if not future.done():
+                future.set_result(found.get(id_))
+
+    async def _fetch(self, batch: List[int]) -> List[Dict]:
+        try:
+            response = await self.client.post(self.ROUTE, json=batch)
+            return response.data or []
+        except requests.exceptions.HTTPError as e:
+            if e.response is None or e.response.status_code != 404:
+                raise
+        # 批内有无效id：对半拆分，单个无效id直接丢弃
+        if len(batch) == 1:
+            return []
+        middle = len(batch) // 2
+        left, right = await asyncio.gather(self._fetch(batch[:middle]), self._fetch(batch[middle:]))
+        return left + right
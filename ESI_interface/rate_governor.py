@@ -0,0 +1,182 @@
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import requests
+
+
+class TokenBucket:
+    """令牌桶：rate为每秒补充的令牌数，burst为容量"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """还需等待多久才有一个令牌"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+
+SSO_PREFIX = "sso:"
+
+
+class RateGovernor:
+    """
+    全局ESI/SSO请求调度器
+
+    所有请求在发出前调用 acquire(route)，收到响应后调用 observe(headers, status, route)。
+    - 每个路由一个令牌桶；
+    - 跟踪 X-ESI-Error-Limit-Remain/Reset 报告的剩余错误额度，
+      额度低于 slow_threshold 时按比例拉开请求间隔，降到 error_floor 时暂停，
+      直到窗口重置再放行排队的请求。
+    "sso:" 开头的路由（登录服务器）不属于ESI的预算：不受错误额度暂停和减速影响，
+    其响应也不计入错误额度；默认不限速，需要时在 route_limits 中单独指定。
+    线程安全，同步代码和ESIClient的线程池共用同一个实例。
+    """
+
+    def __init__(self, default_rate: float = 50, default_burst: float = 100,
+                 route_limits: Optional[Dict[str, Tuple[float, float]]] = None,
+                 error_floor: int = 10, slow_threshold: int = 50, max_spacing: float = 1.0):
+        """
+        :param default_rate: 每个路由默认每秒请求数
+        :param default_burst: 每个路由默认突发容量
+        :param route_limits: {路由: (每秒请求数, 突发容量)}
+        :param error_floor: 剩余错误额度不高于此值时暂停所有请求
+        :param slow_threshold: 剩余错误额度低于此值时开始减速
+        :param max_spacing: 额度接近 error_floor 时两次请求的最大间隔（秒）
+        """
+        self.default_rate = default_rate
+        self.default_burst = default_burst
+        self.route_limits = dict(route_limits or {})
+        self.error_floor = error_floor
+        self.slow_threshold = slow_threshold
+        self.max_spacing = max_spacing
+
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._remain: Optional[int] = None
+        self._reset_at: Optional[float] = None
+        self._next_dispatch = 0.0
+        self._cond = threading.Condition()
+
+    def _bucket(self, route: str) -> TokenBucket:
+        bucket = self._buckets.get(route)
+        if bucket is None:
+            rate, burst = self.route_limits.get(route, (self.default_rate, self.default_burst))
+            bucket = self._buckets[route] = TokenBucket(rate, burst)
+        return bucket
+
+    def _spacing(self) -> float:
+        if self._remain is None or self._remain >= self.slow_threshold:
+            return 0.0
+        span = max(self.slow_threshold - self.error_floor, 1)
+        return self.max_spacing * min(1.0, (self.slow_threshold - self._remain) / span)
+
+    def acquire(self, route: str = "default"):
+        """阻塞直到允许向route发出一个请求"""
+        if route.startswith(SSO_PREFIX):
+            self._acquire_sso(route)
+            return
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if self._reset_at is not None and now >= self._reset_at:
+                    # 错误窗口已重置，额度恢复
+                    self._remain = None
+                    self._reset_at = None
+                    self._cond.notify_all()
+
+                if self._remain is not None and self._remain <= self.error_floor:
+                    if self._reset_at is None:
+                        # 没有报告重置时间时按ESI的60秒窗口估算，避免永久暂停
+                        self._reset_at = now + 60
+                    self._cond.wait(self._reset_at - now)
+                    continue
+
+                bucket = self._bucket(route)
+                wait = max(bucket.wait_time(now), self._next_dispatch - now)
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+
+                bucket.consume(now)
+                self._next_dispatch = now + self._spacing()
+                return
+
+    def _acquire_sso(self, route: str):
+        """SSO路由只经过自己的令牌桶（未在route_limits中配置时直接放行）"""
+        if route not in self.route_limits:
+            return
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                bucket = self._bucket(route)
+                wait = bucket.wait_time(now)
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                bucket.consume(now)
+                return
+
+    def observe(self, headers, status: int, route: Optional[str] = None):
+        """根据响应头更新剩余错误额度；SSO路由的响应不计入ESI错误额度"""
+        if route is not None and route.startswith(SSO_PREFIX):
+            return
+        remain = headers.get("X-ESI-Error-Limit-Remain")
+        reset = headers.get("X-ESI-Error-Limit-Reset")
+        with self._cond:
+            now = time.monotonic()
+            if remain is not None:
+                self._remain = int(remain)
+                if reset is not None:
+                    self._reset_at = now + int(reset)
+            elif status >= 400 and self._remain is not None:
+                # 没有报告额度的错误响应也按一次错误估算
+                self._remain -= 1
+            if status == 420:
+                # 已被限流：额度视为耗尽
+                self._remain = 0
+                if self._reset_at is None:
+                    self._reset_at = now + int(reset or 60)
+            self._cond.notify_all()
+
+    def status(self) -> Dict:
+        with self._cond:
+            reset_in = None
+            if self._reset_at is not None:
+                reset_in = max(self._reset_at - time.monotonic(), 0)
+            return {"error_limit_remain": self._remain, "reset_in": reset_in, "spacing": self._spacing()}
+
+
+# 进程内共享的默认调度器，EVESSO与ESIClient未指定时都使用它
+default_governor = RateGovernor()
+
+
+def governed_request(method: str, url: str, route: str, governor: Optional[RateGovernor] = None,
+                     **kwargs) -> requests.Response:
+    """
+    经过调度器发出一个请求（没有自己的会话的脚本使用）
+
+    :param route: 调度用的路由，SSO请求使用 "sso:" 开头的路由
+    :param governor: 为空时使用 default_governor
+    :param kwargs: 传给 requests.request 的参数
+    """
+    governor = governor if governor is not None else default_governor
+    governor.acquire(route)
+    response = requests.request(method, url, **kwargs)
+    governor.observe(response.headers, response.status_code, route)
+    return response
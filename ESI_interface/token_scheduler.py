@@ -0,0 +1,190 @@
+import heapq
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from ESI_interface.single_flight import SingleFlight
+from ESI_interface.token_vault import TokenVault
+
+
+class TokenRefreshScheduler:
+    """
+    后台主动刷新所有角色的访问令牌
+
+    按过期时间维护最小堆，在过期前 refresh_margin 秒刷新；
+    刷新在有界线程池中并发执行，新令牌立即更新到令牌库内存，攒批后一次写回数据库。
+    同一角色的刷新（定时或 refresh_now）经 SingleFlight 合并，只会有一次上游请求。
+    """
+
+    def __init__(self, sso, vault: TokenVault, refresh_margin: float = 120, max_workers: int = 8,
+                 batch_size: int = 50, flush_interval: float = 2.0, retry_delay: float = 30):
+        """
+        :param sso: EVESSO实例
+        :param vault: 令牌库
+        :param refresh_margin: 提前刷新的时间（秒）
+        :param max_workers: 同时进行的刷新数上限
+        :param batch_size: 攒够多少条新令牌就写回数据库
+        :param flush_interval: 最长写回间隔（秒）
+        :param retry_delay: 刷新失败后的重试间隔（秒）
+        """
+        self.sso = sso
+        self.vault = vault
+        self.refresh_margin = refresh_margin
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_delay = retry_delay
+        self.max_workers = max_workers
+
+        self._due: Dict[int, float] = {}
+        self._heap: List = []           # (到期刷新时间, character_id)
+        self._in_flight = set()
+        self._pending_writes = set()
+        self._last_flush = time.monotonic()
+        self._flight = SingleFlight()
+
+        self._cond = threading.Condition()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    def load(self):
+        """为令牌库中的所有角色安排刷新"""
+        with self._cond:
+            for record in self.vault.records():
+                self._schedule(record)
+            self._cond.notify()
+
+    def add(self, record: Dict):
+        """把角色写入令牌库并安排刷新，record需包含character_id、access_token、refresh_token等字段"""
+        record = self.vault.put(record)
+        with self._cond:
+            self._schedule(record)
+            self._cond.notify()
+
+    def get_valid_token(self, character_id: int, min_ttl: float = 60) -> str:
+        """返回至少还有 min_ttl 秒有效期的访问令牌，必要时立即刷新"""
+        record = self.vault.get(character_id)
+        if record is None:
+            raise KeyError(character_id)
+        if record["expires_at"] - time.time() > min_ttl:
+            return record["access_token"]
+        return self.refresh_now(character_id)
+
+    def refresh_now(self, character_id: int) -> str:
+        """
+        立即刷新角色令牌并返回新的访问令牌
+
+        并发调用同一角色时共享一次上游请求及其结果。
+        """
+        return self._flight.do(character_id, self._do_refresh, character_id)
+
+    def _schedule(self, record: Dict, due: Optional[float] = None):
+        if due is None:
+            due = record["expires_at"] - self.refresh_margin
+        self._due[record["character_id"]] = due
+        heapq.heappush(self._heap, (due, record["character_id"]))
+
+    def start(self):
+        """启动后台调度；stop() 之后可以再次启动"""
+        if self._thread is not None:
+            return
+        self._stopping = False
+        # 线程池随每次启动新建：stop() 关闭的线程池不能再提交任务
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="token-refresh")
+        self._thread = threading.Thread(target=self._run, name="token-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止调度，等待进行中的刷新结束并写回剩余令牌"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._stopping:
+                    return
+                now = time.time()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    entry_due, character_id = heapq.heappop(self._heap)
+                    # 惰性删除：已被重新调度、已移除或正在刷新的旧条目直接丢弃
+                    if (self._due.get(character_id) != entry_due or character_id not in self.vault
+                            or character_id in self._in_flight):
+                        continue
+                    self._in_flight.add(character_id)
+                    due.append(character_id)
+
+                wait = self.flush_interval
+                if self._heap:
+                    wait = min(wait, max(self._heap[0][0] - now, 0))
+                need_flush = (len(self._pending_writes) >= self.batch_size or
+                              (self._pending_writes and
+                               time.monotonic() - self._last_flush >= self.flush_interval))
+
+            for character_id in due:
+                self._executor.submit(self._refresh, character_id)
+            if need_flush:
+                self.flush()
+
+            with self._cond:
+                if not self._stopping and not due:
+                    self._cond.wait(wait)
+
+    def _refresh(self, character_id: int):
+        """线程池中执行的定时刷新"""
+        try:
+            self.refresh_now(character_id)
+        except Exception as e:
+            print(f"刷新角色 {character_id} 的令牌失败: {e}")
+            record = self.vault.get(character_id)
+            with self._cond:
+                if record is not None:
+                    self._schedule(record, time.time() + self.retry_delay)
+                self._cond.notify()
+        finally:
+            with self._cond:
+                self._in_flight.discard(character_id)
+
+    def _do_refresh(self, character_id: int) -> str:
+        # 在执行时读取最新的刷新令牌，避免使用已被轮换掉的旧令牌
+        record = self.vault.get(character_id)
+        if record is None:
+            raise KeyError(character_id)
+        new_token = self.sso.refresh_access_token(record["refresh_token"])
+
+        access_token = new_token["access_token"]
+        refresh_token = new_token.get("refresh_token") or record["refresh_token"]
+        expires_at = time.time() + new_token["expires_in"]
+        self.vault.update_tokens([(character_id, access_token, refresh_token, expires_at)],
+                                 write_through=False)
+
+        with self._cond:
+            self._schedule(self.vault.get(character_id))
+            self._pending_writes.add(character_id)
+            self._cond.notify()
+        return access_token
+
+    def flush(self):
+        """把攒下的新令牌批量写回数据库"""
+        with self._cond:
+            pending = self._pending_writes
+            self._pending_writes = set()
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+        try:
+            self.vault.persist(pending)
+        except Exception as e:
+            print(f"写回令牌失败，稍后重试: {e}")
+            with self._cond:
+                self._pending_writes |= pending
@@ -0,0 +1,114 @@
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ESI_interface.jwt_validator import TokenValidationError, decode_unverified
+from database_interface.db_process import (delete_character_token, load_character_tokens,
+                                           save_character_token, update_character_tokens)
+
+
+def token_expires_at(access_token: str) -> float:
+    """从JWT的exp读取过期时间（epoch秒），无法解析时视为已过期"""
+    try:
+        return float(decode_unverified(access_token)["exp"])
+    except (TokenValidationError, KeyError, TypeError, ValueError):
+        return 0.0
+
+
+class TokenVault:
+    """
+    内存中的角色令牌库
+
+    按character_id和owner hash建索引，查询为O(1)；修改同步写入SQLite。
+    启动时用一次查询批量加载。返回的记录字典由令牌库持有，调用方不要修改。
+
+    记录字段: character_id, character_name, owner_hash, access_token, refresh_token, expires_at
+    """
+
+    def __init__(self):
+        self._by_id: Dict[int, Dict] = {}
+        self._by_owner: Dict[str, Dict] = {}
+        self._lock = threading.RLock()
+
+    def load(self):
+        """从Character_info批量加载全部令牌；没有保存过期时间的旧记录从JWT读取"""
+        records = load_character_tokens()
+        with self._lock:
+            self._by_id.clear()
+            self._by_owner.clear()
+            for record in records:
+                if not record["expires_at"]:
+                    record["expires_at"] = token_expires_at(record["access_token"])
+                self._index(record)
+
+    def _index(self, record: Dict):
+        old = self._by_id.get(record["character_id"])
+        if old is not None and old["owner_hash"] != record["owner_hash"]:
+            self._by_owner.pop(old["owner_hash"], None)
+        # owner hash唯一：数据库中同一hash的其它角色已被替换
+        owner = self._by_owner.get(record["owner_hash"])
+        if owner is not None and owner["character_id"] != record["character_id"]:
+            self._by_id.pop(owner["character_id"], None)
+        self._by_id[record["character_id"]] = record
+        self._by_owner[record["owner_hash"]] = record
+
+    def get(self, character_id: int) -> Optional[Dict]:
+        return self._by_id.get(character_id)
+
+    def get_by_owner(self, owner_hash: str) -> Optional[Dict]:
+        return self._by_owner.get(owner_hash)
+
+    def get_access_token(self, character_id: int) -> Optional[str]:
+        record = self._by_id.get(character_id)
+        return record["access_token"] if record else None
+
+    def records(self) -> List[Dict]:
+        with self._lock:
+            return list(self._by_id.values())
+
+    def __contains__(self, character_id: int) -> bool:
+        return character_id in self._by_id
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def put(self, record: Dict) -> Dict:
+        """新增或替换一个角色（例如SSO登录回调之后）"""
+        record = dict(record)
+        record.setdefault("expires_at", token_expires_at(record["access_token"]))
+        with self._lock:
+            save_character_token(record)
+            self._index(record)
+        return record
+
+    def remove(self, character_id: int):
+        with self._lock:
+            delete_character_token(character_id)
+            record = self._by_id.pop(character_id, None)
+            if record is not None:
+                self._by_owner.pop(record["owner_hash"], None)
+
+    def update_tokens(self, updates: Iterable[Tuple[int, str, str, float]], write_through: bool = True):
+        """
+        更新令牌
+
+        :param updates: (character_id, access_token, refresh_token, expires_at) 列表
+        :param write_through: 是否立即写入数据库；为False时由调用方稍后调用 persist 批量写入
+        """
+        updates = list(updates)
+        with self._lock:
+            for character_id, access_token, refresh_token, expires_at in updates:
+                record = self._by_id[character_id]
+                record["access_token"] = access_token
+                record["refresh_token"] = refresh_token
+                record["expires_at"] = expires_at
+            if write_through:
+                update_character_tokens(updates)
+
+    def persist(self, character_ids: Iterable[int]):
+        """把指定角色的当前令牌批量写入数据库"""
+        with self._lock:
+            rows = [(character_id, self._by_id[character_id]["access_token"],
+                     self._by_id[character_id]["refresh_token"], self._by_id[character_id]["expires_at"])
+                    for character_id in character_ids if character_id in self._by_id]
+        if rows:
+            update_character_tokens(rows)
@@ -0,0 +1,77 @@
+"""
+SQLite连接基准：每次调用新建连接（旧做法） vs 每线程长期连接 + WAL
+
+测量 esi_response_cache 上单条写入（每条提交一次）和按主键查询的吞吐，以及多线程查询。
+
+运行: python -m benchmarks.bench_db_connection [--rows 5000] [--threads 8]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from database_interface import db_info
+
+
+def legacy_connection():
+    """改动前的 get_db_connection：每次调用都打开新连接，默认PRAGMA"""
+    return sqlite3.connect(db_info.DATABASE_PATH)
+
+
+def insert(get_connection, rows: int) -> float:
+    start = time.perf_counter()
+    for i in range(rows):
+        with get_connection() as conn:
+            conn.execute('INSERT OR REPLACE INTO esi_response_cache (cache_key, etag, expires, headers, body) '
+                         'VALUES (?, ?, ?, ?, ?)', (f'0:/markets/{i}/', f'"{i}"', 1e9 + i, '{}', 'x' * 200))
+            conn.commit()
+    return rows / (time.perf_counter() - start)
+
+
+def lookup(get_connection, rows: int, threads: int = 1) -> float:
+    def worker(offset):
+        for i in range(offset, rows, threads):
+            with get_connection() as conn:
+                conn.execute('SELECT etag, expires, headers, body FROM esi_response_cache WHERE cache_key = ?',
+                             (f'0:/markets/{i}/',)).fetchone()
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(offset,)) for offset in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return rows / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for label, get_connection in (("new connection", legacy_connection),
+                                      ("per-thread + WAL", db_info.get_db_connection)):
+            db_info.configure(os.path.join(tmp, f"{label.split()[0]}.db"))
+            db_info.initialize_database()
+            if get_connection is legacy_connection:
+                # 改动前的数据库使用默认的回滚日志
+                with sqlite3.connect(db_info.DATABASE_PATH) as conn:
+                    conn.execute('PRAGMA journal_mode = DELETE')
+            results[label] = (insert(get_connection, args.rows), lookup(get_connection, args.rows),
+                              lookup(get_connection, args.rows, args.threads))
+            print(f"{label:17} insert {results[label][0]:10,.0f}/s  lookup {results[label][1]:10,.0f}/s  "
+                  f"lookup x{args.threads} threads {results[label][2]:10,.0f}/s")
+        db_info.connections.close_all()
+
+        before, after = results["new connection"], results["per-thread + WAL"]
+        print(f"speedup           insert {after[0] / before[0]:9.1f}x  lookup {after[1] / before[1]:9.1f}x  "
+              f"lookup x{args.threads} threads {after[2] / before[2]:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+ESI多角色扇出基准：逐个同步请求 vs asyncio ESIClient
+
+--per-route 小于 --concurrency 且 --grouped（同一路由的请求排在一起）时，检查全局并发没有被
+等待路由名额的请求占住。
+
+运行: python -m benchmarks.bench_esi_client [--requests 500] [--latency 0.02] [--concurrency 32]
+                                           [--per-route 8] [--grouped]
+"""
+import argparse
+import time
+
+import requests
+
+from benchmarks.mock_esi import start_mock_esi
+from ESI_interface.esi_client import ESIClient
+
+
+ROUTES = ("/characters/{character_id}/assets/", "/characters/{character_id}/blueprints/",
+          "/characters/{character_id}/industry/jobs/", "/characters/{character_id}/wallet/")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--per-route", type=int, default=None, help="每个路由的并发，默认等于 --concurrency")
+    parser.add_argument("--grouped", action="store_true", help="按路由分组排列请求，而不是交替")
+    args = parser.parse_args()
+    per_route = args.per_route or args.concurrency
+
+    server, base_url = start_mock_esi(latency=args.latency)
+    jobs = [{"route": ROUTES[i % len(ROUTES)], "path_params": {"character_id": 90000000 + i}}
+            for i in range(args.requests)]
+    if args.grouped:
+        jobs.sort(key=lambda job: ROUTES.index(job["route"]))
+
+    # 改造前：一次一个请求
+    start = time.perf_counter()
+    for job in jobs:
+        url = base_url + job["route"].format(**job["path_params"])
+        requests.get(url, params={"datasource": "tranquility"}, timeout=30).json()
+    sequential = time.perf_counter() - start
+
+    client = ESIClient(base_url=base_url, max_concurrency=args.concurrency,
+                       per_route_limit=per_route)
+    start = time.perf_counter()
+    results = client.run_many(jobs)
+    fanout = time.perf_counter() - start
+    client.close()
+
+    failures = [r for r in results if isinstance(r, Exception)]
+    print(f"{args.requests} requests, {args.latency * 1000:.0f}ms server latency")
+    print(f"sequential   {sequential:7.2f}s  {args.requests / sequential:8.1f} req/s")
+    print(f"ESIClient    {fanout:7.2f}s  {args.requests / fanout:8.1f} req/s  "
+          f"(concurrency {args.concurrency}, {per_route} per route, {len(failures)} failures)")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+启动耗时：用 python -X importtime 测量主要模块的冷启动导入时间
+
+每个模块在新的子进程中、以空临时目录为工作目录导入，同时检查导入没有在工作目录创建任何文件
+（例如数据库）。
+
+运行: python -m benchmarks.bench_import_time [--top 10] [--budget-ms 0]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+MODULES = (
+    "database_interface.db_process",
+    "database_interface.market_store",
+    "ESI_interface.esi_client",
+    "ESI_interface.esi_sso",
+    "ESI_interface.token_vault",
+    "ESI_interface.market_orders",
+    "mrp_engine.bom_batch",
+    "mrp_engine.profitability",
+    "mrp_engine.jump_index",
+)
+
+
+def import_times(module: str, cwd: str):
+    """返回 (总耗时微秒, [(自身微秒, 累计微秒, 模块名)])"""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, (os.getcwd(), os.environ.get("PYTHONPATH")))))
+    env.pop("EVE_MRP_DB_PATH", None)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=cwd, env=env,
+                            capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(own), int(cumulative), name.strip()))
+    total = next(cumulative for _, cumulative, name in rows if name == module)
+    return total, rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=0, help="任一模块超过该耗时时返回非0（0为不检查）")
+    args = parser.parse_args()
+
+    failed = False
+    packages = {}
+    for module in MODULES:
+        with tempfile.TemporaryDirectory() as cwd:
+            total, rows = import_times(module, cwd)
+            created = os.listdir(cwd)
+        over = args.budget_ms and total / 1000 > args.budget_ms
+        failed |= bool(created) or bool(over)
+        note = f"  创建了文件: {created}" if created else ""
+        print(f"{module:34} {total / 1000:8.1f}ms{'  超出预算' if over else ''}{note}")
+        # 按顶层包汇总自身耗时，取各次导入中的最大值
+        own_by_package = {}
+        for own, _, name in rows:
+            package = name.split(".")[0]
+            own_by_package[package] = own_by_package.get(package, 0) + own
+        for package, own in own_by_package.items():
+            packages[package] = max(packages.get(package, 0), own)
+
+    print("\n耗时最多的包（自身导入时间）:")
+    for package, own in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {package:32} {own / 1000:8.1f}ms")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+增量重新计划基准：随机的小变更（价格、库存、ME、目标数量）与完整重新计划对比
+
+每轮变更后检查增量结果与 BatchBOMSolver 的完整计算一致。
+
+运行: python -m benchmarks.bench_incremental [--items 4000] [--products 300] [--rounds 50]
+"""
+import argparse
+import math
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic_sde import write_synthetic_sde
+from mrp_engine.bom import BOMEngine, Modifiers
+from mrp_engine.bom_batch import BatchBOMSolver
+from mrp_engine.incremental import IncrementalPlanner
+from mrp_engine.netting import as_type_vector
+from mrp_engine.sde import import_sde
+
+
+def check(planner: IncrementalPlanner, tables) -> bool:
+    """与完整计算比较数量和总成本"""
+    solver = BatchBOMSolver(tables, planner.engine.modifiers)
+    targets = {int(tables.type_ids[item]): quantity for item, quantity in planner.targets.items()}
+    inventory = {int(tables.type_ids[item]): quantity for item, quantity in planner.inventory.items()}
+    result = solver.solve(targets, inventory=as_type_vector(tables, inventory))
+    type_ids = tables.type_ids[solver.columns]
+    totals = {t: q for t, q in zip(type_ids.tolist(), result.totals[0].tolist()) if q}
+    runs = {t: q for t, q in zip(type_ids.tolist(), result.runs[0].tolist()) if q}
+    shortfall = (result.totals[0] - result.used[0])[solver.raw_mask]
+    raw_ids = type_ids[solver.raw_mask]
+    expected_cost = sum(q * planner.prices.get(int(tables.type_index(t)), math.nan)
+                        for t, q in zip(raw_ids.tolist(), shortfall.tolist()) if q)
+    same_cost = (math.isnan(expected_cost) and math.isnan(planner.total_cost)) or \
+        math.isclose(expected_cost, planner.total_cost, rel_tol=1e-9)
+    return totals == planner.totals() and runs == planner.job_runs() and same_cost
+
+
+def rebuild(planner: IncrementalPlanner, tables) -> IncrementalPlanner:
+    """用当前状态重新建立一个规划器（完整计算）"""
+    return IncrementalPlanner(planner.engine, {int(tables.type_ids[k]): v for k, v in planner.targets.items()},
+                              {int(tables.type_ids[k]): v for k, v in planner.inventory.items()},
+                              {int(tables.type_ids[k]): v for k, v in planner.prices.items()})
+
+
+def check_missing_price(planner: IncrementalPlanner, tables, rng: random.Random) -> int:
+    """去掉一个在用原材料的价格再补回，总成本应先为NaN、再与完整计算一致"""
+    shortfall = planner.shortfall()
+    if not shortfall:
+        return 0
+    type_id = rng.choice(sorted(shortfall))
+    price = planner.prices[int(tables.type_index(type_id))]
+    failures = 0
+    planner.set_price(type_id, math.nan)
+    planner.update()
+    if not math.isnan(planner.total_cost) or not check(planner, tables):
+        failures += 1
+        print("missing price: total cost should be NaN")
+    planner.set_price(type_id, price)
+    planner.update()
+    fresh = rebuild(planner, tables).total_cost
+    if not math.isclose(planner.total_cost, fresh, rel_tol=1e-9) or not check(planner, tables):
+        failures += 1
+        print(f"price filled in: incremental {planner.total_cost} != full replan {fresh}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=4000)
+    parser.add_argument("--products", type=int, default=300)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        products = write_synthetic_sde(f"{tmp}/sde", n_items=args.items)
+        tables = import_sde(f"{tmp}/sde", f"{tmp}/tables")
+        all_types = tables.type_ids.tolist()
+        blueprint_ids = tables.type_ids[tables.blueprint_type].tolist()
+        targets = {type_id: rng.randint(1, 20) for type_id in rng.sample(products, args.products)}
+        inventory = {type_id: rng.randint(0, 500) for type_id in rng.sample(all_types, 500)}
+        prices = {type_id: rng.uniform(1, 1e6) for type_id in all_types}
+
+        start = time.perf_counter()
+        planner = IncrementalPlanner(BOMEngine(tables, Modifiers(default_me=10)), targets, inventory, prices)
+        full = time.perf_counter() - start
+        print(f"initial plan        {full * 1000:8.1f}ms  {len(planner.demand)} nodes")
+
+        failures = 0
+        timings = {"price": [], "inventory": [], "me": [], "target": []}
+        counts = {kind: [] for kind in timings}
+        for i in range(args.rounds):
+            kind = rng.choice(tuple(timings))
+            if kind == "price":
+                planner.set_price(rng.choice(all_types), rng.uniform(1, 1e6))
+            elif kind == "inventory":
+                planner.set_inventory(rng.choice(all_types), rng.randint(0, 500))
+            elif kind == "me":
+                planner.set_me(rng.choice(blueprint_ids), rng.randint(0, 10))
+            else:
+                planner.set_target(rng.choice(products), rng.randint(0, 20))
+            start = time.perf_counter()
+            counts[kind].append(planner.update())
+            timings[kind].append(time.perf_counter() - start)
+            if i % 10 == 0 and not check(planner, tables):
+                failures += 1
+                print(f"round {i} ({kind}): mismatch with full replan")
+
+        if not check(planner, tables):
+            failures += 1
+            print("final state: mismatch with full replan")
+        failures += check_missing_price(planner, tables, rng)
+
+        start = time.perf_counter()
+        rebuild(planner, tables)
+        print(f"full replan         {(time.perf_counter() - start) * 1000:8.1f}ms")
+        for kind, values in timings.items():
+            if values:
+                print(f"{kind:10} change    {np.mean(values) * 1000:8.2f}ms avg  "
+                      f"{np.mean(counts[kind]):8.1f} nodes recomputed")
+    print(f"{failures} mismatches")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
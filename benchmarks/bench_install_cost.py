@@ -0,0 +1,114 @@
+"""
+安装费基准：本地ESI替身提供成本指数与调整价格，对数千个任务一次向量化计算安装费
+
+与逐个任务查字典的参考实现对比结果。
+
+运行: python -m benchmarks.bench_install_cost [--jobs 5000] [--systems 8000]
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.mock_esi import MockESIHandler, start_mock_esi
+from benchmarks.synthetic_sde import write_synthetic_sde
+from ESI_interface.esi_client import ESIClient
+from ESI_interface.industry_costs import IndustryCostRefresher
+from mrp_engine.bom import REACTION
+from mrp_engine.install_cost import IndustryCostTables, job_install_costs
+from mrp_engine.job_scheduler import Job
+from mrp_engine.sde import import_sde
+
+
+class IndustryHandler(MockESIHandler):
+    """/industry/systems/ 与 /markets/prices/"""
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.calls += 1
+        if self.path.startswith("/industry/systems/"):
+            self._send_json(server.systems)
+        elif self.path.startswith("/markets/prices/"):
+            self._send_json(server.prices)
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+
+def reference(systems, prices, tables, jobs, system_id, facility_tax, scc_surcharge):
+    """逐任务字典查找的参考实现"""
+    index = {row["solar_system_id"]: {entry["activity"]: entry["cost_index"] for entry in row["cost_indices"]}
+             for row in systems}
+    adjusted = {row["type_id"]: row["adjusted_price"] for row in prices}
+    type_ids = tables.type_ids.tolist()
+    costs = []
+    for job in jobs:
+        item = int(tables.type_index(job.type_id))
+        name = "reaction" if job.activity == "reaction" else "manufacturing"
+        materials, quantities = tables.materials(int(tables.producer_bp[item]), name)
+        eiv = sum(int(q) * adjusted.get(type_ids[m], 0.0) for m, q in zip(materials, quantities)) * job.runs
+        costs.append(eiv * (index[system_id][name] + facility_tax + scc_surcharge))
+    return np.array(costs)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=5000)
+    parser.add_argument("--systems", type=int, default=8000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        write_synthetic_sde(f"{tmp}/sde", n_items=2000)
+        tables = import_sde(f"{tmp}/sde", f"{tmp}/tables")
+        systems = [{"solar_system_id": 30000000 + i,
+                    "cost_indices": [{"activity": name, "cost_index": rng.uniform(0.001, 0.15)}
+                                     for name in ("manufacturing", "reaction", "invention", "copying",
+                                                  "researching_time_efficiency",
+                                                  "researching_material_efficiency")]}
+                   for i in range(args.systems)]
+        prices = [{"type_id": int(type_id), "adjusted_price": rng.uniform(1, 1e6),
+                   "average_price": rng.uniform(1, 1e6)} for type_id in tables.type_ids]
+
+        server, url = start_mock_esi(expires_in=3600, handler=IndustryHandler)
+        server.systems, server.prices = systems, prices
+        client = ESIClient(base_url=url)
+        costs = IndustryCostTables(tables)
+        refresher = IndustryCostRefresher(client, costs)
+        start = time.perf_counter()
+        refresher.refresh_sync()
+        print(f"refresh           {(time.perf_counter() - start) * 1000:8.1f}ms  "
+              f"{len(costs.system_ids)} systems, expires in {refresher.expires - time.time():.0f}s")
+
+        producible = np.flatnonzero(np.asarray(tables.producer_bp) >= 0)
+        jobs = []
+        for job_id in range(args.jobs):
+            item = int(rng.choice(producible))
+            activity = "reaction" if tables.producer_activity[item] == REACTION else "manufacturing"
+            jobs.append(Job(job_id, int(tables.type_ids[item]), activity, rng.randint(1, 300), 3600))
+        system_id = 30000000 + rng.randrange(args.systems)
+
+        start = time.perf_counter()
+        costs.eiv_per_run
+        print(f"eiv table         {(time.perf_counter() - start) * 1000:8.1f}ms")
+        calls = server.calls
+        start = time.perf_counter()
+        vectorized = job_install_costs(costs, jobs, system_id, facility_tax=0.01)
+        print(f"install cost      {(time.perf_counter() - start) * 1000:8.1f}ms  {len(jobs)} jobs, "
+              f"{server.calls - calls} requests")
+
+        start = time.perf_counter()
+        expected = reference(systems, prices, tables, jobs, system_id, 0.01, 0.04)
+        print(f"dict reference    {(time.perf_counter() - start) * 1000:8.1f}ms")
+        mismatches = int((~np.isclose(vectorized, expected, rtol=1e-9)).sum())
+        print(f"mismatches        {mismatches}")
+        client.close()
+        server.shutdown()
+        sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+跳数表基准：合成星图上构建所有星系两两跳数，并测量批量查询
+
+抽样若干起点，与逐星系的普通BFS结果对比。
+
+运行: python -m benchmarks.bench_jump_index [--systems 5400] [--queries 100000]
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from collections import deque
+
+import numpy as np
+
+from benchmarks.synthetic_sde import write_synthetic_map
+from mrp_engine.jump_index import UNREACHABLE, VARIANTS, build_jump_index, rounded_security
+
+
+def bfs(index, source, allowed):
+    """普通BFS参考实现"""
+    indptr = np.asarray(index["indptr"])
+    neighbours = index["neighbours"]
+    dist = np.full(len(allowed), UNREACHABLE, dtype=np.uint8)
+    if not allowed[source]:
+        return dist
+    dist[source] = 0
+    queue = deque([source])
+    while queue:
+        u = queue.popleft()
+        for v in neighbours[indptr[u]:indptr[u + 1]]:
+            if allowed[v] and dist[v] == UNREACHABLE:
+                dist[v] = dist[u] + 1
+                queue.append(v)
+    return dist
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--systems", type=int, default=5400)
+    parser.add_argument("--queries", type=int, default=100000)
+    parser.add_argument("--samples", type=int, default=30)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        system_ids = write_synthetic_map(f"{tmp}/sde", n_systems=args.systems)
+        start = time.perf_counter()
+        jumps = build_jump_index(f"{tmp}/sde", f"{tmp}/jumps")
+        print(f"build ({len(VARIANTS)} variants) {(time.perf_counter() - start) * 1000:8.1f}ms  "
+              f"{jumps.n_systems} systems, {jumps.jumps['all'].nbytes / 2 ** 20:.1f} MiB per variant")
+
+        graph = {"indptr": np.load(f"{tmp}/jumps/gate_indptr.npy"),
+                 "neighbours": np.load(f"{tmp}/jumps/gate_neighbours.npy").tolist()}
+        displayed = rounded_security(jumps.security)
+        mismatches = 0
+        for name, min_security in VARIANTS.items():
+            allowed = np.ones(jumps.n_systems, dtype=bool) if min_security is None else displayed >= min_security
+            for source in rng.sample(range(jumps.n_systems), args.samples):
+                mismatches += int((bfs(graph, source, allowed) != jumps.jumps[name][source]).sum())
+        print(f"mismatches vs BFS {mismatches}")
+
+        origins = np.array(rng.choices(system_ids, k=args.queries))
+        destinations = np.array(rng.choices(system_ids, k=args.queries))
+        for name in VARIANTS:
+            start = time.perf_counter()
+            distance = jumps.distance(origins, destinations, name)
+            elapsed = time.perf_counter() - start
+            reachable = distance < UNREACHABLE
+            print(f"{name:17} {elapsed * 1000:8.1f}ms  {args.queries} pairs "
+                  f"({elapsed / args.queries * 1e6:.3f}us/pair), {reachable.mean():.1%} reachable, "
+                  f"mean {distance[reachable].mean():.1f} jumps")
+        sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+市场订单流式写入基准：峰值内存不随订单数增长
+
+每个规模在单独的子进程中运行：从本地ESI替身抓取一个星域的全部订单写入临时数据库，
+再抓取一次价格变化后的快照（走更新路径），报告峰值RSS。
+Linux上同时采样匿名内存（RssAnon）的峰值：数据库文件的内存映射页计入RSS但可以回收，
+匿名内存才是堆和SQLite页缓存、临时表的占用。页缓存有上限（PRAGMA cache_size），
+大规模与小规模的匿名内存峰值之差超过页缓存上限加10MB时失败（例如临时表被放进内存）。
+
+运行: python -m benchmarks.bench_market_orders [--sizes 50000 400000] [--max-growth MB]
+"""
+import argparse
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.mock_esi import start_mock_esi
+from database_interface import db_info
+from ESI_interface.esi_client import ESIClient
+from ESI_interface.market_orders import ingest_region_orders
+from ESI_interface.rate_governor import RateGovernor
+
+PAGE_SIZE = 1000
+REGION_ID = 10000002
+
+
+def order_row(page: int, row: int, version: int) -> dict:
+    # 每个快照约十分之一的订单改价
+    price = 1000.0 + row % 997 + (version if row % 10 == 0 else 0)
+    return {"order_id": 6000000000 + row, "type_id": 34 + row % 5000, "location_id": 60003760,
+            "system_id": 30000142, "is_buy_order": row % 3 == 0, "price": price,
+            "volume_remain": 1 + row % 1000, "volume_total": 1000, "min_volume": 1, "range": "region",
+            "duration": 90, "issued": "2024-01-01T00:00:00Z"}
+
+
+def peak_rss_mb() -> float:
+    # Linux上ru_maxrss以KB为单位，macOS上以字节为单位
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def cache_limit_mb() -> float:
+    """每个连接的SQLite页缓存上限（MB）：负的cache_size以KiB为单位，正的以页（默认4096字节）为单位"""
+    size = dict(db_info.PRAGMAS).get("cache_size", -2000)
+    return (-size if size < 0 else size * 4) / 1024
+
+
+def anon_rss_mb() -> float:
+    """当前匿名内存（MB），不支持时为NaN"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("RssAnon:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+class AnonPeak:
+    """后台线程每10ms采样一次匿名内存，记录峰值"""
+
+    def __init__(self):
+        self.peak = anon_rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(0.01):
+            self.peak = max(self.peak, anon_rss_mb())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, anon_rss_mb())
+
+
+def run_child(orders: int):
+    """在当前进程中抓取两次快照，输出 "订单数 秒数 峰值RSS(MB) 峰值匿名内存(MB)" """
+    server, base_url = start_mock_esi(pages=orders // PAGE_SIZE, page_size=PAGE_SIZE, row_factory=order_row)
+    # 单独的宽松调度器：这里测量写入，不测量限速
+    client = ESIClient(base_url=base_url, governor=RateGovernor(default_rate=10000, default_burst=10000))
+    with tempfile.TemporaryDirectory() as tmp:
+        db_info.configure(os.path.join(tmp, "orders.db"))
+        try:
+            with AnonPeak() as anon:
+                start = time.perf_counter()
+                first = asyncio.run(ingest_region_orders(client, REGION_ID))
+                server.version += 1
+                second = asyncio.run(ingest_region_orders(client, REGION_ID))
+                elapsed = time.perf_counter() - start
+        finally:
+            db_info.configure()
+    client.close()
+    server.shutdown()
+    assert first["inserted"] == first["total"] == orders, first
+    assert second["updated"] and not second["inserted"] and not second["deleted"], second
+    print(orders, f"{elapsed:.3f}", f"{peak_rss_mb():.1f}", f"{anon.peak:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50000, 400000])
+    parser.add_argument("--max-growth", type=float, default=None,
+                        help="最大规模相对最小规模允许增加的匿名内存峰值（MB），默认为页缓存上限加10MB")
+    parser.add_argument("--child", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child is not None:
+        run_child(args.child)
+        return
+    if args.max_growth is None:
+        args.max_growth = cache_limit_mb() + 10
+
+    peaks = {}
+    for orders in sorted(args.sizes):
+        output = subprocess.run([sys.executable, "-m", "benchmarks.bench_market_orders", "--child", str(orders)],
+                                check=True, capture_output=True, text=True).stdout
+        elapsed, peak, anon = map(float, output.split()[-3:])
+        # 没有匿名内存数据的平台退回到峰值RSS
+        peaks[orders] = peak if anon != anon else anon
+        print(f"{orders:8} orders x2 snapshots  {elapsed:7.2f}s  {orders * 2 / elapsed:10,.0f} orders/s  "
+              f"peak RSS {peak:6.1f}MB  peak anon {anon:6.1f}MB")
+
+    growth = peaks[max(peaks)] - peaks[min(peaks)]
+    print(f"peak memory growth {growth:.1f}MB (limit {args.max_growth}MB)")
+    sys.exit(1 if growth > args.max_growth else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+名称解析基准：50k个id经 /universe/names/ 批量解析，再从SQLite和内存LRU读取
+
+每批最多1000个id；混入少量无效id，检查拆分重试只丢弃无效的id。
+数据库使用临时目录中的文件，不碰 ./database.db。
+
+运行: python -m benchmarks.bench_name_resolver [--ids 50000] [--invalid 5] [--latency 0.05] [--max-seconds 10]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.mock_esi import start_mock_esi
+from database_interface import db_info
+from ESI_interface.esi_client import ESIClient
+from ESI_interface.name_resolver import NameResolver
+
+
+def timed(resolver: NameResolver, ids):
+    start = time.perf_counter()
+    result = resolver.resolve_sync(ids)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ids", type=int, default=50000)
+    parser.add_argument("--invalid", type=int, default=5, help="混入的无效id个数（模拟ESI对整批返回404）")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--max-seconds", type=float, default=10.0, help="首次（经ESI）解析允许的最长时间")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    valid = rng.sample(range(1, 100000000), args.ids)
+    ids = valid + [-(i + 1) for i in range(args.invalid)]
+    rng.shuffle(ids)
+
+    server, base_url = start_mock_esi(latency=args.latency)
+    client = ESIClient(base_url=base_url)
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        db_info.configure(os.path.join(tmp, "names.db"))
+        try:
+            results = {}
+            results["esi"] = timed(NameResolver(client), ids)
+            calls = server.calls
+            # 新的解析器没有LRU，全部从SQLite读取（无效id不会被记住，之后只请求有效id）
+            resolver = NameResolver(client)
+            results["sqlite"] = timed(resolver, valid)
+            results["lru"] = timed(resolver, valid)
+        finally:
+            db_info.configure()
+    client.close()
+
+    print(f"{args.ids} ids ({args.invalid} invalid), {args.latency * 1000:.0f}ms server latency")
+    for label, (result, elapsed) in results.items():
+        print(f"{label:7} {elapsed:7.2f}s  {len(result) / elapsed:10,.0f} ids/s  {len(result)} resolved")
+        if set(result) != set(valid):
+            failures += 1
+            print(f"{label}: expected {len(valid)} resolved ids, got {len(result)}")
+    print(f"ESI requests {calls}, after warm-up {server.calls - calls}")
+    if server.calls != calls:
+        failures += 1
+    if results["esi"][1] > args.max_seconds:
+        failures += 1
+        print(f"resolving via ESI took longer than {args.max_seconds}s")
+    server.shutdown()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
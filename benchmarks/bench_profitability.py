@@ -0,0 +1,57 @@
+"""
+全目录盈利扫描基准：合成SDE + 随机价格
+
+运行: python -m benchmarks.bench_profitability [--items 4000]
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic_sde import write_synthetic_sde
+from mrp_engine.bom import Modifiers
+from mrp_engine.bom_batch import BatchBOMSolver
+from mrp_engine.profitability import PriceSnapshot, ProfitabilityScanner
+from mrp_engine.sde import import_sde
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=4000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_synthetic_sde(f"{tmp}/sde", n_items=args.items)
+        tables = import_sde(f"{tmp}/sde", f"{tmp}/tables")
+        rng = np.random.default_rng(0)
+
+        start = time.perf_counter()
+        solver = BatchBOMSolver(tables, Modifiers(default_me=10, structure_me=0.01, rig_me=0.042))
+        scanner = ProfitabilityScanner(solver)
+        print(f"build solver      {(time.perf_counter() - start) * 1000:8.1f}ms")
+
+        # 价格大致随生产层级增长
+        heights = np.zeros(tables.n_types)
+        heights[solver.columns] = solver.heights
+        base = 5.0 * 10 ** (heights * 1.5)
+        sell = base * rng.uniform(0.5, 2.0, tables.n_types)
+        snapshot = PriceSnapshot(tables, {"sell": sell, "buy": sell * 0.9, "adjusted": sell * 0.95})
+
+        for label in ("first scan", "same snapshot"):
+            start = time.perf_counter()
+            result = scanner.scan(snapshot)
+            print(f"{label:17} {(time.perf_counter() - start) * 1000:8.1f}ms  {len(result)} products")
+
+        snapshot = snapshot.with_source("sell", sell * rng.uniform(0.9, 1.1, tables.n_types))
+        start = time.perf_counter()
+        scanner.scan(snapshot)
+        print(f"new snapshot      {(time.perf_counter() - start) * 1000:8.1f}ms")
+
+        for row in result.ranked("isk_per_hour", top=5):
+            print(f"  {row['type_ids']}: profit {row['profit']:14,.0f}  margin {row['margin']:6.1%}  "
+                  f"{row['isk_per_hour']:14,.0f} ISK/h")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+SSO请求往返时间基准：每次新建连接 vs EVESSO自带的连接池
+
+运行: python -m benchmarks.bench_sso_session [--requests 200] [--certfile cert.pem --keyfile key.pem]
+传入TLS证书时替身服务器走HTTPS，更接近真实的握手开销。
+"""
+import argparse
+import statistics
+import time
+
+import requests
+import urllib3
+
+from benchmarks.mock_sso import start_mock_sso
+from ESI_interface.esi_sso import EVESSO
+
+
+def _summary(label: str, samples: list):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{label:<12} mean={statistics.mean(samples) * 1000:7.3f}ms "
+          f"p50={statistics.median(samples) * 1000:7.3f}ms p95={p95 * 1000:7.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--certfile")
+    parser.add_argument("--keyfile")
+    args = parser.parse_args()
+
+    server, base_url = start_mock_sso(certfile=args.certfile, keyfile=args.keyfile)
+    token_url = f"{base_url}/v2/oauth/token"
+    verify = not args.certfile
+    if not verify:
+        urllib3.disable_warnings()
+
+    sso = EVESSO("bench-client", "bench-secret", "http://localhost/callback")
+    sso.TOKEN_URL = token_url
+    sso.session.verify = verify
+    sso.session.trust_env = False
+    headers = {"Authorization": sso.get_base64_code(),
+               "Content-Type": "application/x-www-form-urlencoded"}
+    data = {"grant_type": "refresh_token", "refresh_token": "bench"}
+
+    # 改造前：模块级requests.post，每次都新建连接
+    before = []
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        requests.post(token_url, headers=headers, data=data, timeout=30, verify=verify).json()
+        before.append(time.perf_counter() - start)
+
+    # 改造后：EVESSO复用连接池
+    after = []
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        sso.refresh_access_token("bench")
+        after.append(time.perf_counter() - start)
+
+    print(f"{args.requests} refresh round trips against {base_url}")
+    _summary("before", before)
+    _summary("after", after)
+    sso.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+from urllib.parse import parse_qs, urlsplit
+
+
+class MockESIHandler(BaseHTTPRequestHandler):
+    """本地ESI替身：任意GET路径返回JSON，模拟固定延迟、Expires/ETag和304"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status: int = 200, headers: dict = None):
+        body = json.dumps(payload).encode()
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if self.server.expires_in:
+            headers = dict(headers or {})
+            headers.setdefault("ETag", etag)
+            headers.setdefault("Expires", formatdate(time.time() + self.server.expires_in, usegmt=True))
+            if self.headers.get("If-None-Match") == etag:
+                with self.server.lock:
+                    self.server.not_modified += 1
+                status, body = 304, b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.calls += 1
+        if server.latency:
+            time.sleep(server.latency)
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        if server.hook is not None:
+            server.hook(server, url.path, query)
+        if server.pages:
+            # 分页接口：每页page_size行，带X-Pages与Last-Modified
+            page = int(query.get("page", ["1"])[0])
+            start = (page - 1) * server.page_size
+            rows = [server.row_factory(page, start + i, server.version) for i in range(server.page_size)]
+            self._send_json(rows, headers={"X-Pages": str(server.pages),
+                                           "Last-Modified": formatdate(server.version, usegmt=True)})
+            return
+        self._send_json({"path": url.path})
+
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"null")
+        with server.lock:
+            server.calls += 1
+        if server.latency:
+            time.sleep(server.latency)
+        if urlsplit(self.path).path == "/universe/names/":
+            # 任何一个id无效（负数）时整批返回404，与ESI行为一致
+            if any(id_ < 0 for id_ in body):
+                self._send_json({"error": "Ensure all IDs are valid before resolving."}, status=404)
+                return
+            self._send_json([{"id": id_, "name": f"Name {id_}", "category": "inventory_type"}
+                             for id_ in body])
+            return
+        self._send_json({"error": "not found"}, status=404)
+
+
+def start_mock_esi(latency: float = 0.0, expires_in: float = 0, pages: int = 0, page_size: int = 1000,
+                   hook=None, row_factory=None, handler=MockESIHandler) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    在后台线程启动本地ESI替身
+
+    :param latency: 每个请求的模拟延迟（秒）
+    :param expires_in: 大于0时响应带Expires与ETag，并对匹配的If-None-Match返回304
+    :param pages: 大于0时模拟分页接口的总页数
+    :param page_size: 每页行数
+    :param hook: hook(server, path, query)，每个请求前调用，可用来修改server.version模拟数据更新
+    :param row_factory: row_factory(page, row, version) 生成分页中的一行
+    :param handler: 请求处理类
+    :return: (服务器对象, 基础URL)
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    server.request_queue_size = 256
+    server.lock = threading.Lock()
+    server.calls = 0
+    server.latency = latency
+    server.expires_in = expires_in
+    server.not_modified = 0
+    server.pages = pages
+    server.page_size = page_size
+    server.version = 1700000000
+    server.hook = hook
+    server.row_factory = row_factory or (lambda page, row, version: {"page": page, "row": row, "version": version})
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    return server, f"http://{host}:{port}"
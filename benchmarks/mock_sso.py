@@ -0,0 +1,85 @@
+import json
+import ssl
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+
+
+class MockSSOHandler(BaseHTTPRequestHandler):
+    """本地SSO替身：/v2/oauth/token 与 /oauth/verify"""
+
+    protocol_version = "HTTP/1.1"   # 支持keep-alive
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload: dict, status: int = 200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        server = self.server
+        with server.lock:
+            server.token_calls += 1
+            serial = server.token_calls
+        if server.latency:
+            time.sleep(server.latency)
+        self._send_json({
+            "access_token": f"access-{serial}",
+            "refresh_token": f"refresh-{serial}",
+            "expires_in": 1199,
+            "token_type": "Bearer",
+        })
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.verify_calls += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self._send_json({
+            "CharacterID": 90000001,
+            "CharacterName": "Mock Pilot",
+            "ExpiresOn": "2030-01-01T00:00:00",
+            "Scopes": "publicData",
+            "TokenType": "Character",
+            "CharacterOwnerHash": "mock-owner-hash",
+            "IntellectualProperty": "EVE",
+        })
+
+
+def start_mock_sso(latency: float = 0.0,
+                   certfile: Optional[str] = None,
+                   keyfile: Optional[str] = None) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    在后台线程启动本地SSO替身
+
+    :param latency: 每个请求的模拟处理延迟（秒）
+    :param certfile: 可选的TLS证书，用于模拟真实的握手开销
+    :param keyfile: 可选的TLS私钥
+    :return: (服务器对象, 基础URL)
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockSSOHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.token_calls = 0
+    server.verify_calls = 0
+    server.latency = latency
+
+    scheme = "http"
+    if certfile:
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(certfile, keyfile)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        scheme = "https"
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    return server, f"{scheme}://{host}:{port}"
@@ -0,0 +1,92 @@
+"""
+并发刷新合并压力测试
+
+大量线程同时对少数角色调用 TokenRefreshScheduler.refresh_now，
+本地SSO替身统计上游令牌请求数，每轮每个角色只应产生一次请求。
+测试角色写入临时目录中的数据库，不碰 ./database.db。
+
+运行: python -m benchmarks.stress_single_flight [--threads 64] [--characters 4] [--rounds 20]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from benchmarks.mock_sso import start_mock_sso
+from database_interface import db_info
+from ESI_interface.esi_sso import EVESSO
+from ESI_interface.token_scheduler import TokenRefreshScheduler
+from ESI_interface.token_vault import TokenVault
+
+
+def stress(args):
+    server, base_url = start_mock_sso(latency=args.latency)
+    sso = EVESSO("stress-client", "stress-secret", "http://localhost/callback")
+    sso.TOKEN_URL = f"{base_url}/v2/oauth/token"
+
+    scheduler = TokenRefreshScheduler(sso, TokenVault())
+    for character_id in range(args.characters):
+        scheduler.add({"character_id": character_id, "character_name": f"Pilot {character_id}",
+                       "owner_hash": f"owner-{character_id}", "access_token": "expired",
+                       "refresh_token": f"initial-{character_id}", "expires_at": 0})
+
+    barrier = threading.Barrier(args.threads)
+    errors = []
+    results = {}
+    results_lock = threading.Lock()
+
+    def worker(index: int):
+        character_id = index % args.characters
+        for round_no in range(args.rounds):
+            barrier.wait()
+            try:
+                token = scheduler.refresh_now(character_id)
+            except Exception as e:
+                errors.append(e)
+            else:
+                with results_lock:
+                    results.setdefault((round_no, character_id), set()).add(token)
+            # 等所有线程拿到结果再进入下一轮
+            barrier.wait()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    callers = args.threads * args.rounds
+    expected = args.characters * args.rounds
+    print(f"{callers} refresh calls -> {server.token_calls} upstream requests "
+          f"(expected {expected}) in {elapsed:.2f}s")
+
+    assert not errors, errors
+    assert server.token_calls == expected, server.token_calls
+    # 同一轮同一角色的所有调用者拿到的是同一个令牌
+    assert all(len(tokens) == 1 for tokens in results.values())
+
+    sso.close()
+    server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--characters", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_info.configure(os.path.join(tmp, "stress.db"))
+        try:
+            stress(args)
+        finally:
+            db_info.configure()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+生成分层的合成SDE（JSONL），供BOM相关基准使用
+
+物品分为若干层：第0层为原材料，第k层的产品只使用更低层的物品；
+蓝图随机设置产出数量、单次流程上限，少部分中间产品为反应。
+另可生成合成星图（星系与星门），供跳数表基准使用。
+"""
+import json
+import math
+import os
+import random
+from typing import List
+
+
+RAW_GROUP, INTERMEDIATE_GROUP, PRODUCT_GROUP = 18, 334, 25
+CATEGORIES = {4: "Material", 6: "Ship", 9: "Blueprint", 24: "Reaction"}
+GROUPS = {RAW_GROUP: 4, INTERMEDIATE_GROUP: 4, PRODUCT_GROUP: 6, 105: 9, 1888: 24}
+
+
+def write_synthetic_sde(path: str, n_raw: int = 60, n_items: int = 4000, levels: int = 5,
+                        reaction_share: float = 0.1, seed: int = 0) -> List[int]:
+    """
+    写出合成SDE，返回可制造的最终产品type_id列表
+
+    :param path: 输出目录
+    :param n_raw: 原材料数量
+    :param n_items: 可生产物品数量（均分到各层）
+    :param levels: 生产层数
+    :param reaction_share: 通过反应生产的中间产品比例
+    :param seed: 随机种子
+    """
+    rng = random.Random(seed)
+    os.makedirs(path, exist_ok=True)
+    types = {}
+    blueprints = {}
+    layers = [[1000 + i for i in range(n_raw)]]
+    raw = set(layers[0])
+    for type_id in layers[0]:
+        types[type_id] = {"groupID": RAW_GROUP, "portionSize": 1, "volume": 0.01, "published": True}
+
+    next_id = 100000
+    per_level = max(n_items // levels, 1)
+    for level in range(1, levels + 1):
+        layer = []
+        lower = [type_id for layer_ in layers for type_id in layer_]
+        for _ in range(per_level):
+            type_id, blueprint_id = next_id, next_id + 1
+            next_id += 2
+            reaction = level < levels and rng.random() < reaction_share
+            group = PRODUCT_GROUP if level == levels else INTERMEDIATE_GROUP
+            types[type_id] = {"groupID": group, "portionSize": 1, "volume": 1.0, "published": True}
+            types[blueprint_id] = {"groupID": 1888 if reaction else 105, "portionSize": 1, "volume": 0.01,
+                                   "published": True}
+            # 至少使用一个紧邻下层的物品，保证层数
+            # 原材料用量大，中间产品用量小（与游戏中矿物 / 组件的比例相近）
+            materials = {rng.choice(layers[-1]): rng.randint(1, 40) if level > 1 else rng.randint(100, 5000)}
+            for material in rng.sample(lower, min(len(lower), rng.randint(2, 10))):
+                if material in raw:
+                    quantity = rng.choice((1, 5, 40, 150, 1000, 20000))
+                else:
+                    quantity = rng.choice((1, 1, 2, 3, 5, 10, 40))
+                materials.setdefault(material, quantity)
+            activity = {
+                "time": rng.randint(60, 36000),
+                "materials": [{"typeID": m, "quantity": q} for m, q in materials.items()],
+                "products": [{"typeID": type_id, "quantity": rng.choice((1, 1, 1, 10, 100, 200))}],
+            }
+            blueprints[blueprint_id] = {"blueprintTypeID": blueprint_id,
+                                        "maxProductionLimit": rng.choice((10, 100, 300, 1000)),
+                                        "activities": {"reaction" if reaction else "manufacturing": activity}}
+            layer.append(type_id)
+        layers.append(layer)
+
+    for name, records in (("categories", {k: {"name": {"en": v}} for k, v in CATEGORIES.items()}),
+                          ("groups", {k: {"categoryID": v} for k, v in GROUPS.items()}),
+                          ("types", types), ("blueprints", blueprints)):
+        with open(os.path.join(path, f"{name}.jsonl"), "w") as f:
+            for key, record in records.items():
+                f.write(json.dumps({"_key": key, **record}) + "\n")
+    return layers[-1]
+
+
+def write_synthetic_map(path: str, n_systems: int = 5400, n_wormholes: int = 200, seed: int = 0) -> List[int]:
+    """
+    写出合成星图 mapSolarSystems / mapStargates，返回k-space星系ID列表
+
+    星系排成一条环，每个星系连接环上的下一个星系以及少量附近和远处的星系；
+    安全等级沿环缓慢变化，形成连续的高安/低安/00区域。虫洞星系没有星门。
+    """
+    rng = random.Random(seed)
+    os.makedirs(path, exist_ok=True)
+    system_ids = [30000001 + i for i in range(n_systems)]
+    systems = {}
+    for i, system_id in enumerate(system_ids):
+        phase = i / n_systems * 2 * math.pi * 3
+        systems[system_id] = {"securityStatus": round(math.cos(phase) + rng.uniform(-0.15, 0.15), 4)}
+    for i in range(n_wormholes):
+        systems[31000001 + i] = {"securityStatus": -1.0}
+
+    links = set()
+    for i in range(n_systems):
+        links.add((i, (i + 1) % n_systems))
+        if rng.random() < 0.3:
+            links.add((i, (i + rng.randint(2, 30)) % n_systems))
+        if rng.random() < 0.01:
+            links.add((i, rng.randrange(n_systems)))
+    gates = {}
+    next_gate = 50000000
+    for a, b in links:
+        if a == b:
+            continue
+        gate_a, gate_b = next_gate, next_gate + 1
+        next_gate += 2
+        gates[gate_a] = {"solarSystemID": system_ids[a],
+                         "destination": {"solarSystemID": system_ids[b], "stargateID": gate_b}}
+        gates[gate_b] = {"solarSystemID": system_ids[b],
+                         "destination": {"solarSystemID": system_ids[a], "stargateID": gate_a}}
+
+    for name, records in (("mapSolarSystems", systems), ("mapStargates", gates)):
+        with open(os.path.join(path, f"{name}.jsonl"), "w") as f:
+            for key, record in records.items():
+                f.write(json.dumps({"_key": key, **record}) + "\n")
+    return system_ids
@@ -1,31 +1,156 @@
+import atexit
+import os
+import shutil
 import sqlite3
+import tempfile
+import threading
 
-DATABASE_PATH = 'database.db'
+# 数据库文件：环境变量 EVE_MRP_DB_PATH 或 configure()；":memory:" 为进程内的临时数据库（测试用）
+DATABASE_PATH = os.environ.get('EVE_MRP_DB_PATH', 'database.db')
+MEMORY = ':memory:'
 
-def get_db_connection():
-    conn = sqlite3.connect(DATABASE_PATH)
+# 每个连接打开时设置的PRAGMA
+PRAGMAS = (
+    ('journal_mode', 'WAL'),        # 读写不互相阻塞
+    ('synchronous', 'NORMAL'),      # WAL下只在检查点fsync
+    ('cache_size', -32000),         # 页缓存约32MB
+    ('mmap_size', 268435456),       # 最多映射256MB
+    # temp_store保持默认（文件）：MarketOrderSnapshot的临时暂存表可达数十万行，放在内存会抬高峰值内存
+)
+
+_lock = threading.Lock()
+_initialized = set()
+_memory = {'directory': None}
+
+
+def _database(path):
+    """
+    实际打开的数据库文件
+
+    ":memory:" 映射为系统临时目录中的一个临时文件，configure() 或进程退出时删除。
+    不使用SQLite的共享缓存内存库：共享缓存的表锁返回SQLITE_LOCKED，busy_timeout不会重试，
+    多个线程同时写入时直接报 "database table is locked"；临时文件与普通数据库的并发行为一致。
+    """
+    if path != MEMORY:
+        return path
+    with _lock:
+        if _memory['directory'] is None:
+            _memory['directory'] = tempfile.mkdtemp(prefix='eve_mrp_db_')
+        return os.path.join(_memory['directory'], 'database.db')
+
+
+def _discard_memory():
+    directory, _memory['directory'] = _memory['directory'], None
+    if directory is not None:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+atexit.register(_discard_memory)
+
+
+def _connect(path=None, timeout=30.0, cached_statements=256):
+    conn = sqlite3.connect(_database(path or DATABASE_PATH), timeout=timeout, cached_statements=cached_statements,
+                           check_same_thread=False)
+    for name, value in PRAGMAS:
+        conn.execute(f'PRAGMA {name} = {value}')
     return conn
 
-def initialize_sso_table():
-    with get_db_connection() as conn:
-        c = conn.cursor()
-        c.execute('''
-        CREATE TABLE IF NOT EXISTS sso_configurations (
-            client_id TEXT NOT NULL,
-            client_secret TEXT NOT NULL,
-            callback_url TEXT NOT NULL,
-            scope TEXT NOT NULL
-        )
-        ''')
-        c.execute('''
-        CREATE TABLE IF NOT EXISTS Character_info (
-            character_id TEXT NOT NULL,
-            character_name TEXT NOT NULL,
-            Character_owner_hash TEXT NOT NULL,
-            access_token TEXT NOT NULL,
-            refresh_token TEXT NOT NULL   
-        )
-        ''')
-        conn.commit()
-        
-initialize_sso_table()
\ No newline at end of file
+
+def initialize_database(path=None):
+    """
+    建立或升级数据库结构（见 migrations.MIGRATIONS）
+
+    第一次取得连接时会自动调用；需要在启动时就发现结构问题时可以显式调用。
+    """
+    from .migrations import migrate
+    path = path or DATABASE_PATH
+    with _lock:
+        if path in _initialized:
+            return []
+    applied = migrate(path)
+    with _lock:
+        _initialized.add(path)
+    return applied
+
+
+def configure(path=None):
+    """
+    切换数据库文件，关闭所有已打开的长期连接；结构在下次取得连接时初始化
+
+    :param path: 数据库文件或 ":memory:"（每次配置得到一个新的临时数据库），
+                 为空时重新读取环境变量 EVE_MRP_DB_PATH
+    """
+    global DATABASE_PATH
+    connections.close_all()
+    with _lock:
+        DATABASE_PATH = path or os.environ.get('EVE_MRP_DB_PATH', 'database.db')
+        _initialized.clear()
+        _discard_memory()
+
+
+def open_connection(path=None, timeout=30.0, cached_statements=256):
+    """
+    打开一个设置好PRAGMA的新连接（调用方负责关闭）
+
+    :param path: 数据库文件，默认为 DATABASE_PATH
+    :param timeout: 等待写锁的秒数
+    :param cached_statements: 每个连接缓存的预编译语句数
+    """
+    initialize_database(path)
+    return _connect(path, timeout, cached_statements)
+
+
+class ConnectionManager:
+    """
+    每个线程一个长期连接
+
+    同一线程反复调用 get() 得到同一个连接，连接上缓存的预编译语句因此可以复用；
+    fork后的子进程或 DATABASE_PATH 改变时重新打开；第一次打开时初始化数据库结构。
+    with get_db_connection() as conn: 仍然是成功提交、异常回滚，但不关闭连接。
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def get(self):
+        local = self._local
+        key = (os.getpid(), DATABASE_PATH)
+        conn = getattr(local, 'conn', None)
+        if conn is None or local.key != key:
+            conn = open_connection()
+            local.conn, local.key = conn, key
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self):
+        """关闭当前线程的连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.conn = None
+            with self._lock:
+                if conn in self._connections:
+                    self._connections.remove(conn)
+            conn.close()
+
+    def close_all(self):
+        """关闭所有线程的连接（程序退出或切换数据库时调用）"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                pass
+        self._local = threading.local()
+
+
+connections = ConnectionManager()
+
+
+def get_db_connection():
+    """当前线程的长期连接"""
+    return connections.get()
+
@@ -15,10 +15,108 @@ def load_sso_config():
             print(f"Error loading SSO configurations: {e}")
             return None
 
-def save_sso_config(client_id, client_secret, callback_url):
+def save_sso_config(client_id, client_secret, callback_url, scope=''):
     with get_db_connection() as conn:
         c = conn.cursor()
         c.execute('DELETE FROM sso_configurations')
-        c.execute('INSERT INTO sso_configurations (client_id, client_secret, callback_url) VALUES (?, ?, ?)',
-                  (client_id, client_secret, callback_url))
-        conn.commit()
\ No newline at end of file
+        c.execute('INSERT INTO sso_configurations (client_id, client_secret, callback_url, scope) '
+                  'VALUES (?, ?, ?, ?)', (client_id, client_secret, callback_url, scope))
+        conn.commit()
+
+def load_character_tokens():
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute('SELECT character_id, character_name, Character_owner_hash, access_token, refresh_token, '
+                  'expires_at FROM Character_info')
+        return [
+            {
+                'character_id': int(row[0]),
+                'character_name': row[1],
+                'owner_hash': row[2],
+                'access_token': row[3],
+                'refresh_token': row[4],
+                'expires_at': row[5],
+            }
+            for row in c.fetchall()
+        ]
+
+def load_character_token(character_id):
+    """按主键查询一个角色的令牌记录，不存在时返回None"""
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute('SELECT character_id, character_name, Character_owner_hash, access_token, refresh_token, '
+                  'expires_at FROM Character_info WHERE character_id = ?', (int(character_id),))
+        row = c.fetchone()
+        if row is None:
+            return None
+        return {'character_id': row[0], 'character_name': row[1], 'owner_hash': row[2],
+                'access_token': row[3], 'refresh_token': row[4], 'expires_at': row[5]}
+
+def update_character_tokens(tokens):
+    """批量写回令牌，tokens为 (character_id, access_token, refresh_token, expires_at) 列表"""
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.executemany('UPDATE Character_info SET access_token = ?, refresh_token = ?, expires_at = ? '
+                      'WHERE character_id = ?',
+                      [(access_token, refresh_token, expires_at, int(character_id))
+                       for character_id, access_token, refresh_token, expires_at in tokens])
+        conn.commit()
+
+def save_character_token(record):
+    """写入或替换一个角色的令牌记录"""
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        # 主键或owner hash冲突时替换旧记录
+        c.execute('INSERT OR REPLACE INTO Character_info (character_id, character_name, Character_owner_hash, '
+                  'access_token, refresh_token, expires_at) VALUES (?, ?, ?, ?, ?, ?)',
+                  (int(record['character_id']), record['character_name'], record['owner_hash'],
+                   record['access_token'], record['refresh_token'], record.get('expires_at') or 0))
+        conn.commit()
+
+def delete_character_token(character_id):
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute('DELETE FROM Character_info WHERE character_id = ?', (int(character_id),))
+        conn.commit()
+
+def load_cached_response(cache_key):
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute('SELECT etag, expires, headers, body FROM esi_response_cache WHERE cache_key = ?',
+                  (cache_key,))
+        return c.fetchone()
+
+def save_cached_response(cache_key, etag, expires, headers, body):
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute('INSERT OR REPLACE INTO esi_response_cache (cache_key, etag, expires, headers, body) '
+                  'VALUES (?, ?, ?, ?, ?)', (cache_key, etag, expires, headers, body))
+        conn.commit()
+
+def touch_cached_response(cache_key, expires, headers):
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute('UPDATE esi_response_cache SET expires = ?, headers = ? WHERE cache_key = ?',
+                  (expires, headers, cache_key))
+        conn.commit()
+
+def load_universe_names(ids, chunk_size=900):
+    """按id批量查询名称，返回 {id: (name, category)}"""
+    ids = list(ids)
+    names = {}
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            c.execute(f'SELECT id, name, category FROM universe_names WHERE id IN ({",".join("?" * len(chunk))})',
+                      chunk)
+            for row in c.fetchall():
+                names[row[0]] = (row[1], row[2])
+    return names
+
+def save_universe_names(rows):
+    """rows为 (id, name, category) 列表"""
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.executemany('INSERT OR REPLACE INTO universe_names (id, name, category) VALUES (?, ?, ?)', rows)
+        conn.commit()
@@ -0,0 +1,111 @@
+from .db_info import get_db_connection, open_connection
+
+
+ORDER_COLUMNS = ('order_id', 'region_id', 'type_id', 'location_id', 'system_id', 'is_buy_order', 'price',
+                 'volume_remain', 'volume_total', 'min_volume', 'range', 'duration', 'issued')
+
+# 订单在两次快照之间可能变化的字段
+_MUTABLE_COLUMNS = ('price', 'volume_remain', 'duration', 'issued', 'location_id', 'system_id',
+                    'min_volume', 'range', 'volume_total', 'is_buy_order', 'type_id')
+
+
+class MarketOrderSnapshot:
+    """
+    把一个星域的订单快照流式写入 market_orders
+
+    订单页先批量写入临时表，finish() 时按order_id与上一快照比较，
+    只写入新增、变化和消失的订单。从 begin 到 finish 在同一个事务中完成，
+    内存里一次只有一页数据。
+    长事务使用单独的连接，不影响同一线程上其它代码通过 get_db_connection() 的提交。
+    """
+
+    def __init__(self, region_id):
+        self.region_id = region_id
+        self.conn = None
+
+    def __enter__(self):
+        self.begin()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+
+    def begin(self):
+        self.conn = open_connection()
+        c = self.conn.cursor()
+        c.execute('DROP TABLE IF EXISTS temp.market_orders_staging')
+        c.execute('CREATE TEMP TABLE market_orders_staging AS SELECT * FROM market_orders WHERE 0')
+        c.execute('CREATE UNIQUE INDEX temp.idx_staging_order ON market_orders_staging (order_id)')
+
+    def add_page(self, orders):
+        """写入一页ESI订单（字典列表）"""
+        region_id = self.region_id
+        self.conn.executemany(
+            f'INSERT OR REPLACE INTO market_orders_staging ({", ".join(ORDER_COLUMNS)}) '
+            f'VALUES ({", ".join("?" * len(ORDER_COLUMNS))})',
+            [(o['order_id'], region_id, o['type_id'], o['location_id'], o['system_id'], int(o['is_buy_order']),
+              o['price'], o['volume_remain'], o['volume_total'], o['min_volume'], o['range'], o['duration'],
+              o['issued'])
+             for o in orders])
+
+    def reset(self):
+        """丢弃已写入的页（分页数据中途变化、重新抓取时调用）"""
+        self.conn.execute('DELETE FROM market_orders_staging')
+
+    def finish(self):
+        """
+        与上一快照比较并提交
+
+        :return: {'inserted', 'updated', 'deleted', 'total'}
+        """
+        c = self.conn.cursor()
+        c.execute('DELETE FROM market_orders WHERE region_id = ? AND order_id NOT IN '
+                  '(SELECT order_id FROM market_orders_staging)', (self.region_id,))
+        deleted = c.rowcount
+
+        changed = ' OR '.join(f'market_orders.{col} IS NOT s.{col}' for col in _MUTABLE_COLUMNS)
+        assignments = ', '.join(f'{col} = s.{col}' for col in _MUTABLE_COLUMNS + ('region_id',))
+        c.execute(f'UPDATE market_orders SET {assignments} FROM market_orders_staging AS s '
+                  f'WHERE market_orders.order_id = s.order_id AND (market_orders.region_id IS NOT s.region_id '
+                  f'OR {changed})')
+        updated = c.rowcount
+
+        c.execute(f'INSERT INTO market_orders ({", ".join(ORDER_COLUMNS)}) '
+                  f'SELECT {", ".join(ORDER_COLUMNS)} FROM market_orders_staging AS s '
+                  f'WHERE NOT EXISTS (SELECT 1 FROM market_orders WHERE market_orders.order_id = s.order_id)')
+        inserted = c.rowcount
+
+        c.execute('SELECT COUNT(*) FROM market_orders_staging')
+        total = c.fetchone()[0]
+        c.execute('DROP TABLE temp.market_orders_staging')
+        self.conn.commit()
+        self.conn.close()
+        self.conn = None
+        return {'inserted': inserted, 'updated': updated, 'deleted': deleted, 'total': total}
+
+    def abort(self):
+        if self.conn is not None:
+            self.conn.rollback()
+            self.conn.close()
+            self.conn = None
+
+
+def load_best_prices(region_id, location_id=None):
+    """
+    每个物品当前的最低卖价和最高买价
+
+    :param region_id: 星域
+    :param location_id: 只统计该地点（空间站/建筑）的订单，为空时统计整个星域
+    :return: [(type_id, 最低卖价或None, 最高买价或None)]
+    """
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        where, params = 'region_id = ?', [region_id]
+        if location_id is not None:
+            where += ' AND location_id = ?'
+            params.append(location_id)
+        c.execute(f'SELECT type_id, MIN(CASE WHEN is_buy_order = 0 THEN price END), '
+                  f'MAX(CASE WHEN is_buy_order = 1 THEN price END) '
+                  f'FROM market_orders WHERE {where} GROUP BY type_id', params)
+        return c.fetchall()
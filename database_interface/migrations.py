@@ -0,0 +1,141 @@
+import time
+
+from .db_info import _connect
+
+
+def _baseline(c):
+    """迁移机制之前由 initialize_* 建立的表（已有数据库上不做任何改动）"""
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS sso_configurations (
+        client_id TEXT NOT NULL,
+        client_secret TEXT NOT NULL,
+        callback_url TEXT NOT NULL,
+        scope TEXT NOT NULL
+    )
+    ''')
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS Character_info (
+        character_id TEXT NOT NULL,
+        character_name TEXT NOT NULL,
+        Character_owner_hash TEXT NOT NULL,
+        access_token TEXT NOT NULL,
+        refresh_token TEXT NOT NULL
+    )
+    ''')
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS esi_response_cache (
+        cache_key TEXT PRIMARY KEY,
+        etag TEXT,
+        expires REAL NOT NULL,
+        headers TEXT NOT NULL,
+        body TEXT
+    )
+    ''')
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS universe_names (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        category TEXT NOT NULL
+    )
+    ''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_universe_names_category ON universe_names (category, name)')
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS market_orders (
+        order_id INTEGER PRIMARY KEY,
+        region_id INTEGER NOT NULL,
+        type_id INTEGER NOT NULL,
+        location_id INTEGER NOT NULL,
+        system_id INTEGER NOT NULL,
+        is_buy_order INTEGER NOT NULL,
+        price REAL NOT NULL,
+        volume_remain INTEGER NOT NULL,
+        volume_total INTEGER NOT NULL,
+        min_volume INTEGER NOT NULL,
+        range TEXT NOT NULL,
+        duration INTEGER NOT NULL,
+        issued TEXT NOT NULL
+    )
+    ''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_market_orders_region ON market_orders (region_id)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_market_orders_type ON market_orders (type_id, is_buy_order, price)')
+
+
+def _character_keys(c):
+    """
+    Character_info: character_id改为整数主键，owner hash唯一，增加令牌过期时间和按名称查询的索引
+
+    旧表中同一角色（或同一owner hash）有多行时保留最后写入的一行；expires_at为0表示未知，
+    令牌库加载时从JWT读取。
+    """
+    c.execute('''
+    CREATE TABLE Character_info_new (
+        character_id INTEGER PRIMARY KEY,
+        character_name TEXT NOT NULL,
+        Character_owner_hash TEXT NOT NULL UNIQUE,
+        access_token TEXT NOT NULL,
+        refresh_token TEXT NOT NULL,
+        expires_at REAL NOT NULL DEFAULT 0
+    )
+    ''')
+    c.execute('INSERT OR REPLACE INTO Character_info_new (character_id, character_name, Character_owner_hash, '
+              'access_token, refresh_token) '
+              'SELECT CAST(character_id AS INTEGER), character_name, Character_owner_hash, access_token, '
+              'refresh_token FROM Character_info ORDER BY rowid')
+    c.execute('DROP TABLE Character_info')
+    c.execute('ALTER TABLE Character_info_new RENAME TO Character_info')
+    c.execute('CREATE INDEX idx_character_info_name ON Character_info (character_name)')
+
+
+# 按顺序执行的迁移 (版本号, 名称, 函数)；已发布的步骤不要修改，只在末尾追加
+MIGRATIONS = (
+    (1, 'baseline', _baseline),
+    (2, 'character_keys', _character_keys),
+)
+
+
+def schema_version(conn) -> int:
+    """数据库当前的结构版本，没有 schema_version 表时为0"""
+    row = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'").fetchone()
+    if row is None:
+        return 0
+    return conn.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version').fetchone()[0]
+
+
+def migrate(path=None, target=None):
+    """
+    把数据库升级到最新（或target）版本
+
+    每个步骤在单独的事务中执行并写入 schema_version，失败时回滚该步骤并抛出异常，
+    已完成的步骤保留。多个进程同时启动时由写锁串行化，已执行的步骤不会重复执行。
+
+    :param path: 数据库文件，默认为 DATABASE_PATH
+    :param target: 升级到的版本，默认为最新
+    :return: 本次执行的版本号列表
+    """
+    conn = _connect(path)
+    conn.isolation_level = None
+    applied = []
+    try:
+        conn.execute('CREATE TABLE IF NOT EXISTS schema_version (version INTEGER PRIMARY KEY, name TEXT NOT NULL, '
+                     'applied_at REAL NOT NULL)')
+        for version, name, step in MIGRATIONS:
+            if target is not None and version > target:
+                break
+            c = conn.cursor()
+            c.execute('BEGIN IMMEDIATE')
+            try:
+                if schema_version(conn) >= version:
+                    c.execute('COMMIT')
+                    continue
+                step(c)
+                c.execute('INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)',
+                          (version, name, time.time()))
+                c.execute('COMMIT')
+            except Exception as e:
+                c.execute('ROLLBACK')
+                print(f"数据库迁移 {version} ({name}) 失败: {e}")
+                raise
+            applied.append(version)
+    finally:
+        conn.close()
+    return applied
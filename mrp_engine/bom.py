@@ -0,0 +1,307 @@
+import copy
+import heapq
+import math
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from mrp_engine.sde import ACTIVITY_CODE, BlueprintTables
+
+
+MANUFACTURING = ACTIVITY_CODE["manufacturing"]
+REACTION = ACTIVITY_CODE["reaction"]
+
+
+def job_quantity(runs: int, base: int, factor: float) -> int:
+    """
+    EVE的材料数量取整规则：先保留两位小数再向上取整，且每流程至少1个
+
+    两位小数用 round(x * 100) / 100 计算，与 numpy.rint 的结果一致，批量求解器依赖这一点。
+    """
+    return max(runs, math.ceil(round(runs * base * factor * 100) / 100))
+
+
+class Modifiers:
+    """
+    材料效率（ME）与时间效率（TE）加成
+
+    rig_me / rig_te 可以是一个比例，也可以是 {产品category_id: 比例}（不同改装件作用于不同类别）。
+    反应没有蓝图ME，也没有建筑ME加成，只有反应改装件加成。
+    """
+
+    def __init__(self, me: Optional[Dict[int, int]] = None, te: Optional[Dict[int, int]] = None,
+                 default_me: int = 0, default_te: int = 0,
+                 structure_me: float = 0.0, rig_me: Union[float, Dict[int, float]] = 0.0,
+                 structure_te: float = 0.0, rig_te: Union[float, Dict[int, float]] = 0.0,
+                 reaction_rig_me: float = 0.0, reaction_te: float = 0.0, time_multiplier: float = 1.0):
+        """
+        :param me: {蓝图type_id: ME等级(0-10)}
+        :param te: {蓝图type_id: TE等级(0-20)}
+        :param default_me: 未列出的蓝图的ME
+        :param default_te: 未列出的蓝图的TE
+        :param structure_me: 建筑制造材料加成，例如 0.01
+        :param rig_me: 制造改装件材料加成（已乘安全等级系数）
+        :param structure_te: 建筑制造时间加成
+        :param rig_te: 制造改装件时间加成
+        :param reaction_rig_me: 反应改装件材料加成
+        :param reaction_te: 反应时间加成（建筑与改装件合计）
+        :param time_multiplier: 技能、植入体等其余时间系数
+        """
+        self.me = dict(me or {})
+        self.te = dict(te or {})
+        self.default_me = default_me
+        self.default_te = default_te
+        self.structure_me = structure_me
+        self.rig_me = rig_me
+        self.structure_te = structure_te
+        self.rig_te = rig_te
+        self.reaction_rig_me = reaction_rig_me
+        self.reaction_te = reaction_te
+        self.time_multiplier = time_multiplier
+
+    @staticmethod
+    def _rig(bonus, category_id: int) -> float:
+        if isinstance(bonus, dict):
+            return bonus.get(category_id, 0.0)
+        return bonus
+
+    def material_factor(self, blueprint_type_id: int, activity: int, category_id: int) -> float:
+        if activity == REACTION:
+            return 1 - self.reaction_rig_me
+        me = self.me.get(blueprint_type_id, self.default_me)
+        return (1 - me / 100) * (1 - self.structure_me) * (1 - self._rig(self.rig_me, category_id))
+
+    def time_factor(self, blueprint_type_id: int, activity: int, category_id: int) -> float:
+        if activity == REACTION:
+            return (1 - self.reaction_te) * self.time_multiplier
+        te = self.te.get(blueprint_type_id, self.default_te)
+        return ((1 - te / 100) * (1 - self.structure_te) * (1 - self._rig(self.rig_te, category_id))
+                * self.time_multiplier)
+
+
+class Recipe:
+    """某个物品的生产方式（按当前加成展开后的蓝图数据，物品均为稠密下标）"""
+
+    __slots__ = ("blueprint", "activity", "materials", "quantity", "limit", "time", "factor", "time_factor")
+
+    def __init__(self, blueprint: int, activity: int, materials: List[Tuple[int, int]], quantity: int,
+                 limit: int, time: int, factor: float, time_factor: float):
+        self.blueprint = blueprint
+        self.activity = activity
+        self.materials = materials
+        self.quantity = quantity
+        self.limit = limit
+        self.time = time
+        self.factor = factor
+        self.time_factor = time_factor
+
+    def jobs(self, runs: int) -> List[Tuple[int, int]]:
+        """按蓝图单次最大流程数拆分任务，返回 [(每个任务流程数, 任务个数)]"""
+        if self.limit <= 0 or runs <= self.limit:
+            return [(runs, 1)]
+        full, rest = divmod(runs, self.limit)
+        return [(self.limit, full), (rest, 1)] if rest else [(self.limit, full)]
+
+
+class BOMResult:
+    """
+    一次物料展开的结果（键均为type_id）
+
+    levels[d] 为计划中深度为d的物品需求量（0为最终产品）；
+    totals 为所有物品的需求量，raw 为不再展开的原材料，runs 为每个生产物品的流程数，
+    surplus 为按整流程生产多出的数量，time 为每个生产物品的任务总耗时（秒）。
+    """
+
+    def __init__(self, levels: List[Dict[int, int]], totals: Dict[int, int], raw: Dict[int, int],
+                 runs: Dict[int, int], surplus: Dict[int, int], time: Dict[int, float]):
+        self.levels = levels
+        self.totals = totals
+        self.raw = raw
+        self.runs = runs
+        self.surplus = surplus
+        self.time = time
+
+    def __repr__(self):
+        return f"BOMResult(levels={len(self.levels)}, raw={len(self.raw)}, built={len(self.runs)})"
+
+
+class BOMEngine:
+    """
+    基于蓝图表的物料清单（BOM）展开
+
+    同一计划中相同的中间产品先汇总需求再计算流程数（低层码顺序），
+    每个 (蓝图, 流程数, 加成) 的任务材料结果会被缓存，供后续计划复用。
+    """
+
+    def __init__(self, tables: BlueprintTables, modifiers: Optional[Modifiers] = None,
+                 buy: Iterable[int] = (), build_reactions: bool = True):
+        """
+        :param tables: 蓝图表
+        :param modifiers: ME/TE加成，为空时全部为0
+        :param buy: 直接购买、不再展开的物品type_id
+        :param build_reactions: 为False时反应产物视为原材料
+        """
+        self.tables = tables
+        self.modifiers = modifiers if modifiers is not None else Modifiers()
+        self.build_reactions = build_reactions
+        self.buy = set()
+        self._type_ids = tables.type_ids
+        self._recipes: Dict[int, Optional[Recipe]] = {}
+        self._heights: Dict[int, int] = {}
+        self._job_cache: Dict[Tuple, List[Tuple[int, int]]] = {}
+        self.set_buy(buy)
+
+    def set_modifiers(self, modifiers: Modifiers):
+        """更换加成；已缓存的任务材料按系数区分，无需清空"""
+        self.modifiers = modifiers
+        self._recipes = {}
+
+    def set_me(self, blueprint_type_id: int, me: int) -> List[int]:
+        """
+        修改单张蓝图的ME，只让这张蓝图生产的物品的配方失效
+
+        加成对象被复制后替换，传入的 Modifiers 不会被修改。
+
+        :return: 受影响的物品下标
+        """
+        modifiers = copy.copy(self.modifiers)
+        modifiers.me = {**self.modifiers.me, blueprint_type_id: me}
+        self.modifiers = modifiers
+        items = []
+        for blueprint in (self._type_ids[self.tables.blueprint_type] == blueprint_type_id).nonzero()[0].tolist():
+            items.extend((self.tables.producer_bp == blueprint).nonzero()[0].tolist())
+        self.invalidate_recipes(items)
+        return items
+
+    def invalidate_recipes(self, items: Iterable[int]):
+        """丢弃指定物品（下标）已缓存的配方，下次 recipe() 时按当前加成重新展开"""
+        for item in items:
+            self._recipes.pop(item, None)
+
+    def set_buy(self, buy: Iterable[int]):
+        """更换直接购买的物品集合"""
+        index = self.tables.type_index(list(buy))
+        self.buy = {int(i) for i in index if i >= 0}
+        self._recipes = {}
+        self._heights = {}
+
+    def recipe(self, item: int) -> Optional[Recipe]:
+        """物品下标 -> Recipe，原材料返回None"""
+        try:
+            return self._recipes[item]
+        except KeyError:
+            pass
+
+        recipe = None
+        blueprint = int(self.tables.producer_bp[item])
+        activity = int(self.tables.producer_activity[item])
+        if blueprint >= 0 and item not in self.buy and (activity != REACTION or self.build_reactions):
+            name = "reaction" if activity == REACTION else "manufacturing"
+            types, quantities = self.tables.materials(blueprint, name)
+            blueprint_type_id = int(self._type_ids[self.tables.blueprint_type[blueprint]])
+            category_id = int(self.tables.category_id[item])
+            recipe = Recipe(blueprint, activity, list(zip(types.tolist(), quantities.tolist())),
+                            int(self.tables.producer_qty[item]),
+                            int(self.tables.max_production_limit[blueprint]),
+                            self.tables.time(blueprint, name),
+                            self.modifiers.material_factor(blueprint_type_id, activity, category_id),
+                            self.modifiers.time_factor(blueprint_type_id, activity, category_id))
+        self._recipes[item] = recipe
+        return recipe
+
+    def height(self, item: int) -> int:
+        """物品到原材料的最长路径长度（原材料为0），父节点的height总是大于子节点"""
+        if item in self._heights:
+            return self._heights[item]
+
+        stack = [(item, False)]
+        visiting = set()
+        while stack:
+            node, expanded = stack.pop()
+            if node in self._heights:
+                continue
+            recipe = self.recipe(node)
+            if recipe is None:
+                self._heights[node] = 0
+                continue
+            if expanded:
+                visiting.discard(node)
+                self._heights[node] = 1 + max((self._heights[m] for m, _ in recipe.materials), default=0)
+                continue
+            if node in visiting:
+                raise ValueError(f"蓝图数据存在循环依赖: {int(self._type_ids[node])}")
+            visiting.add(node)
+            stack.append((node, True))
+            stack.extend((m, False) for m, _ in recipe.materials if m not in self._heights)
+        return self._heights[item]
+
+    def job_materials(self, recipe: Recipe, runs: int) -> List[Tuple[int, int]]:
+        """runs个流程（按上限拆分为多个任务）所需的材料 [(物品下标, 数量)]"""
+        key = (recipe.blueprint, recipe.activity, runs, recipe.factor)
+        materials = self._job_cache.get(key)
+        if materials is None:
+            jobs = recipe.jobs(runs)
+            materials = [(m, sum(count * job_quantity(job_runs, base, recipe.factor) for job_runs, count in jobs))
+                         for m, base in recipe.materials]
+            self._job_cache[key] = materials
+        return materials
+
+    def explode(self, plan: Dict[int, int]) -> BOMResult:
+        """
+        把生产计划展开到原材料
+
+        :param plan: {产品type_id: 数量}
+        """
+        need: Dict[int, int] = {}
+        depth: Dict[int, int] = {}
+        heap = []
+        for type_id, quantity in plan.items():
+            item = int(self.tables.type_index(type_id))
+            if item < 0:
+                raise KeyError(f"未知的物品: {type_id}")
+            if item not in need:
+                need[item] = 0
+                depth[item] = 0
+                heapq.heappush(heap, (-self.height(item), item))
+            need[item] += quantity
+
+        runs: Dict[int, int] = {}
+        surplus: Dict[int, int] = {}
+        time: Dict[int, float] = {}
+        raw: Dict[int, int] = {}
+        heights = self._heights
+        heappush, heappop = heapq.heappush, heapq.heappop
+        while heap:
+            # 按height从高到低处理，弹出时所有上层需求都已汇总
+            _, item = heappop(heap)
+            recipe = self.recipe(item)
+            if recipe is None:
+                raw[item] = need[item]
+                continue
+
+            item_runs = -(-need[item] // recipe.quantity)
+            runs[item] = item_runs
+            surplus[item] = item_runs * recipe.quantity - need[item]
+            time[item] = recipe.time * item_runs * recipe.time_factor
+            child_depth = depth[item] + 1
+            for material, quantity in self.job_materials(recipe, item_runs):
+                if material in need:
+                    need[material] += quantity
+                    if depth[material] < child_depth:
+                        depth[material] = child_depth
+                else:
+                    # 计算item的height时其材料的height均已缓存
+                    need[material] = quantity
+                    depth[material] = child_depth
+                    heappush(heap, (-heights[material], material))
+
+        type_ids = self._type_ids
+        levels: List[Dict[int, int]] = [{} for _ in range(max(depth.values(), default=-1) + 1)]
+        for item, quantity in need.items():
+            levels[depth[item]][int(type_ids[item])] = quantity
+        return BOMResult(
+            levels=levels,
+            totals={int(type_ids[item]): quantity for item, quantity in need.items()},
+            raw={int(type_ids[item]): quantity for item, quantity in raw.items()},
+            runs={int(type_ids[item]): value for item, value in runs.items()},
+            surplus={int(type_ids[item]): value for item, value in surplus.items()},
+            time={int(type_ids[item]): value for item, value in time.items()},
+        )
@@ -0,0 +1,308 @@
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from mrp_engine.bom import REACTION, Modifiers
+from mrp_engine.sde import BlueprintTables
+
+
+def job_quantities(runs: np.ndarray, base: np.ndarray, factor: np.ndarray) -> np.ndarray:
+    """job_quantity 的向量化版本，浮点运算顺序与其保持一致"""
+    return np.maximum(runs, np.ceil(np.rint(runs * base * factor * 100) / 100).astype(np.int64))
+
+
+def gather_csr(indptr: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """取CSR中若干行，返回 (每行长度, 展开后的元素位置)"""
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return lengths, offsets + np.arange(lengths.sum())
+
+
+class _Level:
+    """同一height的所有生产物品，以及它们的材料条目（CSR）"""
+
+    __slots__ = ("columns", "quantity", "indptr", "material", "base", "factor", "limit", "full_quantity")
+
+
+class BatchResult:
+    """
+    批量展开结果
+
+    columns 为参与计算的物品下标，totals/runs/used 的形状为 (计划数, len(columns))。
+    totals 为到达每个物品的需求量（扣除上层库存之后），used 为从库存中扣除的数量。
+    """
+
+    def __init__(self, type_ids: np.ndarray, columns: np.ndarray, raw: np.ndarray,
+                 totals: np.ndarray, runs: np.ndarray, used: Optional[np.ndarray] = None):
+        self.type_ids = type_ids
+        self.columns = columns
+        self.raw_mask = raw
+        self.totals = totals
+        self.runs = runs
+        self.used = used if used is not None else np.zeros_like(totals)
+
+    def raw(self) -> np.ndarray:
+        """原材料需求 (计划数, 原材料数)，列顺序同 raw_type_ids"""
+        return self.totals[:, self.raw_mask]
+
+    @property
+    def raw_type_ids(self) -> np.ndarray:
+        return self.type_ids[self.columns[self.raw_mask]]
+
+    def as_dict(self, row: int = 0) -> Dict[str, Dict[int, int]]:
+        """第row个计划的结果，格式与 BOMResult 的 totals/raw/runs 相同"""
+        type_ids = self.type_ids[self.columns]
+        totals, runs = self.totals[row], self.runs[row]
+        nonzero = totals > 0
+        return {
+            "totals": dict(zip(type_ids[nonzero].tolist(), totals[nonzero].tolist())),
+            "raw": dict(zip(type_ids[nonzero & self.raw_mask].tolist(), totals[nonzero & self.raw_mask].tolist())),
+            "runs": dict(zip(type_ids[runs > 0].tolist(), runs[runs > 0].tolist())),
+        }
+
+
+class BatchBOMSolver:
+    """
+    整个目录的批量BOM求解
+
+    所有生产配方组成一个按height（拓扑顺序）分层的稀疏矩阵；求解时从最高层向下，
+    每层对该层物品的流程数做一次稀疏乘积，把材料需求累加到下层。
+    取整、任务拆分和汇总顺序与 BOMEngine 完全一致，可同时计算成千上万个产品。
+    """
+
+    def __init__(self, tables: BlueprintTables, modifiers: Optional[Modifiers] = None,
+                 buy: Iterable[int] = (), build_reactions: bool = True):
+        """
+        :param tables: 蓝图表
+        :param modifiers: ME/TE加成
+        :param buy: 直接购买、不再展开的物品type_id
+        :param build_reactions: 为False时反应产物视为原材料
+        """
+        self.tables = tables
+        self.modifiers = modifiers if modifiers is not None else Modifiers()
+        self.type_ids = np.asarray(tables.type_ids)
+
+        producer_bp = np.asarray(tables.producer_bp)
+        activity = np.asarray(tables.producer_activity)
+        producible = producer_bp >= 0
+        if not build_reactions:
+            producible &= activity != REACTION
+        buy_index = tables.type_index(list(buy))
+        producible[buy_index[buy_index >= 0]] = False
+        items = np.flatnonzero(producible)
+
+        # 每个生产物品的材料条目：(物品, 材料, 基础数量)
+        owners, materials, bases = [], [], []
+        for name, code in (("manufacturing", None), ("reaction", REACTION)):
+            mask = activity[items] == REACTION if code == REACTION else activity[items] != REACTION
+            selected = items[mask]
+            lengths, positions = gather_csr(np.asarray(tables.arrays[f"mat_indptr_{name}"]),
+                                             producer_bp[selected])
+            owners.append(np.repeat(selected, lengths))
+            materials.append(np.asarray(tables.arrays[f"mat_type_{name}"])[positions])
+            bases.append(np.asarray(tables.arrays[f"mat_qty_{name}"])[positions].astype(np.int64))
+        owners, materials, bases = np.concatenate(owners), np.concatenate(materials), np.concatenate(bases)
+        self._entries = (owners, materials, bases)
+
+        # 只保留参与计算的物品作为列
+        self.columns = np.union1d(items, materials)
+        column_of = np.full(len(self.type_ids), -1, dtype=np.int64)
+        column_of[self.columns] = np.arange(len(self.columns))
+        self._column_of = column_of
+        owner_cols, material_cols = column_of[owners], column_of[materials]
+        n_cols = len(self.columns)
+        self.raw_mask = ~producible[self.columns]
+
+        # 与 BOMEngine 使用同一份加成计算，保证系数逐位相同
+        blueprint_type = np.asarray(tables.blueprint_type)
+        category_id = np.asarray(tables.category_id)
+        activity_time = np.asarray(tables.activity_time)
+        factors = np.ones(n_cols)
+        self.time_per_run = np.zeros(len(self.type_ids))
+        for item in items.tolist():
+            blueprint = int(producer_bp[item])
+            args = (int(self.type_ids[blueprint_type[blueprint]]), int(activity[item]), int(category_id[item]))
+            factors[column_of[item]] = self.modifiers.material_factor(*args)
+            self.time_per_run[item] = activity_time[blueprint, activity[item]] * self.modifiers.time_factor(*args)
+
+        quantity = np.ones(n_cols, dtype=np.int64)
+        quantity[column_of[items]] = np.asarray(tables.producer_qty)[items]
+        limit = np.zeros(n_cols, dtype=np.int64)
+        limit[column_of[items]] = np.asarray(tables.max_production_limit)[producer_bp[items]]
+
+        self.heights = self._heights(~self.raw_mask, owner_cols, material_cols)
+        self.levels: List[_Level] = []
+        for height in range(int(self.heights.max(initial=0)), 0, -1):
+            level = _Level()
+            level.columns = np.flatnonzero(self.heights == height)
+            level.quantity = quantity[level.columns]
+            position = np.full(n_cols, -1, dtype=np.int64)
+            position[level.columns] = np.arange(len(level.columns))
+            # 条目按所属物品排序，level.indptr[i]:level.indptr[i + 1] 为第i个物品的材料
+            entries = np.flatnonzero(self.heights[owner_cols] == height)
+            owner = position[owner_cols[entries]]
+            entries = entries[np.argsort(owner, kind="stable")]
+            level.indptr = np.zeros(len(level.columns) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(owner, minlength=len(level.columns)), out=level.indptr[1:])
+            level.material = material_cols[entries]
+            level.base = bases[entries]
+            level.factor = factors[owner_cols[entries]]
+            level.limit = limit[owner_cols[entries]]
+            level.full_quantity = job_quantities(level.limit, level.base, level.factor)
+            self.levels.append(level)
+
+    @staticmethod
+    def _heights(producible: np.ndarray, owners: np.ndarray, materials: np.ndarray) -> np.ndarray:
+        """height = 1 + max(材料height)，原材料为0；迭代到收敛"""
+        n_cols = len(producible)
+        heights = producible.astype(np.int64)
+        order = np.argsort(owners, kind="stable")
+        owners, materials = owners[order], materials[order]
+        parents, starts = np.unique(owners, return_index=True)
+        for _ in range(n_cols + 1):
+            updated = heights.copy()
+            if len(parents):
+                updated[parents] = 1 + np.maximum.reduceat(heights[materials], starts)
+            if np.array_equal(updated, heights):
+                return heights
+            heights = updated
+        raise ValueError("蓝图数据存在循环依赖")
+
+    def _solve(self, need: np.ndarray, inventory: Optional[np.ndarray] = None
+               ) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+        """
+        need: (计划数, 列数) 的目标需求，原地累加为总需求
+
+        给出inventory（按列对齐）时逐层先扣除库存再计算流程数，
+        持有的中间产品因此同时减少其下所有层级的需求；每个计划独立使用整份库存。
+        """
+        runs = np.zeros_like(need)
+        used = np.zeros_like(need) if inventory is not None else None
+        flat_need = need.reshape(-1)
+        n_cols = need.shape[1]
+        for level in self.levels:
+            level_need = need[:, level.columns]
+            if inventory is not None:
+                taken = np.minimum(level_need, inventory[level.columns])
+                used[:, level.columns] = taken
+                level_need = level_need - taken
+            level_runs = -(-level_need // level.quantity)
+            runs[:, level.columns] = level_runs
+            if not len(level.material):
+                continue
+            # 只计算流程数非零的 (计划, 材料条目)，大部分计划只用到目录中很小一部分
+            plans, owners = np.nonzero(level_runs)
+            if not len(plans):
+                continue
+            counts, entries = gather_csr(level.indptr, owners)
+            entry_runs = np.repeat(level_runs[plans, owners], counts)
+            limit = level.limit[entries]
+            full = np.where(limit > 0, entry_runs // np.maximum(limit, 1), 0)
+            rest = entry_runs - full * limit
+            quantities = full * level.full_quantity[entries] + job_quantities(rest, level.base[entries],
+                                                                             level.factor[entries])
+            np.add.at(flat_need, np.repeat(plans, counts) * n_cols + level.material[entries], quantities)
+        if inventory is not None:
+            used[:, self.raw_mask] = np.minimum(need[:, self.raw_mask], inventory[self.raw_mask])
+        return need, runs, used
+
+    def _target_columns(self, type_ids) -> np.ndarray:
+        index = self.tables.type_index(type_ids)
+        columns = np.where(index >= 0, self._column_of[np.maximum(index, 0)], -1)
+        if (columns < 0).any():
+            unknown = np.asarray(type_ids)[columns < 0]
+            raise KeyError(f"无法生产或未知的物品: {unknown[:10].tolist()}")
+        return columns
+
+    def solve(self, targets: Union[Dict[int, int], Tuple[Iterable[int], np.ndarray]],
+              inventory: Optional[np.ndarray] = None) -> BatchResult:
+        """
+        展开一个或多个生产计划
+
+        :param targets: {type_id: 数量}，或 (type_ids, 数量矩阵)，
+                        数量矩阵形状为 (计划数, len(type_ids))，每一行是一个独立的计划
+        :param inventory: 现有库存，与 tables.type_ids 对齐的向量，为空时不扣除
+        """
+        if isinstance(targets, dict):
+            type_ids, quantities = list(targets), np.array([list(targets.values())], dtype=np.int64)
+        else:
+            type_ids, quantities = list(targets[0]), np.atleast_2d(np.asarray(targets[1], dtype=np.int64))
+        columns = self._target_columns(type_ids)
+        need = np.zeros((len(quantities), len(self.columns)), dtype=np.int64)
+        np.add.at(need, (slice(None), columns), quantities)
+        if inventory is not None:
+            inventory = np.asarray(inventory, dtype=np.int64)[self.columns]
+        totals, runs, used = self._solve(need, inventory)
+        return BatchResult(self.type_ids, self.columns, self.raw_mask, totals, runs, used)
+
+    def per_run_value(self, prices: np.ndarray) -> np.ndarray:
+        """
+        每个生产物品一个流程的基础材料价值（不计ME，即EVE的估计物品价值EIV）
+
+        :param prices: 与 tables.type_ids 对齐的价格向量（通常为调整价格）
+        :return: 与 tables.type_ids 对齐的向量，原材料为0
+        """
+        owners, materials, bases = self._entries
+        return np.bincount(owners, weights=bases * np.asarray(prices, dtype=np.float64)[materials],
+                           minlength=len(self.type_ids))
+
+    def solve_each(self, type_ids: Iterable[int], quantities: Union[int, Iterable[int]] = 1,
+                   chunk_size: int = 256) -> "EachResult":
+        """
+        每个产品单独展开（例如对整个目录估算成本）
+
+        :param type_ids: 产品type_id
+        :param quantities: 每个产品的数量
+        :param chunk_size: 每次同时计算的产品数，控制内存
+        """
+        type_ids = np.asarray(list(type_ids))
+        quantities = np.broadcast_to(np.asarray(quantities, dtype=np.int64), type_ids.shape)
+        columns = self._target_columns(type_ids)
+        raw = np.empty((len(type_ids), int(self.raw_mask.sum())), dtype=np.int64)
+        run_rows, run_items, run_counts = [], [], []
+        for start in range(0, len(type_ids), chunk_size):
+            stop = min(start + chunk_size, len(type_ids))
+            need = np.zeros((stop - start, len(self.columns)), dtype=np.int64)
+            need[np.arange(stop - start), columns[start:stop]] = quantities[start:stop]
+            totals, runs, _ = self._solve(need)
+            raw[start:stop] = totals[:, self.raw_mask]
+            rows, cols = np.nonzero(runs)
+            run_rows.append(rows + start)
+            run_items.append(self.columns[cols])
+            run_counts.append(runs[rows, cols])
+
+        rows = np.concatenate(run_rows) if run_rows else np.zeros(0, dtype=np.int64)
+        indptr = np.zeros(len(type_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(type_ids)), out=indptr[1:])
+        return EachResult(raw, self.type_ids[self.columns[self.raw_mask]], indptr,
+                          np.concatenate(run_items) if run_items else np.zeros(0, dtype=np.int64),
+                          np.concatenate(run_counts) if run_counts else np.zeros(0, dtype=np.int64))
+
+
+class EachResult:
+    """
+    逐个产品展开的结果
+
+    raw 为原材料需求 (产品数, 原材料数)，列顺序同 raw_type_ids；
+    每个产品整条生产链的流程数以CSR保存：run_items[run_indptr[i]:run_indptr[i + 1]] 为物品下标，
+    run_counts 为对应的流程数。
+    """
+
+    def __init__(self, raw: np.ndarray, raw_type_ids: np.ndarray, run_indptr: np.ndarray,
+                 run_items: np.ndarray, run_counts: np.ndarray):
+        self.raw = raw
+        self.raw_type_ids = raw_type_ids
+        self.run_indptr = run_indptr
+        self.run_items = run_items
+        self.run_counts = run_counts
+
+    def chain_sum(self, per_run: np.ndarray) -> np.ndarray:
+        """
+        每个产品整条生产链的 sum(流程数 x 每流程数值)，例如总耗时、总EIV
+
+        :param per_run: 与 tables.type_ids 对齐的每流程数值
+        """
+        rows = np.repeat(np.arange(len(self.run_indptr) - 1), np.diff(self.run_indptr))
+        return np.bincount(rows, weights=self.run_counts * np.asarray(per_run, dtype=np.float64)[self.run_items],
+                           minlength=len(self.run_indptr) - 1)
@@ -0,0 +1,244 @@
+import heapq
+import math
+from typing import Dict, List, Optional, Set, Tuple
+
+from mrp_engine.bom import BOMEngine
+
+
+class IncrementalPlanner:
+    """
+    增量重新计划
+
+    维护从产品经中间产品到原材料的依赖图，以及每个节点的需求、库存扣除、流程数和单位成本。
+    价格、库存、蓝图ME或目标数量变化时只把受影响的节点标记为脏：
+    数量变化沿依赖图向下（按height从高到低）以差值传播，成本变化沿依赖图向上（按height从低到高）汇总，
+    其余节点保持不变。结果与完整重新计划（BOMEngine / net_requirements）一致。
+    """
+
+    def __init__(self, engine: BOMEngine, targets: Optional[Dict[int, int]] = None,
+                 inventory: Optional[Dict[int, int]] = None, prices: Optional[Dict[int, float]] = None):
+        """
+        :param engine: BOM展开引擎（提供配方、加成和低层码）
+        :param targets: {产品type_id: 数量}
+        :param inventory: {type_id: 库存数量}
+        :param prices: {type_id: 单价}，原材料按此计价
+        """
+        self.engine = engine
+        self.tables = engine.tables
+        self._type_ids = engine.tables.type_ids
+
+        self.targets: Dict[int, int] = {}
+        self.inventory: Dict[int, int] = {}
+        self.prices: Dict[int, float] = {}
+
+        # 节点状态，键为物品下标
+        self.demand: Dict[int, int] = {}
+        self.used: Dict[int, int] = {}
+        self.runs: Dict[int, int] = {}
+        self.unit_cost: Dict[int, float] = {}
+        self._materials: Dict[int, List[Tuple[int, int]]] = {}
+        self._parents: Dict[int, Set[int]] = {}
+        # 总成本 = 有价格部分之和；有任何缺价的采购时为NaN
+        self._raw_cost: Dict[int, float] = {}
+        self._raw_sum = 0.0
+        self._raw_missing = 0
+
+        self._dirty: Set[int] = set()
+        self._forced: Set[int] = set()
+        self._cost_dirty: Set[int] = set()
+        self.last_recomputed = 0
+
+        for type_id, quantity in (inventory or {}).items():
+            self.set_inventory(type_id, quantity)
+        for type_id, price in (prices or {}).items():
+            self.set_price(type_id, price)
+        for type_id, quantity in (targets or {}).items():
+            self.set_target(type_id, quantity)
+        self.update()
+
+    def _index(self, type_id: int) -> int:
+        item = int(self.tables.type_index(type_id))
+        if item < 0:
+            raise KeyError(f"未知的物品: {type_id}")
+        return item
+
+    # ---- 变更 ----
+
+    def set_target(self, type_id: int, quantity: int):
+        """修改某个产品的目标数量（0为移除）"""
+        item = self._index(type_id)
+        delta = quantity - self.targets.get(item, 0)
+        if not delta:
+            return
+        if quantity:
+            self.targets[item] = quantity
+        else:
+            self.targets.pop(item, None)
+        self.demand[item] = self.demand.get(item, 0) + delta
+        self._dirty.add(item)
+
+    def set_inventory(self, type_id: int, quantity: int):
+        """修改某个物品的库存数量（资产同步后调用）"""
+        item = self._index(type_id)
+        if self.inventory.get(item, 0) == quantity:
+            return
+        self.inventory[item] = quantity
+        if item in self.demand:
+            self._dirty.add(item)
+
+    def set_price(self, type_id: int, price: float):
+        """修改某个物品的单价"""
+        item = self._index(type_id)
+        if self.prices.get(item) == price:
+            return
+        self.prices[item] = price
+        if item in self.demand:
+            self._cost_dirty.add(item)
+
+    def set_me(self, blueprint_type_id: int, me: int):
+        """修改某张蓝图的ME，该蓝图生产的物品需要重新计算材料"""
+        for item in self.engine.set_me(blueprint_type_id, me):
+            if item in self.demand:
+                self._dirty.add(item)
+                self._forced.add(item)
+
+    # ---- 重新计算 ----
+
+    def update(self) -> int:
+        """
+        重新计算所有脏节点及其受影响的子图
+
+        :return: 本次重新计算的节点数
+        """
+        recomputed = self._propagate_quantities()
+        recomputed += self._propagate_costs()
+        self.last_recomputed = recomputed
+        return recomputed
+
+    def _propagate_quantities(self) -> int:
+        engine = self.engine
+        heap = [(-engine.height(item), item) for item in self._dirty]
+        heapq.heapify(heap)
+        queued = set(self._dirty)
+        self._dirty = set()
+        count = 0
+        while heap:
+            # 父节点的height总是更高，弹出时其所有上游变化都已累加到demand
+            _, item = heapq.heappop(heap)
+            queued.discard(item)
+            count += 1
+            demand = self.demand.get(item, 0)
+            used = min(demand, self.inventory.get(item, 0))
+            net = demand - used
+            recipe = engine.recipe(item)
+            runs = -(-net // recipe.quantity) if recipe is not None else 0
+
+            # 需求变了时原材料的采购量也会变，成本总要重新汇总
+            self._cost_dirty.add(item)
+            forced = item in self._forced
+            self._forced.discard(item)
+            if used == self.used.get(item, 0) and runs == self.runs.get(item, 0) and not forced:
+                continue
+            self.used[item] = used
+            self.runs[item] = runs
+
+            old = dict(self._materials.get(item, ()))
+            new = engine.job_materials(recipe, runs) if runs else []
+            self._materials[item] = new
+            for material, quantity in new:
+                delta = quantity - old.pop(material, 0)
+                self._parents.setdefault(material, set()).add(item)
+                if delta:
+                    self.demand[material] = self.demand.get(material, 0) + delta
+                    if material not in queued:
+                        queued.add(material)
+                        heapq.heappush(heap, (-engine.height(material), material))
+            for material, quantity in old.items():
+                # 不再需要的材料
+                self._parents[material].discard(item)
+                self.demand[material] -= quantity
+                if material not in queued:
+                    queued.add(material)
+                    heapq.heappush(heap, (-engine.height(material), material))
+        return count
+
+    def _propagate_costs(self) -> int:
+        engine = self.engine
+        heap = [(engine.height(item), item) for item in self._cost_dirty]
+        heapq.heapify(heap)
+        queued = set(self._cost_dirty)
+        self._cost_dirty = set()
+        count = 0
+        while heap:
+            # 子节点先于父节点汇总
+            _, item = heapq.heappop(heap)
+            queued.discard(item)
+            count += 1
+            price = self.prices.get(item, math.nan)
+
+            runs = self.runs.get(item, 0)
+            if runs:
+                recipe = engine.recipe(item)
+                cost = sum(quantity * self.unit_cost.get(material, math.nan)
+                           for material, quantity in self._materials[item])
+                unit_cost = cost / (runs * recipe.quantity)
+            else:
+                unit_cost = price
+
+            # 不生产的物品中需要购买的部分计入总成本
+            bought = 0 if runs or engine.recipe(item) is not None else \
+                self.demand.get(item, 0) - self.used.get(item, 0)
+            raw_cost = bought * price if bought else 0.0
+            self._add_raw_cost(self._raw_cost.get(item, 0.0), -1)
+            self._add_raw_cost(raw_cost, 1)
+            self._raw_cost[item] = raw_cost
+
+            old = self.unit_cost.get(item)
+            self.unit_cost[item] = unit_cost
+            if old is not None and (old == unit_cost or (math.isnan(old) and math.isnan(unit_cost))):
+                continue
+            for parent in self._parents.get(item, ()):
+                if parent not in queued:
+                    queued.add(parent)
+                    heapq.heappush(heap, (engine.height(parent), parent))
+        return count
+
+    def _add_raw_cost(self, cost: float, sign: int):
+        # NaN单独计数，价格补齐后总成本能恢复为有限值
+        if math.isnan(cost):
+            self._raw_missing += sign
+        else:
+            self._raw_sum += sign * cost
+
+    # ---- 结果 ----
+
+    @property
+    def total_cost(self) -> float:
+        """需要购买的原材料总成本，有原材料缺价时为NaN"""
+        return math.nan if self._raw_missing else self._raw_sum
+
+    def shortfall(self) -> Dict[int, int]:
+        """需要购买的原材料 {type_id: 数量}"""
+        type_ids = self._type_ids
+        result = {}
+        for item, demand in self.demand.items():
+            if demand and self.engine.recipe(item) is None:
+                quantity = demand - self.used.get(item, 0)
+                if quantity:
+                    result[int(type_ids[item])] = quantity
+        return result
+
+    def job_runs(self) -> Dict[int, int]:
+        """需要生产的物品 {type_id: 流程数}"""
+        return {int(self._type_ids[item]): runs for item, runs in self.runs.items() if runs}
+
+    def costs(self) -> Dict[int, float]:
+        """每个目标产品的单位成本 {type_id: ISK}"""
+        return {int(self._type_ids[item]): self.unit_cost.get(item, math.nan) for item in self.targets}
+
+    def totals(self) -> Dict[int, int]:
+        """到达每个物品的需求量（已扣除上层库存）"""
+        return {int(self._type_ids[item]): demand for item, demand in self.demand.items() if demand}
+
+    def used_inventory(self) -> Dict[int, int]:
+        return {int(self._type_ids[item]): used for item, used in self.used.items() if used}
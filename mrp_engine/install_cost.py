@@ -0,0 +1,159 @@
+import itertools
+from typing import Dict, Iterable, Optional, Sequence, Union
+
+import numpy as np
+
+from mrp_engine.bom_batch import gather_csr
+from mrp_engine.sde import ACTIVITY_CODE, BlueprintTables
+
+
+# /industry/systems/ 的 cost_indices 活动名（cost_index 的列顺序）
+COST_INDEX_ACTIVITIES = ("manufacturing", "researching_time_efficiency", "researching_material_efficiency",
+                         "copying", "invention", "reaction")
+_COLUMN = {name: column for column, name in enumerate(COST_INDEX_ACTIVITIES)}
+
+# SDE活动名 -> 成本指数活动名
+SDE_ACTIVITY_COLUMNS = {
+    "manufacturing": "manufacturing",
+    "reaction": "reaction",
+    "invention": "invention",
+    "copying": "copying",
+    "research_material": "researching_material_efficiency",
+    "research_time": "researching_time_efficiency",
+}
+
+# 科研类任务的估计价值为产品EIV的2%
+EIV_FACTOR = np.array([1.0, 0.02, 0.02, 0.02, 0.02, 1.0])
+
+_versions = itertools.count(1)
+
+
+class IndustryCostTables:
+    """
+    星系成本指数和调整价格的稠密数组
+
+    cost_index 为 [星系, 活动]，按排序后的 system_ids 寻址；
+    adjusted_price / average_price 与 tables.type_ids 对齐（NaN表示没有价格）。
+    每次更新version递增，作为缓存key的一部分。
+    """
+
+    def __init__(self, tables: BlueprintTables):
+        self.tables = tables
+        self.system_ids = np.zeros(0, dtype=np.int64)
+        self.cost_index = np.zeros((0, len(COST_INDEX_ACTIVITIES)))
+        self.adjusted_price = np.full(tables.n_types, np.nan)
+        self.average_price = np.full(tables.n_types, np.nan)
+        self.version = next(_versions)
+        self._eiv_per_run: Optional[np.ndarray] = None
+
+    def update_systems(self, systems: Iterable[Dict]):
+        """写入 /industry/systems/ 的结果"""
+        systems = sorted(systems, key=lambda row: row["solar_system_id"])
+        cost_index = np.zeros((len(systems), len(COST_INDEX_ACTIVITIES)))
+        for row, system in enumerate(systems):
+            for entry in system.get("cost_indices", ()):
+                column = _COLUMN.get(entry["activity"])
+                if column is not None:
+                    cost_index[row, column] = entry["cost_index"]
+        self.system_ids = np.array([system["solar_system_id"] for system in systems], dtype=np.int64)
+        self.cost_index = cost_index
+        self.version = next(_versions)
+
+    def update_prices(self, prices: Iterable[Dict]):
+        """写入 /markets/prices/ 的结果"""
+        prices = list(prices)
+        index = self.tables.type_index(np.fromiter((row["type_id"] for row in prices), np.int64, len(prices)))
+        known = index >= 0
+        adjusted = np.full(self.tables.n_types, np.nan)
+        average = np.full(self.tables.n_types, np.nan)
+        adjusted[index[known]] = np.fromiter((row.get("adjusted_price", np.nan) for row in prices),
+                                             np.float64, len(prices))[known]
+        average[index[known]] = np.fromiter((row.get("average_price", np.nan) for row in prices),
+                                            np.float64, len(prices))[known]
+        self.adjusted_price = adjusted
+        self.average_price = average
+        self._eiv_per_run = None
+        self.version = next(_versions)
+
+    @property
+    def eiv_per_run(self) -> np.ndarray:
+        """
+        每个可生产物品一个流程的估计物品价值（EIV）：基础材料数量（不计ME）x 调整价格
+
+        与 tables.type_ids 对齐，原材料为0；缺少调整价格的材料按0计。
+        """
+        if self._eiv_per_run is None:
+            tables = self.tables
+            producer_bp = np.asarray(tables.producer_bp)
+            activity = np.asarray(tables.producer_activity)
+            prices = np.nan_to_num(self.adjusted_price, nan=0.0)
+            eiv = np.zeros(tables.n_types)
+            for name in ("manufacturing", "reaction"):
+                items = np.flatnonzero((producer_bp >= 0) & (activity == ACTIVITY_CODE[name]))
+                counts, entries = gather_csr(np.asarray(tables.arrays[f"mat_indptr_{name}"]), producer_bp[items])
+                values = (np.asarray(tables.arrays[f"mat_qty_{name}"])[entries]
+                          * prices[np.asarray(tables.arrays[f"mat_type_{name}"])[entries]])
+                eiv[items] = np.bincount(np.repeat(np.arange(len(items)), counts), weights=values,
+                                         minlength=len(items))
+            self._eiv_per_run = eiv
+        return self._eiv_per_run
+
+    def system_index(self, system_ids) -> np.ndarray:
+        """星系ID -> 行号，未知星系为-1"""
+        system_ids = np.asarray(system_ids)
+        if not len(self.system_ids):
+            return np.full(system_ids.shape, -1, dtype=np.int64)
+        index = np.minimum(np.searchsorted(self.system_ids, system_ids), len(self.system_ids) - 1)
+        return np.where(self.system_ids[index] == system_ids, index, -1)
+
+    @staticmethod
+    def activity_column(activity: Union[str, Sequence[str]]) -> np.ndarray:
+        """活动名（SDE或ESI名称）-> cost_index 列号"""
+        names = [activity] if isinstance(activity, str) else list(activity)
+        columns = np.array([_COLUMN[SDE_ACTIVITY_COLUMNS.get(name, name)] for name in names], dtype=np.int64)
+        return columns[0] if isinstance(activity, str) else columns
+
+    def rate(self, system_ids, activity: Union[str, Sequence[str], np.ndarray] = "manufacturing",
+             facility_tax: float = 0.0, structure_bonus: float = 0.0, scc_surcharge: float = 0.04) -> np.ndarray:
+        """
+        安装费占EIV的比例：成本指数 x (1 - 建筑加成) + 设施税 + SCC附加费
+
+        :param activity: 活动名，或已转换的列号数组；未知星系的成本指数为NaN
+        """
+        column = activity if isinstance(activity, np.ndarray) else self.activity_column(activity)
+        rows = self.system_index(system_ids)
+        index = np.where(rows >= 0, self.cost_index[np.maximum(rows, 0), column] if len(self.cost_index) else 0.0,
+                         np.nan)
+        return index * (1 - structure_bonus) + facility_tax + scc_surcharge
+
+    def install_cost(self, type_ids, runs, system_ids,
+                     activity: Union[str, Sequence[str], np.ndarray] = "manufacturing",
+                     facility_tax: float = 0.0, structure_bonus: float = 0.0,
+                     scc_surcharge: float = 0.04) -> np.ndarray:
+        """
+        一批任务的安装费（一次向量化计算）
+
+        :param type_ids: 每个任务的产品type_id（科研任务为其制造产品）
+        :param runs: 每个任务的流程数
+        :param system_ids: 每个任务所在星系（可为标量）
+        :param activity: 每个任务的活动（可为标量）
+        """
+        index = self.tables.type_index(np.asarray(type_ids))
+        if (index < 0).any():
+            raise KeyError(f"未知的物品: {np.asarray(type_ids)[index < 0][:10].tolist()}")
+        column = activity if isinstance(activity, np.ndarray) else self.activity_column(activity)
+        value = self.eiv_per_run[index] * np.asarray(runs) * EIV_FACTOR[column]
+        return value * self.rate(system_ids, column, facility_tax, structure_bonus, scc_surcharge)
+
+
+def job_install_costs(costs: IndustryCostTables, jobs: Sequence, system_id: int, **kwargs) -> np.ndarray:
+    """
+    排程任务列表（job_scheduler.Job）的安装费
+
+    :param system_id: 所有任务所在的星系
+    :param kwargs: 传给 IndustryCostTables.install_cost 的税率参数
+    """
+    type_ids = np.fromiter((job.type_id for job in jobs), np.int64, len(jobs))
+    runs = np.fromiter((job.runs for job in jobs), np.int64, len(jobs))
+    activity = costs.activity_column([job.activity for job in jobs])
+    return costs.install_cost(type_ids, runs, system_id, activity, **kwargs)
@@ -0,0 +1,246 @@
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from mrp_engine.bom_batch import gather_csr, job_quantities
+from mrp_engine.profitability import PriceSnapshot, PriceSource
+from mrp_engine.sde import BlueprintTables
+
+
+# (解码器type_id, 名称, 成功率修正, 流程数修正, ME修正, TE修正)；第0项为不使用解码器
+DECRYPTORS: Tuple[Tuple[Optional[int], str, float, int, int, int], ...] = (
+    (None, "None", 0.0, 0, 0, 0),
+    (34201, "Accelerant Decryptor", 0.2, 1, 2, 10),
+    (34202, "Attainment Decryptor", 0.8, 4, -1, 4),
+    (34203, "Augmentation Decryptor", -0.4, 9, -2, 2),
+    (34204, "Parity Decryptor", 0.5, 3, 1, -2),
+    (34205, "Process Decryptor", 0.1, 0, 3, 6),
+    (34206, "Symmetry Decryptor", 0.0, 2, 1, 8),
+    (34207, "Optimized Attainment Decryptor", 0.9, 2, 1, -2),
+    (34208, "Optimized Augmentation Decryptor", -0.1, 7, 2, 0),
+)
+
+# 发明得到的T2蓝图拷贝的基础ME/TE
+INVENTED_ME, INVENTED_TE = 2, 4
+
+# 加密方法技能（发明所需的三个技能中，除此之外的两个为科学技能）
+ENCRYPTION_SKILLS = frozenset((3408, 21790, 21791, 23087, 23121, 52308, 55025))
+
+
+def invention_skill_levels(required_skills: Iterable[int], levels: Dict[int, int]) -> Tuple[int, int]:
+    """
+    由角色技能得到 (两个科学技能等级之和, 加密技能等级)
+
+    :param required_skills: 发明所需的技能type_id
+    :param levels: {技能type_id: 等级}
+    """
+    science, encryption = 0, 0
+    for skill in required_skills:
+        if skill in ENCRYPTION_SKILLS:
+            encryption = levels.get(skill, 0)
+        else:
+            science += levels.get(skill, 0)
+    return min(science, 10), min(encryption, 5)
+
+
+class InventionTables:
+    """
+    发明的期望值查找表
+
+    每一行是一种发明（T1蓝图 -> T2蓝图拷贝 -> T2产品），按
+    [行, 解码器, 科学技能等级和(0-10), 加密技能等级(0-5)] 预先计算成功率和每次尝试的期望流程数；
+    每次尝试的材料成本和每个产出流程的期望成本按价格快照缓存，评估数千个T2物品只需查表。
+    """
+
+    def __init__(self, tables: BlueprintTables, cache_size: int = 8):
+        self.tables = tables
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[tuple, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+
+        indptr = np.asarray(tables.arrays["prod_indptr_invention"])
+        counts = np.diff(indptr)
+        self.source_blueprint = np.repeat(np.arange(len(counts)), counts)
+        self.blueprint_type = np.asarray(tables.arrays["prod_type_invention"])
+        base_runs = np.asarray(tables.arrays["prod_qty_invention"]).astype(np.int64)
+        # 概率以float32保存，还原为SDE中的小数
+        base_probability = np.round(np.asarray(tables.arrays["prod_prob_invention"]).astype(np.float64), 6)
+
+        # 发明出的蓝图 -> 其制造产品
+        blueprint_rows = np.searchsorted(np.asarray(tables.blueprint_type), self.blueprint_type)
+        blueprint_rows = np.minimum(blueprint_rows, max(tables.n_blueprints - 1, 0))
+        valid = np.asarray(tables.blueprint_type)[blueprint_rows] == self.blueprint_type
+        self.blueprint = np.where(valid, blueprint_rows, -1)
+        product_indptr = np.asarray(tables.arrays["prod_indptr_manufacturing"])
+        has_product = valid & (product_indptr[blueprint_rows + 1] > product_indptr[blueprint_rows])
+        self.product = np.full(len(self.blueprint), -1, dtype=np.int64)
+        self.product[has_product] = np.asarray(tables.arrays["prod_type_manufacturing"])[
+            product_indptr[blueprint_rows[has_product]]]
+
+        # 成功率 = 基础 x (1 + 科学等级和/30 + 加密等级/40) x (1 + 解码器修正)，上限100%
+        science = np.arange(11) / 30
+        encryption = np.arange(6) / 40
+        decryptor = np.array([1 + d[2] for d in DECRYPTORS])
+        self.probability = np.minimum(
+            base_probability[:, None, None, None] * decryptor[None, :, None, None]
+            * (1 + science[None, None, :, None] + encryption[None, None, None, :]), 1.0)
+        self.runs = np.maximum(base_runs[:, None] + np.array([d[3] for d in DECRYPTORS])[None, :], 1)
+        self.expected_runs = self.probability * self.runs[:, :, None, None]
+        self.me = np.array([INVENTED_ME + d[4] for d in DECRYPTORS])
+        self.te = np.array([INVENTED_TE + d[5] for d in DECRYPTORS])
+
+        self._row_of_product = {int(product): row for row, product in enumerate(self.product.tolist())
+                                if product >= 0}
+
+    def __len__(self):
+        return len(self.product)
+
+    def rows(self, product_type_ids: Iterable[int]) -> np.ndarray:
+        """T2产品type_id -> 行号，不能通过发明获得的为-1"""
+        index = self.tables.type_index(np.asarray(list(product_type_ids)))
+        return np.array([self._row_of_product.get(int(i), -1) for i in index], dtype=np.int64)
+
+    def datacores(self, row: int) -> Tuple[np.ndarray, np.ndarray]:
+        """一次发明尝试消耗的材料 (物品下标, 数量)"""
+        return self.tables.materials(int(self.source_blueprint[row]), "invention")
+
+    def costs(self, snapshot: PriceSnapshot, source: PriceSource = ("sell", "adjusted"),
+              install_cost: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        按价格快照计算并缓存
+
+        :param snapshot: 价格快照
+        :param source: 材料和解码器的价格来源
+        :param install_cost: 可选的每行每次尝试的安装费
+        :return: (每次尝试成本 [行, 解码器], 每个产出流程的期望成本 [行, 解码器, 科学, 加密])，
+                 缺少价格的为NaN
+        """
+        key = (snapshot.key, source if isinstance(source, str) else tuple(source),
+               None if install_cost is None else hash(np.asarray(install_cost).tobytes()))
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+
+        prices = snapshot.price(source)
+        indptr = np.asarray(self.tables.arrays["mat_indptr_invention"])
+        material_value = np.asarray(self.tables.arrays["mat_qty_invention"]) * \
+            prices[np.asarray(self.tables.arrays["mat_type_invention"])]
+        owners = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        per_blueprint = np.bincount(owners, weights=material_value, minlength=len(indptr) - 1)
+        # bincount会把NaN吞掉，单独标记缺价的蓝图
+        missing = np.bincount(owners, weights=np.isnan(material_value), minlength=len(indptr) - 1) > 0
+        per_blueprint[missing] = np.nan
+
+        decryptor_prices = np.zeros(len(DECRYPTORS))
+        for d, (type_id, *_rest) in enumerate(DECRYPTORS):
+            if type_id is not None:
+                index = int(self.tables.type_index(type_id))
+                decryptor_prices[d] = prices[index] if index >= 0 else np.nan
+
+        attempt = per_blueprint[self.source_blueprint][:, None] + decryptor_prices[None, :]
+        if install_cost is not None:
+            attempt = attempt + np.asarray(install_cost, dtype=np.float64).reshape(-1, 1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            per_run = attempt[:, :, None, None] / self.expected_runs
+
+        result = (attempt, per_run)
+        self._cache[key] = result
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+    def best_decryptor(self, rows: np.ndarray, science, encryption, snapshot: PriceSnapshot,
+                       source: PriceSource = ("sell", "adjusted"),
+                       manufacturing_cost: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        为每一行选择每个T2流程总成本最低的解码器
+
+        :param rows: 行号
+        :param science: 科学技能等级和（标量或与rows等长）
+        :param encryption: 加密技能等级（标量或与rows等长）
+        :param manufacturing_cost: 可选的 [行, 解码器] T2制造材料成本（不同解码器ME不同），
+                                   见 manufacturing_cost_by_decryptor()
+        :return: (解码器下标, 每个T2流程的总成本)
+        """
+        rows = np.asarray(rows)
+        _, per_run = self.costs(snapshot, source)
+        science = np.broadcast_to(science, rows.shape)[:, None]
+        encryption = np.broadcast_to(encryption, rows.shape)[:, None]
+        total = per_run[rows[:, None], np.arange(len(DECRYPTORS))[None, :], science, encryption]
+        if manufacturing_cost is not None:
+            total = total + manufacturing_cost[rows]
+        total = np.where(np.isnan(total), np.inf, total)
+        best = np.argmin(total, axis=1)
+        return best, total[np.arange(len(rows)), best]
+
+    def manufacturing_cost_by_decryptor(self, snapshot: PriceSnapshot, factor: float = 1.0,
+                                        source: PriceSource = ("sell", "adjusted")) -> np.ndarray:
+        """
+        T2蓝图每流程的直接材料成本，按每种解码器得到的ME计算（组件按价格计，不再展开）
+
+        :param factor: 建筑与改装件的材料系数（不含ME）
+        :return: [行, 解码器]
+        """
+        prices = snapshot.price(source)
+        rows = np.flatnonzero(self.blueprint >= 0)
+        counts, entries = gather_csr(np.asarray(self.tables.arrays["mat_indptr_manufacturing"]), self.blueprint[rows])
+        owners = np.repeat(np.arange(len(rows)), counts)
+        base = np.asarray(self.tables.arrays["mat_qty_manufacturing"])[entries].astype(np.int64)
+        value = prices[np.asarray(self.tables.arrays["mat_type_manufacturing"])[entries]]
+        result = np.full((len(self), len(DECRYPTORS)), np.nan)
+        for d, me in enumerate(self.me.tolist()):
+            required = job_quantities(np.ones_like(base), base, np.full(len(base), (1 - me / 100) * factor))
+            cost = np.bincount(owners, weights=required * value, minlength=len(rows))
+            # bincount会把NaN吞掉，缺价的行单独标记
+            missing = np.bincount(owners, weights=np.isnan(value), minlength=len(rows)) > 0
+            result[rows, d] = np.where(missing, np.nan, cost)
+        return result
+
+    def plan(self, runs_needed: Dict[int, int], science, encryption, decryptor: int = 0) -> Dict[int, Dict]:
+        """
+        为需要的T2流程数计算发明尝试次数和消耗
+
+        :param runs_needed: {T2产品type_id: 需要的制造流程数}
+        :param science: 科学技能等级和
+        :param encryption: 加密技能等级
+        :param decryptor: DECRYPTORS中的下标
+        :return: {T2产品type_id: {"attempts": 期望尝试次数(向上取整), "probability", "runs_per_success",
+                  "materials": {type_id: 数量}}}
+        """
+        type_ids = self.tables.type_ids
+        result = {}
+        rows = self.rows(runs_needed)
+        for (type_id, needed), row in zip(runs_needed.items(), rows.tolist()):
+            if row < 0:
+                raise KeyError(f"{type_id} 不能通过发明获得")
+            expected = self.expected_runs[row, decryptor, science, encryption]
+            attempts = int(np.ceil(needed / expected)) if expected > 0 else 0
+            materials = {}
+            types, quantities = self.datacores(row)
+            for material, quantity in zip(types.tolist(), quantities.tolist()):
+                materials[int(type_ids[material])] = quantity * attempts
+            decryptor_type = DECRYPTORS[decryptor][0]
+            if decryptor_type is not None:
+                materials[decryptor_type] = materials.get(decryptor_type, 0) + attempts
+            result[type_id] = {"attempts": attempts, "probability": float(self.probability[row, decryptor, science,
+                                                                                            encryption]),
+                               "runs_per_success": int(self.runs[row, decryptor]), "materials": materials}
+        return result
+
+
+def reaction_batches(tables: BlueprintTables, type_ids: Sequence[int],
+                     quantities: Sequence[int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    反应按批次产出：需要的数量向上取整到整批
+
+    :return: (流程数, 实际产出, 多余数量)，与type_ids对齐
+    """
+    index = tables.type_index(np.asarray(type_ids))
+    if (index < 0).any():
+        raise KeyError(f"未知的物品: {np.asarray(type_ids)[index < 0][:10].tolist()}")
+    batch = np.maximum(np.asarray(tables.producer_qty)[index], 1).astype(np.int64)
+    quantities = np.asarray(quantities, dtype=np.int64)
+    runs = -(-quantities // batch)
+    produced = runs * batch
+    return runs, produced, produced - quantities
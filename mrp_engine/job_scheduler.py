@@ -0,0 +1,231 @@
+import heapq
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from mrp_engine.bom import REACTION, BOMEngine, BOMResult
+
+
+# 槽位类型；ESI activity_id -> 槽位类型（3/4为TE/ME研究，5为拷贝，8为发明，9/11为反应）
+SLOT_CLASSES = ("manufacturing", "reaction", "research")
+ESI_ACTIVITY_SLOTS = {1: "manufacturing", 3: "research", 4: "research", 5: "research", 8: "research",
+                      9: "reaction", 11: "reaction"}
+
+# 技能ID
+INDUSTRY, ADVANCED_INDUSTRY = 3380, 3388
+MASS_PRODUCTION, ADVANCED_MASS_PRODUCTION = 3387, 24625
+LABORATORY_OPERATION, ADVANCED_LABORATORY_OPERATION = 3406, 24624
+REACTIONS, MASS_REACTIONS, ADVANCED_MASS_REACTIONS = 45746, 45748, 45749
+
+
+class CharacterSlots:
+    """一个角色的工业槽位数、技能时间系数，以及已占用槽位的剩余时间"""
+
+    def __init__(self, character_id: int, manufacturing: int = 1, reaction: int = 1, research: int = 1,
+                 manufacturing_time: float = 1.0, reaction_time: float = 1.0, research_time: float = 1.0,
+                 busy: Optional[Dict[str, List[float]]] = None):
+        """
+        :param character_id: 角色ID
+        :param manufacturing: 制造槽位数
+        :param reaction: 反应槽位数
+        :param research: 科研槽位数（研究、拷贝、发明）
+        :param manufacturing_time: 制造时间系数（技能）
+        :param reaction_time: 反应时间系数
+        :param research_time: 科研时间系数
+        :param busy: {槽位类型: [已有任务剩余秒数]}，每个任务占用一个槽位
+        """
+        self.character_id = character_id
+        self.slots = {"manufacturing": manufacturing, "reaction": reaction, "research": research}
+        self.time = {"manufacturing": manufacturing_time, "reaction": reaction_time, "research": research_time}
+        self.busy = {name: list(values) for name, values in (busy or {}).items()}
+
+    @classmethod
+    def from_esi(cls, character_id: int, skills: Iterable[Dict], jobs: Iterable[Dict] = (),
+                 now: Optional[datetime] = None) -> "CharacterSlots":
+        """
+        从ESI数据生成
+
+        :param skills: /characters/{id}/skills/ 的 skills 列表
+        :param jobs: /characters/{id}/industry/jobs/ 的任务列表，进行中的任务占用槽位
+        :param now: 当前时间，默认为UTC现在
+        """
+        levels = {skill["skill_id"]: skill.get("active_skill_level", skill.get("trained_skill_level", 0))
+                  for skill in skills}
+        level = levels.get
+        now = now or datetime.now(timezone.utc)
+        busy: Dict[str, List[float]] = {}
+        for job in jobs:
+            slot = ESI_ACTIVITY_SLOTS.get(job.get("activity_id"))
+            if slot is None or job.get("status", "active") != "active":
+                continue
+            end = datetime.fromisoformat(job["end_date"].replace("Z", "+00:00"))
+            busy.setdefault(slot, []).append(max((end - now).total_seconds(), 0.0))
+
+        return cls(
+            character_id,
+            manufacturing=1 + level(MASS_PRODUCTION, 0) + level(ADVANCED_MASS_PRODUCTION, 0),
+            reaction=(1 + level(MASS_REACTIONS, 0) + level(ADVANCED_MASS_REACTIONS, 0)) if level(REACTIONS) else 0,
+            research=1 + level(LABORATORY_OPERATION, 0) + level(ADVANCED_LABORATORY_OPERATION, 0),
+            manufacturing_time=(1 - 0.04 * level(INDUSTRY, 0)) * (1 - 0.03 * level(ADVANCED_INDUSTRY, 0)),
+            reaction_time=1 - 0.04 * level(REACTIONS, 0),
+            research_time=1 - 0.03 * level(ADVANCED_INDUSTRY, 0),
+            busy=busy,
+        )
+
+
+class Job:
+    """待安排的一个工业任务；duration为不含角色技能的基础耗时（秒）"""
+
+    __slots__ = ("job_id", "type_id", "activity", "runs", "duration", "depends_on")
+
+    def __init__(self, job_id: int, type_id: int, activity: str, runs: int, duration: float,
+                 depends_on: Sequence[int] = ()):
+        self.job_id = job_id
+        self.type_id = type_id
+        self.activity = activity
+        self.runs = runs
+        self.duration = duration
+        self.depends_on = tuple(depends_on)
+
+    def __repr__(self):
+        return f"Job({self.job_id}, type_id={self.type_id}, {self.activity}, runs={self.runs})"
+
+
+def jobs_from_bom(engine: BOMEngine, result: BOMResult) -> List[Job]:
+    """
+    把BOM展开结果转换为任务列表
+
+    每个物品按蓝图单次最大流程数拆成多个任务；任务依赖生产其材料的所有任务。
+    """
+    tables = engine.tables
+    jobs: List[Job] = []
+    item_jobs: Dict[int, List[int]] = {}
+    recipes = {}
+    for type_id, runs in result.runs.items():
+        item = int(tables.type_index(type_id))
+        recipe = recipes[item] = engine.recipe(item)
+        activity = "reaction" if recipe.activity == REACTION else "manufacturing"
+        ids = item_jobs[item] = []
+        for job_runs, count in recipe.jobs(runs):
+            for _ in range(count):
+                ids.append(len(jobs))
+                jobs.append(Job(len(jobs), type_id, activity, job_runs, recipe.time * job_runs * recipe.time_factor))
+
+    for item, recipe in recipes.items():
+        depends_on = [job_id for material, _ in recipe.materials for job_id in item_jobs.get(material, ())]
+        for job_id in item_jobs[item]:
+            jobs[job_id].depends_on = tuple(depends_on)
+    return jobs
+
+
+class Schedule:
+    """
+    排程结果，数组与输入任务顺序一致
+
+    start / end 为相对于排程起点的秒数。
+    """
+
+    def __init__(self, job_ids: np.ndarray, character_ids: np.ndarray, slots: np.ndarray,
+                 start: np.ndarray, end: np.ndarray):
+        self.job_ids = job_ids
+        self.character_ids = character_ids
+        self.slots = slots
+        self.start = start
+        self.end = end
+        self.makespan = float(end.max(initial=0.0))
+
+    def by_character(self) -> Dict[int, List[Dict]]:
+        """{character_id: [{job_id, start, end}, ...]}，按开始时间排序"""
+        result: Dict[int, List[Dict]] = {}
+        for i in np.argsort(self.start, kind="stable").tolist():
+            result.setdefault(int(self.character_ids[i]), []).append(
+                {"job_id": int(self.job_ids[i]), "start": float(self.start[i]), "end": float(self.end[i])})
+        return result
+
+
+class JobScheduler:
+    """
+    多角色工业槽位排程（列表调度）
+
+    任务按关键路径长度（自身耗时 + 后续任务的最长链）排优先级，依赖全部排完的任务进入就绪堆；
+    每次取优先级最高的任务，在同类型的所有槽位上向量化计算完成时间（考虑槽位空闲时间、
+    依赖完成时间和角色技能系数），放到最早完成的槽位上，以缩短总工期。
+    """
+
+    def __init__(self, characters: Iterable[CharacterSlots]):
+        self.characters = list(characters)
+        self._slots = {}
+        for name in SLOT_CLASSES:
+            owner, free, multiplier = [], [], []
+            for i, character in enumerate(self.characters):
+                busy = sorted(character.busy.get(name, ()))
+                for slot in range(character.slots[name]):
+                    owner.append(i)
+                    free.append(busy[slot] if slot < len(busy) else 0.0)
+                    multiplier.append(character.time[name])
+            self._slots[name] = (np.array(owner, dtype=np.int64), np.array(free), np.array(multiplier))
+
+    def schedule(self, jobs: Sequence[Job]) -> Schedule:
+        n = len(jobs)
+        index = {job.job_id: i for i, job in enumerate(jobs)}
+        successors: List[List[int]] = [[] for _ in range(n)]
+        indegree = np.zeros(n, dtype=np.int64)
+        for i, job in enumerate(jobs):
+            for dependency in job.depends_on:
+                successors[index[dependency]].append(i)
+            indegree[i] = len(job.depends_on)
+
+        # 拓扑序，同时检查循环依赖
+        order = [i for i in range(n) if indegree[i] == 0]
+        remaining = indegree.copy()
+        for i in order:
+            for successor in successors[i]:
+                remaining[successor] -= 1
+                if remaining[successor] == 0:
+                    order.append(successor)
+        if len(order) < n:
+            raise ValueError("任务依赖中存在循环")
+
+        # 优先级：按平均技能系数估算的关键路径长度
+        mean_multiplier = {name: float(values[2].mean()) if len(values[2]) else 1.0
+                           for name, values in self._slots.items()}
+        priority = np.zeros(n)
+        for i in reversed(order):
+            job = jobs[i]
+            tail = max((priority[successor] for successor in successors[i]), default=0.0)
+            priority[i] = job.duration * mean_multiplier[job.activity] + tail
+
+        free = {name: values[1].copy() for name, values in self._slots.items()}
+        ready_time = np.zeros(n)
+        start = np.zeros(n)
+        end = np.zeros(n)
+        slot_of = np.zeros(n, dtype=np.int64)
+        character_of = np.zeros(n, dtype=np.int64)
+
+        heap = [(-priority[i], i) for i in range(n) if indegree[i] == 0]
+        heapq.heapify(heap)
+        while heap:
+            _, i = heapq.heappop(heap)
+            job = jobs[i]
+            owner, _, multiplier = self._slots[job.activity]
+            if not len(owner):
+                raise ValueError(f"没有角色拥有{job.activity}槽位")
+            slot_free = free[job.activity]
+            begin = np.maximum(slot_free, ready_time[i])
+            finish = begin + job.duration * multiplier
+            slot = int(np.argmin(finish))
+            slot_free[slot] = finish[slot]
+            start[i], end[i] = begin[slot], finish[slot]
+            slot_of[i], character_of[i] = slot, owner[slot]
+
+            for successor in successors[i]:
+                if end[i] > ready_time[successor]:
+                    ready_time[successor] = end[i]
+                indegree[successor] -= 1
+                if indegree[successor] == 0:
+                    heapq.heappush(heap, (-priority[successor], successor))
+
+        character_ids = np.array([character.character_id for character in self.characters], dtype=np.int64)
+        return Schedule(np.array([job.job_id for job in jobs], dtype=np.int64), character_ids[character_of],
+                        slot_of, start, end)
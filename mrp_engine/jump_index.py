@@ -0,0 +1,191 @@
+import json
+import os
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from mrp_engine.sde import _iter_records
+
+
+DEFAULT_JUMPS_DIR = os.path.join("data", "jump_tables")
+
+# 不可达（或不在该变体允许的星系中）
+UNREACHABLE = 255
+
+# k-space 星系ID范围（31xxxxxx为虫洞，32xxxxxx为深渊）
+KSPACE_MIN, KSPACE_MAX = 30000000, 31000000
+
+# 变体名 -> 路径上允许的最低安全等级（按游戏显示的舍入值），None为不限制
+VARIANTS = {"all": None, "highsec": 0.5, "no_nullsec": 0.1}
+
+
+def rounded_security(security) -> np.ndarray:
+    """游戏显示的安全等级：保留一位小数，(0, 0.05) 之间显示为0.1"""
+    security = np.asarray(security, dtype=np.float64)
+    rounded = np.floor(security * 10 + 0.5) / 10
+    return np.where((security > 0) & (rounded <= 0), 0.1, rounded)
+
+
+def _bfs_all_pairs(indptr: np.ndarray, neighbours: np.ndarray, allowed: np.ndarray) -> np.ndarray:
+    """
+    位集BFS求所有星系两两之间的跳数
+
+    每个星系保存一个"已被哪些起点到达"的位集（按uint64字存储），每层对所有星系同时做一次
+    邻居位集的按位或，层数即星图直径；只在 allowed 星系构成的子图上计算。
+    """
+    n_total = len(allowed)
+    dist = np.full((n_total, n_total), UNREACHABLE, dtype=np.uint8)
+    nodes = np.flatnonzero(allowed)
+    n = len(nodes)
+    if not n:
+        return dist
+
+    # 只保留两端都允许的边，并重新编号为子图下标
+    local = np.full(n_total, -1, dtype=np.int64)
+    local[nodes] = np.arange(n)
+    sources = np.repeat(np.arange(n_total), np.diff(indptr))
+    keep = allowed[sources] & allowed[neighbours]
+    sources, targets = local[sources[keep]], local[neighbours[keep]]
+    degree = np.bincount(sources, minlength=n)
+    has_edges = np.flatnonzero(degree)
+    starts = np.concatenate(([0], np.cumsum(degree)[:-1]))[has_edges]
+
+    words = (n + 63) // 64
+    visited = np.zeros((n, words * 8), dtype=np.uint8)
+    visited[np.arange(n), np.arange(n) // 8] = np.left_shift(1, 7 - np.arange(n) % 8).astype(np.uint8)
+    visited = visited.view(np.uint64)
+    frontier = visited.copy()
+    sub = np.full((n, n), UNREACHABLE, dtype=np.uint8)
+    sub[np.arange(n), np.arange(n)] = 0
+    level = 0
+    while len(has_edges) and level < UNREACHABLE - 1:
+        level += 1
+        # reached[v] = OR(frontier[u] for u in neighbours(v))
+        reached = np.zeros_like(frontier)
+        reached[has_edges] = np.bitwise_or.reduceat(frontier[targets], starts, axis=0)
+        frontier = reached & ~visited
+        rows = np.flatnonzero(frontier.any(axis=1))
+        if not len(rows):
+            break
+        visited[rows] |= frontier[rows]
+        new = np.unpackbits(frontier[rows].view(np.uint8), axis=1, count=n).view(bool)
+        # 行为目标星系、列为起点；星门双向，距离矩阵对称，直接按行写入
+        block = sub[rows]
+        block[new] = level
+        sub[rows] = block
+    dist[np.ix_(nodes, nodes)] = sub
+    return dist
+
+
+def build_jump_index(sde_dir: str, out_dir: str = DEFAULT_JUMPS_DIR,
+                     variants: Optional[Dict[str, Optional[float]]] = None) -> "JumpIndex":
+    """
+    从SDE的星系和星门数据构建k-space所有星系两两之间的跳数表
+
+    :param sde_dir: SDE目录（mapSolarSystems / mapStargates，.jsonl 或 .yaml）
+    :param out_dir: 输出目录
+    :param variants: {变体名: 最低安全等级}，默认为 VARIANTS
+    """
+    variants = VARIANTS if variants is None else variants
+    systems = {key: record for key, record in _iter_records(sde_dir, ("mapSolarSystems",))
+               if KSPACE_MIN <= key < KSPACE_MAX}
+    system_ids = np.array(sorted(systems), dtype=np.int32)
+    security = np.array([systems[int(system_id)].get("securityStatus", 0.0) for system_id in system_ids],
+                        dtype=np.float32)
+    index = {int(system_id): i for i, system_id in enumerate(system_ids)}
+
+    gates = dict(_iter_records(sde_dir, ("mapStargates",)))
+    edges = set()
+    for record in gates.values():
+        destination = record.get("destination", {})
+        target = destination.get("solarSystemID")
+        if target is None and destination.get("stargateID") in gates:
+            target = gates[destination["stargateID"]]["solarSystemID"]
+        a, b = index.get(record.get("solarSystemID")), index.get(target)
+        if a is not None and b is not None and a != b:
+            edges.add((a, b))
+            edges.add((b, a))
+    edges = np.array(sorted(edges), dtype=np.int64).reshape(-1, 2)
+    indptr = np.zeros(len(system_ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(edges[:, 0], minlength=len(system_ids)), out=indptr[1:])
+    print(f"星图: {len(system_ids)} 个k-space星系, {len(edges) // 2} 条星门连接")
+
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, "system_ids.npy"), system_ids)
+    np.save(os.path.join(out_dir, "security.npy"), security)
+    np.save(os.path.join(out_dir, "gate_indptr.npy"), indptr)
+    np.save(os.path.join(out_dir, "gate_neighbours.npy"), edges[:, 1].astype(np.int32))
+    displayed = rounded_security(security)
+    for name, min_security in variants.items():
+        allowed = np.ones(len(system_ids), dtype=bool) if min_security is None else displayed >= min_security
+        np.save(os.path.join(out_dir, f"jumps_{name}.npy"), _bfs_all_pairs(indptr, edges[:, 1], allowed))
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump({"systems": int(len(system_ids)), "variants": variants}, f)
+    return JumpIndex.load(out_dir)
+
+
+class JumpIndex:
+    """
+    以内存映射方式加载的跳数表
+
+    jumps[变体] 为 [起点, 目标] 的uint8矩阵，按排序后的 system_ids 寻址，255表示不可达；
+    安全等级变体只允许经过（包括起点和终点）满足最低安全等级的星系。
+    """
+
+    def __init__(self, system_ids: np.ndarray, security: np.ndarray, jumps: Dict[str, np.ndarray],
+                 directory: Optional[str] = None):
+        self.directory = directory
+        self.system_ids = system_ids
+        self.security = security
+        self.jumps = jumps
+
+    @classmethod
+    def load(cls, directory: str = DEFAULT_JUMPS_DIR) -> "JumpIndex":
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        jumps = {name: np.load(os.path.join(directory, f"jumps_{name}.npy"), mmap_mode="r")
+                 for name in meta["variants"]}
+        return cls(np.load(os.path.join(directory, "system_ids.npy")),
+                   np.load(os.path.join(directory, "security.npy")), jumps, directory)
+
+    @property
+    def n_systems(self) -> int:
+        return len(self.system_ids)
+
+    def system_index(self, system_ids) -> np.ndarray:
+        """星系ID -> 下标，不在表中的为-1"""
+        system_ids = np.asarray(system_ids)
+        index = np.minimum(np.searchsorted(self.system_ids, system_ids), len(self.system_ids) - 1)
+        return np.where(self.system_ids[index] == system_ids, index, -1)
+
+    def distance(self, origins, destinations, variant: str = "all") -> np.ndarray:
+        """
+        批量查询跳数（origins与destinations按numpy规则广播）
+
+        :return: uint8数组，不可达或未知星系为255
+        """
+        a, b = self.system_index(origins), self.system_index(destinations)
+        a, b = np.broadcast_arrays(a, b)
+        known = (a >= 0) & (b >= 0)
+        result = np.full(a.shape, UNREACHABLE, dtype=np.uint8)
+        result[known] = self.jumps[variant][a[known], b[known]]
+        return result
+
+    def distance_matrix(self, origins: Sequence[int], destinations: Sequence[int],
+                        variant: str = "all") -> np.ndarray:
+        """[起点, 目标] 子矩阵，例如交易中心到所有建造星系"""
+        return self.distance(np.asarray(origins)[:, None], np.asarray(destinations)[None, :], variant)
+
+    def within(self, origin: int, jumps: int, variant: str = "all") -> np.ndarray:
+        """origin周围 jumps 跳以内的星系ID（含自身）"""
+        row = self.system_index(origin)
+        if row < 0:
+            return np.zeros(0, dtype=self.system_ids.dtype)
+        return self.system_ids[np.flatnonzero(self.jumps[variant][int(row)] <= jumps)]
+
+
+if __name__ == "__main__":
+    import sys
+
+    # 用法: python -m mrp_engine.jump_index <SDE目录> [输出目录]
+    build_jump_index(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else DEFAULT_JUMPS_DIR)
@@ -0,0 +1,242 @@
+import json
+import os
+import shutil
+import tempfile
+import warnings
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+# 历史记录中的列及其类型
+HISTORY_COLUMNS = {
+    "day": np.int32,            # 1970-01-01 起的天数
+    "average": np.float64,
+    "highest": np.float64,
+    "lowest": np.float64,
+    "volume": np.int64,
+    "order_count": np.int64,
+}
+
+DEFAULT_HISTORY_ROOT = os.path.join("data", "market_history")
+
+
+def to_day(date: str) -> int:
+    """'YYYY-MM-DD' -> 1970-01-01 起的天数"""
+    return int(np.datetime64(date, "D").astype(np.int64))
+
+
+def _swap_directory(staging: str, directory: str):
+    """用写好的staging目录替换directory（os.replace不能覆盖非空目录，旧目录先移开再删除）"""
+    if not os.path.exists(directory):
+        os.replace(staging, directory)
+        return
+    retired = tempfile.mkdtemp(prefix=f".{os.path.basename(directory)}.old.", dir=os.path.dirname(directory))
+    os.replace(directory, os.path.join(retired, "data"))
+    try:
+        os.replace(staging, directory)
+    except BaseException:
+        os.replace(os.path.join(retired, "data"), directory)
+        os.rmdir(retired)
+        raise
+    shutil.rmtree(retired, ignore_errors=True)
+
+
+class MarketHistoryStore:
+    """
+    按type_id分区的列式市场历史（/markets/{region_id}/history/）
+
+    每个星域一个目录，每列一个 .npy 文件，行按 (type_id, day) 排序；
+    types.npy 为排好序的type_id，offsets.npy 为CSR偏移，
+    第i个物品的历史是 [offsets[i], offsets[i+1]) 这段行。
+    打开时全部以只读内存映射加载。
+    """
+
+    def __init__(self, directory: str, types: np.ndarray, offsets: np.ndarray, columns: Dict[str, np.ndarray]):
+        self.directory = directory
+        self.types = types
+        self.offsets = offsets
+        self.columns = columns
+
+    @classmethod
+    def open(cls, region_id: int, root: str = DEFAULT_HISTORY_ROOT) -> "MarketHistoryStore":
+        directory = os.path.join(root, str(region_id))
+        load = lambda name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+        return cls(directory, load("types"), load("offsets"), {name: load(name) for name in HISTORY_COLUMNS})
+
+    @classmethod
+    def write(cls, region_id: int, history: Iterable[Tuple[int, List[Dict]]],
+              root: str = DEFAULT_HISTORY_ROOT, merge: bool = True) -> "MarketHistoryStore":
+        """
+        写入一个星域的历史
+
+        :param history: (type_id, ESI历史记录列表) 序列
+        :param merge: 是否与已有数据合并；同一物品同一天以新数据为准
+
+        先写入同级的临时目录再整体换入，写入中途失败不会破坏已有数据；
+        已打开的旧存储（只读映射）仍然看到旧文件。
+        """
+        type_parts, columns = [], {name: [] for name in HISTORY_COLUMNS}
+        for type_id, records in history:
+            if not records:
+                continue
+            type_parts.append(np.full(len(records), type_id, dtype=np.int32))
+            columns["day"].append(np.fromiter((to_day(r["date"]) for r in records), np.int32, len(records)))
+            for name in ("average", "highest", "lowest", "volume", "order_count"):
+                columns[name].append(np.fromiter((r[name] for r in records), HISTORY_COLUMNS[name], len(records)))
+
+        def concat(parts, dtype):
+            return np.concatenate(parts) if parts else np.empty(0, dtype)
+
+        row_types = concat(type_parts, np.int32)
+        data = {name: concat(parts, HISTORY_COLUMNS[name]) for name, parts in columns.items()}
+
+        directory = os.path.join(root, str(region_id))
+        if merge and os.path.exists(os.path.join(directory, "types.npy")):
+            old = cls.open(region_id, root)
+            old_types = np.repeat(np.asarray(old.types), np.diff(old.offsets))
+            # 新数据排在前面，去重时保留第一次出现的行
+            row_types = np.concatenate([row_types, old_types])
+            data = {name: np.concatenate([data[name], np.asarray(old.columns[name])]) for name in data}
+            # 释放旧文件的映射，换入目录时不再占用它们
+            del old
+
+        order = np.lexsort((data["day"], row_types))
+        row_types = row_types[order]
+        data = {name: values[order] for name, values in data.items()}
+        if len(row_types):
+            # lexsort是稳定排序，同一(type, day)中新数据在前
+            keep = np.ones(len(row_types), dtype=bool)
+            keep[1:] = (row_types[1:] != row_types[:-1]) | (data["day"][1:] != data["day"][:-1])
+            row_types = row_types[keep]
+            data = {name: values[keep] for name, values in data.items()}
+
+        types, counts = np.unique(row_types, return_counts=True)
+        offsets = np.zeros(len(types) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+
+        os.makedirs(root, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=f".{region_id}.", dir=root)
+        try:
+            np.save(os.path.join(staging, "types.npy"), types.astype(np.int32))
+            np.save(os.path.join(staging, "offsets.npy"), offsets)
+            for name, values in data.items():
+                np.save(os.path.join(staging, f"{name}.npy"), values)
+            with open(os.path.join(staging, "meta.json"), "w") as f:
+                json.dump({"region_id": region_id, "types": int(len(types)), "rows": int(len(row_types))}, f)
+            _swap_directory(staging, directory)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return cls.open(region_id, root)
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def type_index(self, type_ids) -> np.ndarray:
+        """type_id -> 行号，不存在的为-1"""
+        type_ids = np.asarray(type_ids)
+        if not len(self.types):
+            return np.full(type_ids.shape, -1)
+        index = np.minimum(np.searchsorted(self.types, type_ids), len(self.types) - 1)
+        return np.where(self.types[index] == type_ids, index, -1)
+
+    def history(self, type_id: int) -> Dict[str, np.ndarray]:
+        i = int(self.type_index([type_id])[0])
+        if i < 0:
+            return {name: np.empty(0, dtype) for name, dtype in HISTORY_COLUMNS.items()}
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return {name: values[start:end] for name, values in self.columns.items()}
+
+    def dense(self, column: str, days: int, end_day: Optional[int] = None) -> np.ndarray:
+        """
+        把一列展开为 (物品数, days) 的矩阵，最后一列为end_day，缺失的天为NaN
+
+        所有统计都在这个矩阵上按行向量化计算。
+        """
+        day = np.asarray(self.columns["day"])
+        if end_day is None:
+            end_day = int(day.max()) if len(day) else 0
+        start_day = end_day - days + 1
+
+        grid = np.full((len(self.types), days), np.nan)
+        rows = np.repeat(np.arange(len(self.types)), np.diff(self.offsets))
+        mask = (day >= start_day) & (day <= end_day)
+        grid[rows[mask], day[mask] - start_day] = np.asarray(self.columns[column])[mask]
+        return grid
+
+
+def ewma(grid: np.ndarray, span: float) -> np.ndarray:
+    """按行计算指数加权均值，缺失的天沿用上一值；返回每行最后的EWMA"""
+    alpha = 2.0 / (span + 1.0)
+    result = np.full(grid.shape[0], np.nan)
+    for column in grid.T:
+        present = ~np.isnan(column)
+        fresh = present & np.isnan(result)
+        result[fresh] = column[fresh]
+        update = present & ~fresh
+        result[update] += alpha * (column[update] - result[update])
+    return result
+
+
+def rolling_mean(grid: np.ndarray, window: int) -> np.ndarray:
+    """按行计算window天滑动均值（忽略缺失），返回与grid同形状的矩阵"""
+    values = np.nan_to_num(grid)
+    counts = (~np.isnan(grid)).astype(np.int64)
+    sums = np.cumsum(values, axis=1)
+    totals = np.cumsum(counts, axis=1)
+    sums[:, window:] = sums[:, window:] - sums[:, :-window]
+    totals[:, window:] = totals[:, window:] - totals[:, :-window]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(totals > 0, sums / np.maximum(totals, 1), np.nan)
+
+
+def vwap(average: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    """按行计算成交量加权均价"""
+    weights = np.nan_to_num(volume)
+    turnover = np.nansum(np.nan_to_num(average) * weights, axis=1)
+    total = weights.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(total > 0, turnover / np.maximum(total, 1), np.nan)
+
+
+def volatility(average: np.ndarray) -> np.ndarray:
+    """按行计算日对数收益率的标准差（跳过缺失的天）"""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns = np.diff(np.log(average), axis=1)
+    valid = np.isfinite(returns)
+    count = valid.sum(axis=1)
+    mean = np.where(valid, returns, 0.0).sum(axis=1) / np.maximum(count, 1)
+    variance = np.where(valid, (returns - mean[:, None]) ** 2, 0.0).sum(axis=1) / np.maximum(count, 1)
+    return np.where(count >= 2, np.sqrt(variance), np.nan)
+
+
+def price_statistics(store: MarketHistoryStore, days: int = 90, window: int = 30, span: float = 20,
+                     percentiles=(10, 50, 90), end_day: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    一次计算全部物品的价格统计，结果数组与 store.types 对齐
+
+    :param days: 参与计算的天数
+    :param window: VWAP、滑动均值与波动率使用的最近天数
+    :param span: EWMA跨度（天）
+    :param percentiles: 均价的百分位
+    """
+    average = store.dense("average", days, end_day)
+    volume = store.dense("volume", days, end_day).astype(np.float64)
+    recent_average, recent_volume = average[:, -window:], volume[:, -window:]
+
+    stats = {
+        "type_id": np.asarray(store.types),
+        "ewma": ewma(average, span),
+        "vwap": vwap(recent_average, recent_volume),
+        "rolling_mean": rolling_mean(average, window)[:, -1],
+        "volatility": volatility(recent_average),
+        "daily_volume": np.nansum(recent_volume, axis=1) / window,
+    }
+    with warnings.catch_warnings():
+        # 没有任何成交的物品整行为NaN，结果也为NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        values = np.nanpercentile(average, percentiles, axis=1)
+    for q, row in zip(percentiles, values):
+        stats[f"p{q}"] = row
+    return stats
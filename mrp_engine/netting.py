@@ -0,0 +1,118 @@
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from mrp_engine.bom_batch import BatchBOMSolver
+from mrp_engine.sde import BlueprintTables
+
+
+def as_type_vector(tables: BlueprintTables, values) -> np.ndarray:
+    """
+    把数量转换为与 tables.type_ids 对齐的int64向量
+
+    :param values: 已对齐的数组、{type_id: 数量}，或以type_id为索引的pandas Series
+    """
+    if isinstance(values, np.ndarray) and values.shape == (tables.n_types,):
+        return values.astype(np.int64, copy=False)
+    if isinstance(values, dict):
+        type_ids, quantities = list(values), list(values.values())
+    elif hasattr(values, "index") and hasattr(values, "to_numpy"):
+        type_ids, quantities = values.index.to_numpy(), values.to_numpy()
+    else:
+        raise TypeError(f"无法转换为物品向量: {type(values).__name__}")
+
+    index = tables.type_index(np.asarray(type_ids, dtype=np.int64))
+    if (index < 0).any():
+        unknown = np.asarray(type_ids)[index < 0]
+        raise KeyError(f"未知的物品: {unknown[:10].tolist()}")
+    vector = np.zeros(tables.n_types, dtype=np.int64)
+    np.add.at(vector, index, np.asarray(quantities, dtype=np.int64))
+    return vector
+
+
+def assets_to_inventory(tables: BlueprintTables, assets: Iterable[Dict],
+                        location_ids: Optional[Iterable[int]] = None) -> np.ndarray:
+    """
+    把ESI资产列表（/characters/{id}/assets/ 或 /corporations/{id}/assets/）汇总为库存向量
+
+    蓝图拷贝不计入库存；指定location_ids时只统计这些地点内的资产（包括其中的集装箱）。
+
+    :param assets: ESI返回的资产行
+    :param location_ids: 只统计的地点（空间站、建筑等）
+    """
+    assets = [asset for asset in assets if not asset.get("is_blueprint_copy")]
+    if location_ids is not None:
+        # 集装箱中物品的location_id是集装箱的item_id，向上追溯到实际地点
+        parent = {asset["item_id"]: asset["location_id"] for asset in assets if "item_id" in asset}
+        wanted = set(location_ids)
+
+        def root(location_id: int) -> int:
+            for _ in range(16):
+                if location_id not in parent:
+                    break
+                location_id = parent[location_id]
+            return location_id
+
+        assets = [asset for asset in assets if root(asset["location_id"]) in wanted]
+
+    type_ids = np.fromiter((asset["type_id"] for asset in assets), np.int64, len(assets))
+    quantities = np.fromiter((max(asset.get("quantity", 1), 1) for asset in assets), np.int64, len(assets))
+    index = tables.type_index(type_ids)
+    inventory = np.zeros(tables.n_types, dtype=np.int64)
+    np.add.at(inventory, index[index >= 0], quantities[index >= 0])
+    return inventory
+
+
+class NettingResult:
+    """
+    净需求计算结果，所有向量都与 type_ids 对齐
+
+    demand 为到达每个物品的需求量（已扣除上层库存），used 为从库存中扣除的数量，
+    runs 为仍需生产的流程数，shortfall 为需要购买的原材料数量。
+    """
+
+    def __init__(self, type_ids: np.ndarray, demand: np.ndarray, used: np.ndarray, runs: np.ndarray,
+                 shortfall: np.ndarray):
+        self.type_ids = type_ids
+        self.demand = demand
+        self.used = used
+        self.runs = runs
+        self.shortfall = shortfall
+
+    def to_dict(self, vector: np.ndarray) -> Dict[int, int]:
+        """非零项转为 {type_id: 数量}"""
+        nonzero = np.flatnonzero(vector)
+        return dict(zip(self.type_ids[nonzero].tolist(), vector[nonzero].tolist()))
+
+
+def net_requirements(solver: BatchBOMSolver, gross, inventory) -> NettingResult:
+    """
+    按层级扣除库存，计算净需求
+
+    从最终产品开始逐层扣除库存：持有的中间产品直接抵消需求，其下的材料也不再需要；
+    原材料最后扣除库存，剩余部分即为采购量。
+
+    :param solver: 批量BOM求解器（决定加成、直接购买的物品和层级）
+    :param gross: 毛需求，与 tables.type_ids 对齐的向量、{type_id: 数量} 或 pandas Series
+    :param inventory: 库存，格式同gross
+    """
+    tables = solver.tables
+    gross = as_type_vector(tables, gross)
+    inventory = as_type_vector(tables, inventory)
+
+    # 不在配方中出现的物品直接扣除库存
+    in_catalog = np.zeros(tables.n_types, dtype=bool)
+    in_catalog[solver.columns] = True
+    targets = np.flatnonzero(gross * in_catalog)
+    result = solver.solve((solver.type_ids[targets], gross[targets][None, :]), inventory=inventory)
+
+    demand = gross.copy()
+    demand[solver.columns] = result.totals[0]
+    used = np.minimum(gross, inventory)
+    used[solver.columns] = result.used[0]
+    runs = np.zeros(tables.n_types, dtype=np.int64)
+    runs[solver.columns] = result.runs[0]
+    buy = ~in_catalog
+    buy[solver.columns[solver.raw_mask]] = True
+    shortfall = np.where(buy, demand - used, 0)
+    return NettingResult(solver.type_ids, demand, used, runs, shortfall)
@@ -0,0 +1,230 @@
+import hashlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from database_interface.market_store import load_best_prices
+from mrp_engine.bom_batch import BatchBOMSolver, EachResult
+from mrp_engine.install_cost import IndustryCostTables
+from mrp_engine.sde import ACTIVITY_CODE, BlueprintTables
+
+
+PriceSource = Union[str, Sequence[str]]
+
+
+class PriceSnapshot:
+    """
+    某一时刻的价格，每个来源一个与 tables.type_ids 对齐的float64向量（NaN表示没有价格）
+
+    常用来源：sell（最低卖价）、buy（最高买价）、adjusted（ESI调整价格）。
+    key 由价格内容计算，相同的价格得到相同的key，用于缓存扫描结果。
+    """
+
+    def __init__(self, tables: BlueprintTables, sources: Dict[str, np.ndarray]):
+        self.tables = tables
+        self.sources = {name: np.asarray(values, dtype=np.float64) for name, values in sources.items()}
+        digest = hashlib.blake2b(digest_size=16)
+        for name in sorted(self.sources):
+            digest.update(name.encode())
+            digest.update(self.sources[name].tobytes())
+        self.key = digest.hexdigest()
+
+    @classmethod
+    def from_dicts(cls, tables: BlueprintTables, **sources: Dict[int, float]) -> "PriceSnapshot":
+        """例如 PriceSnapshot.from_dicts(tables, sell={34: 5.1}, adjusted={34: 4.8})"""
+        return cls(tables, {name: _price_vector(tables, prices.keys(), prices.values())
+                            for name, prices in sources.items()})
+
+    @classmethod
+    def from_orders(cls, tables: BlueprintTables, region_id: int, location_id: Optional[int] = None,
+                    adjusted: Optional[Dict[int, float]] = None) -> "PriceSnapshot":
+        """
+        从本地 market_orders 表生成 sell/buy 价格
+
+        :param region_id: 星域
+        :param location_id: 只使用该地点（例如Jita 4-4）的订单
+        :param adjusted: 可选的ESI调整价格 {type_id: 价格}
+        """
+        rows = load_best_prices(region_id, location_id)
+        type_ids = [row[0] for row in rows]
+        sources = {
+            "sell": _price_vector(tables, type_ids, [np.nan if row[1] is None else row[1] for row in rows]),
+            "buy": _price_vector(tables, type_ids, [np.nan if row[2] is None else row[2] for row in rows]),
+        }
+        if adjusted is not None:
+            sources["adjusted"] = _price_vector(tables, adjusted.keys(), adjusted.values())
+        return cls(tables, sources)
+
+    def with_source(self, name: str, values: Union[np.ndarray, Dict[int, float]]) -> "PriceSnapshot":
+        """返回加入（或替换）一个价格来源后的新快照"""
+        if isinstance(values, dict):
+            values = _price_vector(self.tables, values.keys(), values.values())
+        return PriceSnapshot(self.tables, {**self.sources, name: values})
+
+    def price(self, source: PriceSource) -> np.ndarray:
+        """取价格向量；source为多个来源时按顺序取第一个有值的，快照中没有的来源跳过"""
+        names = [source] if isinstance(source, str) else list(source)
+        prices = np.full(self.tables.n_types, np.nan)
+        for name in names:
+            if name in self.sources:
+                missing = np.isnan(prices)
+                prices[missing] = self.sources[name][missing]
+        return prices
+
+
+def _price_vector(tables: BlueprintTables, type_ids, prices) -> np.ndarray:
+    type_ids = np.fromiter(type_ids, np.int64)
+    prices = np.fromiter(prices, np.float64, len(type_ids))
+    index = tables.type_index(type_ids)
+    vector = np.full(tables.n_types, np.nan)
+    vector[index[index >= 0]] = prices[index >= 0]
+    return vector
+
+
+class ScanResult:
+    """
+    全部产品的盈利扫描结果，所有数组按 type_ids 对齐（每个产品按一个流程计算）
+
+    价格缺失的产品 profit 等为NaN，排序时跳过。
+    """
+
+    FIELDS = ("type_ids", "units", "revenue", "material_cost", "install_cost", "taxes", "profit", "margin",
+              "hours", "isk_per_hour")
+
+    def __init__(self, **arrays: np.ndarray):
+        for name in self.FIELDS:
+            setattr(self, name, arrays[name])
+
+    def __len__(self):
+        return len(self.type_ids)
+
+    def ranked(self, by: str = "margin", top: Optional[int] = 50, min_profit: float = 0.0) -> List[Dict]:
+        """
+        按指标从高到低排序
+
+        :param by: margin / isk_per_hour / profit
+        :param top: 返回前多少个，None为全部
+        :param min_profit: 只保留单流程利润不低于此值的产品
+        """
+        metric = getattr(self, by)
+        keep = np.flatnonzero(~np.isnan(metric) & (self.profit >= min_profit))
+        order = keep[np.argsort(-metric[keep], kind="stable")][:top]
+        return [{name: getattr(self, name)[i].item() for name in self.FIELDS} for i in order]
+
+
+class ProfitabilityScanner:
+    """
+    对所有可生产物品批量计算利润
+
+    物料展开与价格无关，只计算一次；每个价格快照只做几次矩阵运算，
+    结果按 (快照, 参数) 缓存，重复查看同一快照不再计算。
+    """
+
+    def __init__(self, solver: BatchBOMSolver, material_price: PriceSource = ("sell", "adjusted"),
+                 product_price: PriceSource = "sell", sales_tax: float = 0.036, broker_fee: float = 0.015,
+                 system_cost_index: float = 0.05, facility_tax: float = 0.0, scc_surcharge: float = 0.04,
+                 products: Optional[Sequence[int]] = None, cache_size: int = 8,
+                 industry: Optional[IndustryCostTables] = None, system_id: Optional[int] = None,
+                 structure_bonus: float = 0.0):
+        """
+        :param solver: 批量BOM求解器（决定加成、直接购买的物品）
+        :param material_price: 材料价格来源，可以是多个来源按顺序回退
+        :param product_price: 产品价格来源
+        :param sales_tax: 销售税
+        :param broker_fee: 挂单手续费，直接卖给买单时设为0
+        :param system_cost_index: 星系成本指数
+        :param facility_tax: 设施税
+        :param scc_surcharge: SCC附加费
+        :param products: 要扫描的产品type_id，为空时扫描所有可生产物品
+        :param cache_size: 缓存多少个快照的结果
+        :param industry: ESI成本指数和调整价格表；给出时安装费按 system_id 的实际成本指数
+                         （制造/反应分别计算）和表中的调整价格计算，忽略 system_cost_index
+        :param system_id: 开工星系
+        :param structure_bonus: 建筑的成本指数减免
+        """
+        self.solver = solver
+        self.tables = solver.tables
+        self.material_price = material_price
+        self.product_price = product_price
+        self.sales_tax = sales_tax
+        self.broker_fee = broker_fee
+        self.system_cost_index = system_cost_index
+        self.facility_tax = facility_tax
+        self.scc_surcharge = scc_surcharge
+        self.cache_size = cache_size
+        self.industry = industry
+        self.system_id = system_id
+        self.structure_bonus = structure_bonus
+
+        if products is None:
+            self.products = solver.type_ids[solver.columns[~solver.raw_mask]]
+        else:
+            self.products = np.asarray(products)
+        self._product_index = self.tables.type_index(self.products)
+        self._each: Optional[EachResult] = None
+        self._units: Optional[np.ndarray] = None
+        self._hours: Optional[np.ndarray] = None
+        self._cache: "OrderedDict[tuple, ScanResult]" = OrderedDict()
+
+    def requirements(self) -> EachResult:
+        """每个产品一个流程的原材料需求和生产链（与价格无关，只算一次）"""
+        if self._each is None:
+            self._units = np.asarray(self.tables.producer_qty)[self._product_index].astype(np.int64)
+            self._each = self.solver.solve_each(self.products, self._units)
+            self._hours = self._each.chain_sum(self.solver.time_per_run) / 3600
+        return self._each
+
+    def _params(self) -> tuple:
+        return (self.material_price if isinstance(self.material_price, str) else tuple(self.material_price),
+                self.product_price if isinstance(self.product_price, str) else tuple(self.product_price),
+                self.sales_tax, self.broker_fee, self.system_cost_index, self.facility_tax, self.scc_surcharge,
+                None if self.industry is None else (self.industry.version, self.system_id, self.structure_bonus))
+
+    def _install_value(self, snapshot: PriceSnapshot) -> np.ndarray:
+        """每个物品一个流程的安装费，与 tables.type_ids 对齐"""
+        if self.industry is None:
+            adjusted = np.nan_to_num(snapshot.price("adjusted"), nan=0.0)
+            return self.solver.per_run_value(adjusted) * (
+                self.system_cost_index + self.facility_tax + self.scc_surcharge)
+        industry = self.industry
+        columns = np.where(np.asarray(self.tables.producer_activity) == ACTIVITY_CODE["reaction"],
+                           industry.activity_column("reaction"), industry.activity_column("manufacturing"))
+        rate = industry.rate(self.system_id, columns, self.facility_tax, self.structure_bonus, self.scc_surcharge)
+        return industry.eiv_per_run * rate
+
+    def scan(self, snapshot: PriceSnapshot) -> ScanResult:
+        """按一个价格快照扫描所有产品"""
+        key = (snapshot.key,) + self._params()
+        result = self._cache.get(key)
+        if result is not None:
+            self._cache.move_to_end(key)
+            return result
+
+        each = self.requirements()
+        units = self._units
+
+        # 材料成本：缺价的原材料只要被用到，整个产品的成本记为NaN
+        raw_index = self.tables.type_index(each.raw_type_ids)
+        material_prices = snapshot.price(self.material_price)[raw_index]
+        missing = np.isnan(material_prices)
+        material_cost = each.raw @ np.where(missing, 0.0, material_prices)
+        material_cost[(each.raw[:, missing] > 0).any(axis=1)] = np.nan
+
+        # 安装费：整条生产链每个任务的EIV x (成本指数 + 设施税 + SCC)
+        install_cost = each.chain_sum(self._install_value(snapshot))
+
+        revenue = units * snapshot.price(self.product_price)[self._product_index]
+        taxes = revenue * (self.sales_tax + self.broker_fee)
+        profit = revenue - taxes - material_cost - install_cost
+        with np.errstate(divide="ignore", invalid="ignore"):
+            margin = profit / revenue
+            isk_per_hour = np.where(self._hours > 0, profit / self._hours, np.nan)
+
+        result = ScanResult(type_ids=self.products, units=units, revenue=revenue, material_cost=material_cost,
+                            install_cost=install_cost, taxes=taxes, profit=profit, margin=margin,
+                            hours=self._hours, isk_per_hour=isk_per_hour)
+        self._cache[key] = result
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
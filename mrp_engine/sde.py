@@ -0,0 +1,219 @@
+import json
+import os
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+
+# 蓝图活动及其编号（activity_time 的列顺序）
+ACTIVITIES = ("manufacturing", "reaction", "invention", "copying", "research_material", "research_time")
+ACTIVITY_CODE = {name: code for code, name in enumerate(ACTIVITIES)}
+
+# 带材料 / 产出 / 技能的活动
+MATERIAL_ACTIVITIES = ("manufacturing", "reaction", "invention", "copying")
+PRODUCT_ACTIVITIES = ("manufacturing", "reaction", "invention")
+
+DEFAULT_TABLES_DIR = os.path.join("data", "sde_tables")
+
+
+def _iter_records(sde_dir: str, names: Iterable[str]) -> Iterator[Tuple[int, Dict]]:
+    """按文件名依次查找SDE文件（.jsonl 或 .yaml），逐条返回 (key, 记录)"""
+    for name in names:
+        for folder in (sde_dir, os.path.join(sde_dir, "fsd")):
+            jsonl_path = os.path.join(folder, f"{name}.jsonl")
+            yaml_path = os.path.join(folder, f"{name}.yaml")
+            if os.path.exists(jsonl_path):
+                with open(jsonl_path, encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            record = json.loads(line)
+                            yield int(record["_key"]), record
+                return
+            if os.path.exists(yaml_path):
+                try:
+                    import yaml
+                except ImportError:
+                    raise ImportError("读取YAML格式的SDE需要PyYAML（安装: pip install pyyaml）") from None
+                loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+                with open(yaml_path, encoding="utf-8") as f:
+                    for key, record in yaml.load(f, Loader=loader).items():
+                        yield int(key), record
+                return
+    raise FileNotFoundError(f"在 {sde_dir} 中找不到 {'/'.join(names)}")
+
+
+def _csr(rows, columns):
+    """rows为每行的元组列表，返回 indptr 与各列数组"""
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum([len(row) for row in rows], out=indptr[1:])
+    flat = [item for row in rows for item in row]
+    arrays = []
+    for i, dtype in enumerate(columns):
+        arrays.append(np.fromiter((item[i] for item in flat), dtype, len(flat)))
+    return indptr, arrays
+
+
+def import_sde(sde_dir: str, out_dir: str = DEFAULT_TABLES_DIR) -> "BlueprintTables":
+    """
+    读取一次SDE，写出紧凑的数组表
+
+    物品与蓝图都映射为稠密整数下标；材料、产出和技能按活动以CSR格式保存。
+
+    :param sde_dir: SDE解压目录（支持 .jsonl 与 fsd/*.yaml）
+    :param out_dir: 输出目录
+    """
+    categories = {key: record for key, record in _iter_records(sde_dir, ("categories", "categoryIDs"))}
+    groups = {key: record.get("categoryID", -1) for key, record in _iter_records(sde_dir, ("groups", "groupIDs"))}
+    types = {key: record for key, record in _iter_records(sde_dir, ("types", "typeIDs"))}
+    blueprints = sorted(_iter_records(sde_dir, ("blueprints",)))
+    print(f"SDE: {len(types)} 个物品, {len(groups)} 个分组, {len(categories)} 个类别, {len(blueprints)} 张蓝图")
+
+    # 蓝图里引用但types中缺失的物品也分配下标
+    type_ids = set(types)
+    for blueprint_id, record in blueprints:
+        type_ids.add(blueprint_id)
+        for activity in record.get("activities", {}).values():
+            for key in ("materials", "products", "skills"):
+                type_ids.update(item["typeID"] for item in activity.get(key, ()))
+    type_ids = np.array(sorted(type_ids), dtype=np.int32)
+    index = {int(type_id): i for i, type_id in enumerate(type_ids)}
+
+    group_id = np.full(len(type_ids), -1, dtype=np.int32)
+    portion_size = np.ones(len(type_ids), dtype=np.int32)
+    volume = np.zeros(len(type_ids), dtype=np.float32)
+    published = np.zeros(len(type_ids), dtype=np.bool_)
+    for type_id, record in types.items():
+        i = index[type_id]
+        group_id[i] = record.get("groupID", -1)
+        portion_size[i] = record.get("portionSize", 1)
+        volume[i] = record.get("volume", 0.0)
+        published[i] = record.get("published", False)
+    category_id = np.array([groups.get(int(g), -1) for g in group_id], dtype=np.int32)
+
+    tables = {
+        "type_ids": type_ids,
+        "group_id": group_id,
+        "category_id": category_id,
+        "portion_size": portion_size,
+        "volume": volume,
+        "published": published,
+        "blueprint_type": np.array([index[bp] for bp, _ in blueprints], dtype=np.int32),
+        "max_production_limit": np.array([r.get("maxProductionLimit", 0) for _, r in blueprints], dtype=np.int32),
+    }
+
+    activity_time = np.zeros((len(blueprints), len(ACTIVITIES)), dtype=np.int32)
+    for row, (_, record) in enumerate(blueprints):
+        for name, activity in record.get("activities", {}).items():
+            if name in ACTIVITY_CODE:
+                activity_time[row, ACTIVITY_CODE[name]] = activity.get("time", 0)
+    tables["activity_time"] = activity_time
+
+    def activity_items(name, key):
+        return [record.get("activities", {}).get(name, {}).get(key, ()) for _, record in blueprints]
+
+    for name in MATERIAL_ACTIVITIES:
+        indptr, (mat_type, mat_qty) = _csr(
+            [[(index[m["typeID"]], m["quantity"]) for m in items] for items in activity_items(name, "materials")],
+            (np.int32, np.int32))
+        tables[f"mat_indptr_{name}"], tables[f"mat_type_{name}"], tables[f"mat_qty_{name}"] = indptr, mat_type, mat_qty
+
+        indptr, (skill_type, skill_level) = _csr(
+            [[(index[s["typeID"]], s["level"]) for s in items] for items in activity_items(name, "skills")],
+            (np.int32, np.int8))
+        tables[f"skill_indptr_{name}"], tables[f"skill_type_{name}"], tables[f"skill_level_{name}"] = \
+            indptr, skill_type, skill_level
+
+    # 每个物品由哪张蓝图的哪个活动产出（制造优先于反应）
+    producer_bp = np.full(len(type_ids), -1, dtype=np.int32)
+    producer_activity = np.full(len(type_ids), -1, dtype=np.int8)
+    producer_qty = np.zeros(len(type_ids), dtype=np.int32)
+    for name in PRODUCT_ACTIVITIES:
+        indptr, (prod_type, prod_qty, prod_prob) = _csr(
+            [[(index[p["typeID"]], p["quantity"], p.get("probability", 1.0)) for p in items]
+             for items in activity_items(name, "products")],
+            (np.int32, np.int32, np.float32))
+        tables[f"prod_indptr_{name}"], tables[f"prod_type_{name}"] = indptr, prod_type
+        tables[f"prod_qty_{name}"], tables[f"prod_prob_{name}"] = prod_qty, prod_prob
+        if name == "invention":
+            continue
+        rows = np.repeat(np.arange(len(blueprints), dtype=np.int32), np.diff(indptr))
+        free = producer_bp[prod_type] < 0
+        producer_bp[prod_type[free]] = rows[free]
+        producer_activity[prod_type[free]] = ACTIVITY_CODE[name]
+        producer_qty[prod_type[free]] = prod_qty[free]
+    tables["producer_bp"] = producer_bp
+    tables["producer_activity"] = producer_activity
+    tables["producer_qty"] = producer_qty
+
+    os.makedirs(out_dir, exist_ok=True)
+    for name, values in tables.items():
+        np.save(os.path.join(out_dir, f"{name}.npy"), values)
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump({"activities": ACTIVITIES, "types": int(len(type_ids)), "blueprints": len(blueprints),
+                   "arrays": sorted(tables)}, f)
+    return BlueprintTables.load(out_dir)
+
+
+class BlueprintTables:
+    """
+    以内存映射方式加载的蓝图与物品数组表
+
+    物品按 type_ids 中的下标寻址，蓝图按行号寻址；
+    activity 的材料为 mat_type_{activity}[mat_indptr_{activity}[bp]:mat_indptr_{activity}[bp + 1]]。
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], directory: Optional[str] = None):
+        self.directory = directory
+        self.arrays = arrays
+        for name, values in arrays.items():
+            setattr(self, name, values)
+
+    @classmethod
+    def load(cls, directory: str = DEFAULT_TABLES_DIR) -> "BlueprintTables":
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in meta["arrays"]}
+        return cls(arrays, directory)
+
+    @property
+    def n_types(self) -> int:
+        return len(self.type_ids)
+
+    @property
+    def n_blueprints(self) -> int:
+        return len(self.blueprint_type)
+
+    def type_index(self, type_ids) -> np.ndarray:
+        """type_id -> 物品下标，不存在的为-1"""
+        type_ids = np.asarray(type_ids)
+        index = np.minimum(np.searchsorted(self.type_ids, type_ids), len(self.type_ids) - 1)
+        return np.where(self.type_ids[index] == type_ids, index, -1)
+
+    def materials(self, blueprint: int, activity: str = "manufacturing") -> Tuple[np.ndarray, np.ndarray]:
+        """返回 (材料物品下标, 每流程数量)"""
+        indptr = self.arrays[f"mat_indptr_{activity}"]
+        start, end = indptr[blueprint], indptr[blueprint + 1]
+        return self.arrays[f"mat_type_{activity}"][start:end], self.arrays[f"mat_qty_{activity}"][start:end]
+
+    def products(self, blueprint: int, activity: str = "manufacturing") -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """返回 (产出物品下标, 每流程数量, 概率)"""
+        indptr = self.arrays[f"prod_indptr_{activity}"]
+        start, end = indptr[blueprint], indptr[blueprint + 1]
+        return (self.arrays[f"prod_type_{activity}"][start:end], self.arrays[f"prod_qty_{activity}"][start:end],
+                self.arrays[f"prod_prob_{activity}"][start:end])
+
+    def skills(self, blueprint: int, activity: str) -> Tuple[np.ndarray, np.ndarray]:
+        indptr = self.arrays[f"skill_indptr_{activity}"]
+        start, end = indptr[blueprint], indptr[blueprint + 1]
+        return self.arrays[f"skill_type_{activity}"][start:end], self.arrays[f"skill_level_{activity}"][start:end]
+
+    def time(self, blueprint: int, activity: str) -> int:
+        """活动基础耗时（秒），0表示该蓝图没有此活动"""
+        return int(self.arrays["activity_time"][blueprint, ACTIVITY_CODE[activity]])
+
+
+if __name__ == "__main__":
+    import sys
+
+    # 用法: python -m mrp_engine.sde <SDE目录> [输出目录]
+    import_sde(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else DEFAULT_TABLES_DIR)